@@ -0,0 +1,112 @@
+import numpy as np
+from django.core.cache import cache
+from django.db.models import CharField
+from django.db.models.functions import Cast
+
+from .caching import versioned_key
+from .models import ExerciseVolume
+
+PROGRESS_TIMEOUT = 60 * 60 * 24
+WEEKLY_WINDOW = 4
+MONTHLY_WINDOW = 3
+
+# 1970-01-01, day 0 of datetime64[D], was a Thursday
+MONDAY_OFFSET = 3
+
+
+def get_progress(exercise):
+    """Return the weekly and monthly progress series for ``exercise``, computing them on a cache miss."""
+    key = versioned_key('progress', exercise.user_id, exercise.pk)
+    progress = cache.get(key)
+    if progress is None:
+        progress = build_progress(exercise)
+        cache.set(key, progress, PROGRESS_TIMEOUT)
+    return progress
+
+
+def load_days(exercise):
+    """
+    Load the exercise's per-day totals from the ExerciseVolume read model as
+    NumPy arrays with one query, so the cost follows the number of training
+    days rather than the number of logged rows. The date is selected as text to
+    skip Django's per-row date conversion, NumPy parses the ISO strings in bulk.
+    """
+    rows = list(ExerciseVolume.objects.filter(user_id=exercise.user_id, exercise_id=exercise.pk).values_list(
+        Cast('date', CharField()), 'sessions', 'volume', 'weighted_reps', 'total_reps',
+    ))
+    if not rows:
+        return None
+    dates, sessions, volume, weighted_reps, total_reps = zip(*rows)
+    return {
+        'dates': np.array(dates, dtype='datetime64[D]'),
+        'sessions': np.array(sessions, dtype=np.float64),
+        'volume': np.array(volume, dtype=np.float64),
+        'weighted_reps': np.array(weighted_reps, dtype=np.float64),
+        'total_reps': np.array(total_reps, dtype=np.float64),
+    }
+
+
+def week_starts(weeks):
+    return (weeks * 7 - MONDAY_OFFSET).astype('datetime64[D]')
+
+
+def month_starts(months):
+    return months.astype('datetime64[M]').astype('datetime64[D]')
+
+
+def build_progress(exercise):
+    days = load_days(exercise)
+    progress = {'exercise': {'id': exercise.pk, 'name': exercise.name}}
+    if days is None:
+        progress['weekly'] = progress['monthly'] = None
+        return progress
+
+    weeks = (days['dates'].astype(np.int64) + MONDAY_OFFSET) // 7
+    months = days['dates'].astype('datetime64[M]').astype(np.int64)
+
+    progress['weekly'] = period_series(weeks, week_starts, days, WEEKLY_WINDOW)
+    progress['monthly'] = period_series(months, month_starts, days, MONTHLY_WINDOW)
+    return progress
+
+
+def period_series(periods, period_starts, days, window):
+    """
+    Group the per-day totals by ``periods`` (an integer period number per day)
+    into a dense series covering every period from the first to the last, so
+    rolling windows span calendar time rather than only the periods trained in.
+    """
+    first = periods.min()
+    index = periods - first
+    size = int(index.max()) + 1
+
+    def total(values):
+        return np.bincount(index, weights=values, minlength=size)
+
+    volume = total(days['volume'])
+    sessions = total(days['sessions'])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        intensity = volume / total(days['weighted_reps'])
+
+    return {
+        'periods': np.datetime_as_string(period_starts(np.arange(size) + first)).tolist(),
+        'volume': rounded(volume),
+        'total_reps': total(days['total_reps']).astype(np.int64).tolist(),
+        'average_intensity': rounded(intensity),
+        'sessions': sessions.astype(np.int64).tolist(),
+        'volume_rolling': rounded(rolling_mean(volume, window)),
+        'sessions_rolling': rounded(rolling_mean(sessions, window)),
+        'window': window,
+    }
+
+
+def rolling_mean(values, window):
+    """Trailing mean over ``window`` periods, over fewer at the start of the series."""
+    totals = np.cumsum(values, dtype=np.float64)
+    totals[window:] = totals[window:] - totals[:-window]
+    counts = np.minimum(np.arange(1, len(values) + 1), window)
+    return totals / counts
+
+
+def rounded(values):
+    values = np.round(values, 2)
+    return np.where(np.isnan(values), None, values).tolist()
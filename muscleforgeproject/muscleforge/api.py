@@ -0,0 +1,228 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.db.models import Prefetch
+from django.http import JsonResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_POST, require_safe
+
+from .autocomplete import get_index
+from .batch import BatchError, validate_batch, save_batch
+from .caching import get_version
+from .models import WorkoutPlan, WorkoutSession, ExerciseInSession, Goal
+from .pagination import InvalidCursor, paginate_keyset
+
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 200
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
+
+
+def api_etag(request, *args, **kwargs):
+    """
+    Tag a response with the user's 'api' version and its URL. Every plan,
+    session, exercise and goal write bumps the version, so a matching tag is
+    answered with a 304 from one cache read, without loading any rows. The
+    production profile keeps versions in the database cache, so a worker never
+    answers from a version another worker has since bumped.
+    """
+    if not request.user.is_authenticated:
+        return None
+    digest = hashlib.md5(request.get_full_path().encode()).hexdigest()[:16]
+    return f'{get_version("api", request.user.id)}-{digest}'
+
+
+def api_last_modified(request, *args, **kwargs):
+    if not request.user.is_authenticated:
+        return None
+    # Versions are write times in nanoseconds
+    return datetime.fromtimestamp(get_version('api', request.user.id) / 1e9, tz=timezone.utc)
+
+
+def error(message, status):
+    return JsonResponse({'detail': message}, status=status)
+
+
+def api_view(view):
+    """Read-only, session authenticated JSON view that supports conditional GET."""
+    @require_safe
+    @condition(etag_func=api_etag, last_modified_func=api_last_modified)
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return error('Authentication credentials were not provided.', 401)
+        response = view(request, *args, **kwargs)
+        # Clients may keep the response but must revalidate it with its ETag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+    return wrapper
+
+
+def api_write_view(view):
+    """Session authenticated JSON view for POSTed JSON bodies, passed to the view as ``payload``."""
+    @require_POST
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return error('Authentication credentials were not provided.', 401)
+        try:
+            payload = json.loads(request.body)
+        except ValueError:
+            return error('Invalid JSON.', 400)
+        return view(request, payload, *args, **kwargs)
+    return wrapper
+
+
+def plan_data(plan):
+    return {
+        'id': plan.id,
+        'title': plan.title,
+        'start_date': plan.start_date,
+        'end_date': plan.end_date,
+        'status': plan.status,
+    }
+
+
+def entry_data(entry):
+    return {
+        'id': entry.id,
+        'exercise': {'id': entry.exercise_id, 'name': entry.exercise.name},
+        'repetitions': entry.repetitions,
+        'sets': entry.sets,
+        'weight_used': entry.weight_used,
+    }
+
+
+def session_data(session):
+    return {
+        'id': session.id,
+        'workout_plan': session.workout_plan_id,
+        'date': session.date,
+        'duration': session.duration.total_seconds() if session.duration is not None else None,
+        'notes': session.notes,
+        'exercises': [entry_data(entry) for entry in session.exerciseinsession_set.all()],
+    }
+
+
+def goal_data(goal):
+    return {
+        'id': goal.id,
+        'title': goal.title,
+        'description': goal.description,
+        'start_date': goal.start_date,
+        'end_date': goal.end_date,
+        'status': goal.status,
+    }
+
+
+def user_sessions(user):
+    """The user's sessions with their exercises loaded by one extra query per page."""
+    entries = ExerciseInSession.objects.select_related('exercise').order_by('id')
+    return WorkoutSession.objects.filter(workout_plan__user=user).prefetch_related(
+        Prefetch('exerciseinsession_set', queryset=entries)
+    )
+
+
+def page_url(request, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query['cursor'] = cursor
+    return request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+
+
+def page_response(request, queryset, ordering, serialize):
+    try:
+        page_size = int(request.GET.get('page_size', API_PAGE_SIZE))
+    except ValueError:
+        return error('page_size must be a number.', 400)
+    page_size = max(1, min(page_size, API_MAX_PAGE_SIZE))
+    try:
+        page = paginate_keyset(queryset, ordering, request.GET.get('cursor'), page_size)
+    except InvalidCursor:
+        return error('Invalid cursor.', 400)
+    return JsonResponse({
+        'results': [serialize(obj) for obj in page],
+        'next': page_url(request, page.next_cursor),
+        'previous': page_url(request, page.previous_cursor),
+    })
+
+
+def detail_response(queryset, pk, serialize):
+    obj = queryset.filter(pk=pk).first()
+    if obj is None:
+        return error('Not found.', 404)
+    return JsonResponse(serialize(obj))
+
+
+@api_view
+def plan_list(request):
+    return page_response(request, WorkoutPlan.objects.filter(user=request.user), ('start_date', 'id'), plan_data)
+
+
+@api_view
+def plan_detail(request, pk):
+    return detail_response(WorkoutPlan.objects.filter(user=request.user), pk, plan_data)
+
+
+@api_view
+def session_list(request):
+    sessions = user_sessions(request.user)
+    plan = request.GET.get('plan')
+    if plan is not None:
+        if not plan.isdigit():
+            return error('plan must be a workout plan id.', 400)
+        sessions = sessions.filter(workout_plan_id=plan)
+    return page_response(request, sessions, ('date', 'id'), session_data)
+
+
+@api_view
+def session_detail(request, pk):
+    return detail_response(user_sessions(request.user), pk, session_data)
+
+
+@api_view
+def exercise_autocomplete(request):
+    try:
+        limit = int(request.GET.get('limit', AUTOCOMPLETE_LIMIT))
+    except ValueError:
+        return error('limit must be a number.', 400)
+    limit = max(1, min(limit, AUTOCOMPLETE_MAX_LIMIT))
+    matches = get_index(request.user.id).search(request.GET.get('q', ''), limit)
+    return JsonResponse({
+        'results': [{'id': pk, 'name': name, 'exercise_type': exercise_type} for pk, name, exercise_type in matches],
+    })
+
+
+@api_view
+def goal_list(request):
+    return page_response(request, Goal.objects.filter(user=request.user), ('start_date', 'id'), goal_data)
+
+
+@api_view
+def goal_detail(request, pk):
+    return detail_response(Goal.objects.filter(user=request.user), pk, goal_data)
+
+
+def batch_response(request, payload, session, status):
+    try:
+        cleaned = validate_batch(request.user, payload, session if session.pk is not None else None)
+    except BatchError as e:
+        return JsonResponse({'errors': e.errors}, status=400)
+    session = save_batch(cleaned, session)
+    return JsonResponse(session_data(user_sessions(request.user).get(pk=session.pk)), status=status)
+
+
+@api_write_view
+def session_batch_create(request, payload):
+    return batch_response(request, payload, WorkoutSession(), 201)
+
+
+@api_write_view
+def session_batch_update(request, payload, pk):
+    session = WorkoutSession.objects.filter(workout_plan__user=request.user, pk=pk).first()
+    if session is None:
+        return error('Not found.', 404)
+    return batch_response(request, payload, session, 200)
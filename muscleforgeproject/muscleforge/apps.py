@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class MuscleforgeConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'muscleforge'
+
+    def ready(self):
+        import muscleforge.database
+        import muscleforge.signals
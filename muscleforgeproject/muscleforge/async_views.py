@@ -0,0 +1,128 @@
+from functools import wraps
+
+from django.contrib.auth.views import redirect_to_login
+from django.core.exceptions import ImproperlyConfigured
+from django.http import Http404
+from django.template.response import TemplateResponse
+from django.urls import path
+from users.models import UserProfile
+from .dashboard import aget_dashboard
+from .records import arecords_by_entry
+from .views import (
+    ExerciseListView,
+    WorkoutPlanListView,
+    WorkoutPlanDetailView,
+    WorkoutSessionDetailView,
+    GoalListView,
+    GoalDetailView,
+    flag_records
+)
+
+# Async views for the read-heavy pages. They reuse the sync views' querysets and
+# context, but load everything the templates need with the async ORM before
+# rendering, since a lazy query from a template raises SynchronousOnlyOperation.
+# Pages are returned as TemplateResponses, which the handler renders in a thread,
+# so the {% cache %} fragments and the layout version can use a database cache.
+
+
+async def load_request_user(request):
+    """
+    Resolve ``request.user`` with the async ORM, along with the profile the base
+    template shows, so neither is lazily loaded while rendering.
+    """
+    user = await request.auser()
+    if user.is_authenticated:
+        profile = await UserProfile.objects.filter(user=user).afirst()
+        if profile is not None:
+            user.userprofile = profile
+    request.user = user
+    return user
+
+def async_login_required(view):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await load_request_user(request)
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+class AsyncLoginRequiredMixin:
+    """Async counterpart of LoginRequiredMixin, which would load the user with a sync query."""
+
+    async def dispatch(self, request, *args, **kwargs):
+        user = await load_request_user(request)
+        if not user.is_authenticated:
+            return self.handle_no_permission()
+        return await super().dispatch(request, *args, **kwargs)
+
+class AsyncKeysetListMixin:
+    async def get(self, request, *args, **kwargs):
+        self.object_list = self.get_queryset()
+        await self.aget_keyset_page()
+        return self.render_to_response(self.get_context_data())
+
+class AsyncDetailMixin:
+    async def get(self, request, *args, **kwargs):
+        self.object = await self.aget_object()
+        return self.render_to_response(self.get_context_data(object=self.object))
+
+    async def aget_object(self):
+        try:
+            obj = await self.get_queryset().aget(pk=self.kwargs.get(self.pk_url_kwarg))
+        except self.model.DoesNotExist:
+            raise Http404(f'No {self.model._meta.verbose_name} found matching the query')
+        # OwnedObjectMixin keeps the object for get_workout_plan()
+        self._cached_object = obj
+        return obj
+
+@async_login_required
+async def home(request):
+    return TemplateResponse(request, 'muscleforge/home.html', context=await aget_dashboard(request.user))
+
+class AsyncExerciseListView(AsyncLoginRequiredMixin, AsyncKeysetListMixin, ExerciseListView):
+    pass
+
+class AsyncWorkoutPlanListView(AsyncLoginRequiredMixin, AsyncKeysetListMixin, WorkoutPlanListView):
+    pass
+
+class AsyncGoalListView(AsyncLoginRequiredMixin, AsyncKeysetListMixin, GoalListView):
+    pass
+
+class AsyncWorkoutPlanDetailView(AsyncLoginRequiredMixin, AsyncDetailMixin, WorkoutPlanDetailView):
+    pass
+
+class AsyncWorkoutSessionDetailView(AsyncLoginRequiredMixin, AsyncDetailMixin, WorkoutSessionDetailView):
+    async def get(self, request, *args, **kwargs):
+        self.object = await self.aget_object()
+        exercises = [exercise async for exercise in self.get_exercises()]
+        flag_records(exercises, await arecords_by_entry(exercises))
+        return self.render_to_response(self.get_context_data(object=self.object, exercises=exercises))
+
+class AsyncGoalDetailView(AsyncLoginRequiredMixin, AsyncDetailMixin, GoalDetailView):
+    pass
+
+ASYNC_VIEWS = {
+    'muscleforge-home': home,
+    'exercise-list': AsyncExerciseListView.as_view(),
+    'workoutplan-list': AsyncWorkoutPlanListView.as_view(),
+    'workoutplan-detail': AsyncWorkoutPlanDetailView.as_view(),
+    'workoutsession-detail': AsyncWorkoutSessionDetailView.as_view(),
+    'goal-list': AsyncGoalListView.as_view(),
+    'goal-detail': AsyncGoalDetailView.as_view(),
+}
+
+def use_async_views(urlpatterns, routes):
+    """
+    Serve the routes named in ``routes`` ('*' for every route that has one) by
+    their async view. Under WSGI every async view runs in its own event loop,
+    so only select them for ASGI deployments.
+    """
+    unknown = set(routes) - {'*', *ASYNC_VIEWS}
+    if unknown:
+        raise ImproperlyConfigured(f"No async view for route(s) {', '.join(sorted(unknown))}")
+    return [
+        path(str(pattern.pattern), ASYNC_VIEWS[pattern.name], name=pattern.name)
+        if pattern.name in ASYNC_VIEWS and ('*' in routes or pattern.name in routes) else pattern
+        for pattern in urlpatterns
+    ]
@@ -0,0 +1,113 @@
+import re
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+
+from .caching import get_version
+from .models import Exercise
+
+WORD = re.compile(r'\w+')
+# Indexes kept per process, least recently used dropped first
+MAX_INDEXES = 256
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def words(text):
+    return WORD.findall(text.lower())
+
+
+def trigrams(text):
+    padded = f'  {text.lower()} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ExerciseIndex:
+    """
+    Prefix index over one user's exercise names. Every word of every name is
+    kept in one sorted list, so the names with a word starting with a term are
+    a bisect away. Queries that match no prefix fall back to shared trigrams,
+    which forgives typos.
+    """
+
+    def __init__(self, exercises):
+        # (id, name, exercise_type), in the order results are listed
+        self.entries = sorted(exercises, key=lambda entry: (entry[1].lower(), entry[0]))
+        self.by_id = {entry[0]: entry for entry in self.entries}
+        postings = sorted((word, position) for position, entry in enumerate(self.entries) for word in set(words(entry[1])))
+        self.words = [word for word, _ in postings]
+        self.positions = [position for _, position in postings]
+        self.trigrams = {}
+        for position, entry in enumerate(self.entries):
+            for trigram in trigrams(entry[1]):
+                self.trigrams.setdefault(trigram, []).append(position)
+
+    def exercise(self, pk):
+        """The exercise with id ``pk``, built from the index with only its indexed fields, or None."""
+        try:
+            entry = self.by_id.get(int(pk))
+        except (TypeError, ValueError):
+            return None
+        if entry is None:
+            return None
+        exercise = Exercise(id=entry[0], name=entry[1], exercise_type=entry[2])
+        # It is a stored row, not a new one
+        exercise._state.adding = False
+        return exercise
+
+    def with_prefix(self, term):
+        start = bisect_left(self.words, term)
+        end = bisect_left(self.words, term + '\uffff', start)
+        return set(self.positions[start:end])
+
+    def search(self, query, limit=10):
+        terms = words(query)
+        if not terms:
+            return []
+        # Every term must start a word of the name; the longest term narrows it the most
+        terms.sort(key=len, reverse=True)
+        matches = self.with_prefix(terms[0])
+        for term in terms[1:]:
+            if not matches:
+                break
+            matches &= self.with_prefix(term)
+        if matches:
+            phrase = ' '.join(words(query))
+            # Names that start with the query first, then alphabetical
+            ranked = sorted(matches, key=lambda position: (not self.entries[position][1].lower().startswith(phrase), position))
+        else:
+            ranked = self.similar(query)
+        return [self.entries[position] for position in ranked[:limit]]
+
+    def similar(self, query):
+        wanted = trigrams(query)
+        scores = {}
+        for trigram in wanted:
+            for position in self.trigrams.get(trigram, ()):
+                scores[position] = scores.get(position, 0) + 1
+        # At least half of the query's trigrams, best first
+        threshold = len(wanted) / 2
+        return sorted((position for position, score in scores.items() if score >= threshold), key=lambda position: (-scores[position], position))
+
+
+def get_index(user_id):
+    """
+    The user's ExerciseIndex, built once per 'autocomplete' version, which every
+    exercise write bumps. Indexes live in this process, so a lookup is one cache
+    read for the version and no query.
+    """
+    version = get_version('autocomplete', user_id)
+    with _indexes_lock:
+        cached = _indexes.get(user_id)
+        if cached is not None and cached[0] == version:
+            _indexes.move_to_end(user_id)
+            return cached[1]
+
+    index = ExerciseIndex(Exercise.objects.filter(user_id=user_id).values_list('id', 'name', 'exercise_type'))
+    with _indexes_lock:
+        _indexes[user_id] = (version, index)
+        _indexes.move_to_end(user_id)
+        while len(_indexes) > MAX_INDEXES:
+            _indexes.popitem(last=False)
+    return index
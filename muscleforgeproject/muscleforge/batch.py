@@ -0,0 +1,120 @@
+from datetime import timedelta
+
+from django.db import transaction
+
+from .forms import SessionBatchForm, ExerciseRowForm
+from .models import WorkoutPlan, Exercise, ExerciseInSession
+from .records import held_exercises, update_records
+from .volume import session_keys, refresh_volume
+
+MAX_EXERCISE_ROWS = 100
+ROW_FIELDS = ['exercise_id', 'repetitions', 'sets', 'weight_used']
+
+
+class BatchError(Exception):
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(errors)
+
+
+def form_errors(form):
+    return {field: list(messages) for field, messages in form.errors.items()}
+
+
+def validate_batch(user, payload, session=None):
+    """
+    Validate a whole session payload in one pass: the session fields, every
+    exercise row, and with one query each, that the plan, the exercises and
+    (when updating ``session``) the row ids belong to the user. Raises
+    BatchError with every problem found, keyed like the payload.
+    """
+    if not isinstance(payload, dict):
+        raise BatchError({'__all__': ['Expected a JSON object.']})
+
+    errors = {}
+    form = SessionBatchForm(payload)
+    if not form.is_valid():
+        errors.update(form_errors(form))
+
+    rows = payload.get('exercises', [])
+    if not isinstance(rows, list):
+        errors['exercises'] = ['Expected a list of exercise rows.']
+        rows = []
+    elif len(rows) > MAX_EXERCISE_ROWS:
+        errors['exercises'] = [f'A session can log at most {MAX_EXERCISE_ROWS} exercise rows.']
+        rows = []
+
+    row_forms = [ExerciseRowForm(row if isinstance(row, dict) else {}) for row in rows]
+    row_errors = {index: form_errors(row_form) for index, row_form in enumerate(row_forms) if not row_form.is_valid()}
+    cleaned_rows = [row_form.cleaned_data for row_form in row_forms if row_form.is_valid()]
+
+    plan = None
+    if 'workout_plan' in form.cleaned_data:
+        plan = WorkoutPlan.objects.filter(pk=form.cleaned_data['workout_plan'], user=user).first()
+        if plan is None:
+            errors['workout_plan'] = ['Unknown workout plan.']
+
+    exercise_ids = {row['exercise'] for row in cleaned_rows}
+    owned = set(Exercise.objects.filter(user=user, pk__in=exercise_ids).values_list('id', flat=True)) if exercise_ids else set()
+    existing = set(session.exerciseinsession_set.values_list('id', flat=True)) if session is not None else set()
+    seen = set()
+    for index, row_form in enumerate(row_forms):
+        row = row_form.cleaned_data
+        if index in row_errors:
+            continue
+        problems = {}
+        if row['exercise'] not in owned:
+            problems['exercise'] = ['Unknown exercise.']
+        if row['id'] is not None:
+            if row['id'] not in existing or row['id'] in seen:
+                problems['id'] = ['Not an exercise row of this session.']
+            seen.add(row['id'])
+        if problems:
+            row_errors[index] = problems
+
+    if row_errors:
+        errors.setdefault('exercises', {}).update({str(index): problems for index, problems in sorted(row_errors.items())})
+    if errors:
+        raise BatchError(errors)
+    return {**form.cleaned_data, 'workout_plan': plan, 'exercises': cleaned_rows}
+
+
+def save_batch(cleaned, session):
+    """
+    Write a validated payload in one transaction: the session, then its
+    exercise rows with one DELETE for the dropped rows, one bulk UPDATE and
+    one bulk INSERT, then the read models for the days and records it touches.
+    ``session`` is a new WorkoutSession or the one being replaced.
+    """
+    with transaction.atomic():
+        volume_keys, record_exercises = set(), set()
+        if session.pk is not None:
+            volume_keys = session_keys([session.pk])
+            record_exercises = held_exercises(ExerciseInSession.objects.filter(workout_session=session))
+
+        session.workout_plan = cleaned['workout_plan']
+        session.date = cleaned['date']
+        session.notes = cleaned['notes']
+        session.duration = timedelta(seconds=cleaned['duration']) if cleaned['duration'] is not None else None
+        session.save()
+
+        rows = [
+            ExerciseInSession(
+                pk=row['id'],
+                workout_session=session,
+                exercise_id=row['exercise'],
+                repetitions=row['repetitions'],
+                sets=row['sets'],
+                weight_used=row['weight_used'],
+            )
+            for row in cleaned['exercises']
+        ]
+        kept = [row for row in rows if row.pk is not None]
+        ExerciseInSession.objects.filter(workout_session=session).exclude(pk__in=[row.pk for row in kept]).delete()
+        if kept:
+            ExerciseInSession.objects.bulk_update(kept, ROW_FIELDS)
+        ExerciseInSession.objects.bulk_create([row for row in rows if row.pk is None])
+
+        refresh_volume(volume_keys | session_keys([session.pk]))
+        update_records(ExerciseInSession.objects.filter(workout_session=session), recompute=record_exercises)
+    return session
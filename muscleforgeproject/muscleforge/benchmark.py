@@ -0,0 +1,343 @@
+import asyncio
+import math
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date, timedelta
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from django.contrib.auth.models import User
+from django.db import OperationalError, connection
+from django.template.base import Template
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .batch import validate_batch, save_batch
+from .models import WorkoutPlan, Exercise, WorkoutSession, ExerciseInSession, Goal
+from .records import rebuild_records
+from .volume import rebuild_volume
+
+
+def seed_user_data(user, plans=24, sessions_per_plan=12, exercises_per_session=6, goals=60, seed=0):
+    """Fill a user's account with a few years of plans, sessions and goals."""
+    rng = random.Random(seed)
+    exercises = list(Exercise.objects.filter(user=user))
+    start = date.today() - timedelta(weeks=4 * plans)
+
+    workout_plans = WorkoutPlan.objects.bulk_create([
+        WorkoutPlan(
+            user=user,
+            title=f'Plan {i + 1}',
+            start_date=start + timedelta(weeks=4 * i),
+            end_date=start + timedelta(weeks=4 * (i + 1)),
+            status=i < plans - 2,
+        )
+        for i in range(plans)
+    ])
+
+    sessions = WorkoutSession.objects.bulk_create([
+        WorkoutSession(
+            workout_plan=plan,
+            date=plan.start_date + timedelta(days=2 * i),
+            duration=timedelta(minutes=rng.randint(30, 90)),
+            notes='',
+        )
+        for plan in workout_plans
+        for i in range(sessions_per_plan)
+    ])
+
+    ExerciseInSession.objects.bulk_create([
+        ExerciseInSession(
+            workout_session=session,
+            exercise=exercise,
+            repetitions=rng.randint(5, 12),
+            sets=rng.randint(3, 5),
+            weight_used=rng.choice([None, 20.0, 40.0, 60.0, 80.0]),
+        )
+        for session in sessions
+        for exercise in rng.sample(exercises, min(exercises_per_session, len(exercises)))
+    ])
+
+    Goal.objects.bulk_create([
+        Goal(
+            user=user,
+            title=f'Goal {i + 1}',
+            description='Benchmark goal',
+            start_date=start + timedelta(weeks=i),
+            end_date=start + timedelta(weeks=i + 8),
+            status=rng.random() < 0.5,
+        )
+        for i in range(goals)
+    ])
+    rebuild_volume([user.pk])
+    rebuild_records([user.pk])
+
+
+# Named routes benchmark_routes() leaves out, and why
+UNBUDGETED_ROUTES = {
+    'logout': 'logs the client out',
+    'api-session-batch': 'POST only',
+    'api-session-batch-update': 'POST only',
+}
+
+
+def benchmark_routes(user):
+    """
+    Return (route name, url) pairs covering every named GET route for ``user``,
+    except the UNBUDGETED_ROUTES.
+    """
+    plan = WorkoutPlan.objects.filter(user=user).order_by('-start_date').first()
+    session = WorkoutSession.objects.filter(workout_plan=plan).order_by('-date').first()
+    exercise = Exercise.objects.filter(user=user).first()
+    goal = Goal.objects.filter(user=user).first()
+    session_kwargs = {'workoutplan_pk': plan.pk, 'session_pk': session.pk}
+
+    return [
+        ('muscleforge-home', reverse('muscleforge-home')),
+        ('exercise-list', reverse('exercise-list')),
+        ('exercise-new', reverse('exercise-new')),
+        ('exercise-update', reverse('exercise-update', kwargs={'pk': exercise.pk})),
+        ('exercise-delete', reverse('exercise-delete', kwargs={'pk': exercise.pk})),
+        ('exercise-progress', reverse('exercise-progress', kwargs={'pk': exercise.pk})),
+        ('workoutplan-list', reverse('workoutplan-list')),
+        ('workoutplan-detail', reverse('workoutplan-detail', kwargs={'pk': plan.pk})),
+        ('workoutplan-new', reverse('workoutplan-new')),
+        ('workoutplan-update', reverse('workoutplan-update', kwargs={'pk': plan.pk})),
+        ('workoutplan-delete', reverse('workoutplan-delete', kwargs={'pk': plan.pk})),
+        ('workout-import', reverse('workout-import')),
+        ('workoutsession-new', reverse('workoutsession-new', kwargs={'workoutplan_pk': plan.pk})),
+        ('workoutsession-detail', reverse('workoutsession-detail', kwargs=session_kwargs)),
+        ('workoutsession-update', reverse('workoutsession-update', kwargs=session_kwargs)),
+        ('workoutsession-delete', reverse('workoutsession-delete', kwargs=session_kwargs)),
+        ('goal-list', reverse('goal-list')),
+        ('goal-new', reverse('goal-new')),
+        ('goal-detail', reverse('goal-detail', kwargs={'pk': goal.pk})),
+        ('goal-update', reverse('goal-update', kwargs={'pk': goal.pk})),
+        ('goal-delete', reverse('goal-delete', kwargs={'pk': goal.pk})),
+        ('api-plan-list', reverse('api-plan-list')),
+        ('api-plan-detail', reverse('api-plan-detail', kwargs={'pk': plan.pk})),
+        ('api-session-list', reverse('api-session-list')),
+        ('api-session-detail', reverse('api-session-detail', kwargs={'pk': session.pk})),
+        ('api-goal-list', reverse('api-goal-list')),
+        ('api-goal-detail', reverse('api-goal-detail', kwargs={'pk': goal.pk})),
+        ('api-exercise-autocomplete', f"{reverse('api-exercise-autocomplete')}?q={exercise.name[:3]}"),
+        ('metrics', reverse('metrics')),
+        ('profile', reverse('profile')),
+        ('account-settings', reverse('account-settings')),
+        ('account-export', reverse('account-export', kwargs={'export_format': 'zip'})),
+        ('account-export-table', reverse('account-export-table', kwargs={'export_format': 'csv', 'table': 'exercises_in_session'})),
+        ('login', reverse('login')),
+        ('register', reverse('register')),
+    ]
+
+
+@contextmanager
+def render_timer():
+    """Accumulate the time spent rendering top-level templates into ``timings``."""
+    timings = []
+    original_render = Template.render
+    depth = 0
+
+    def timed_render(self, context):
+        nonlocal depth
+        depth += 1
+        start = time.perf_counter()
+        try:
+            return original_render(self, context)
+        finally:
+            depth -= 1
+            if depth == 0:
+                timings.append(time.perf_counter() - start)
+
+    Template.render = timed_render
+    try:
+        yield timings
+    finally:
+        Template.render = original_render
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = max(math.ceil(pct / 100 * len(ordered)) - 1, 0)
+    return ordered[index]
+
+
+def measure(client, url, iterations=8, warmup=1):
+    """Request ``url`` repeatedly and return its query count and timing percentiles."""
+    for _ in range(warmup):
+        client.get(url)
+
+    queries, wall, render = [], [], []
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as captured, render_timer() as render_timings:
+            start = time.perf_counter()
+            response = client.get(url)
+            if response.streaming:
+                # Streamed responses query as they're read
+                for _chunk in response.streaming_content:
+                    pass
+            wall.append(time.perf_counter() - start)
+        queries.append(len(captured))
+        render.append(sum(render_timings))
+
+    return {
+        'status': response.status_code,
+        'queries': max(queries),
+        'p50_ms': percentile(wall, 50) * 1000,
+        'p95_ms': percentile(wall, 95) * 1000,
+        'render_p50_ms': percentile(render, 50) * 1000,
+        'render_p95_ms': percentile(render, 95) * 1000,
+    }
+
+
+def format_report(results):
+    lines = [f"{'route':<24}{'status':>7}{'queries':>9}{'p50 ms':>9}{'p95 ms':>9}{'render p50':>12}{'render p95':>12}"]
+    for name, result in results.items():
+        lines.append(
+            f"{name:<24}{result['status']:>7}{result['queries']:>9}"
+            f"{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}"
+            f"{result['render_p50_ms']:>12.1f}{result['render_p95_ms']:>12.1f}"
+        )
+    return '\n'.join(lines)
+
+
+def load_summary(results, elapsed):
+    """Throughput and latency percentiles of (seconds, status) pairs served in ``elapsed`` seconds."""
+    latencies = [seconds for seconds, status in results]
+    return {
+        'requests': len(results),
+        'errors': sum(status != 200 for seconds, status in results),
+        'rps': len(results) / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+    }
+
+
+def wsgi_load(application, url, host, cookie, requests, concurrency):
+    """
+    Call a WSGI application ``requests`` times from ``concurrency`` threads, the
+    way a threaded WSGI server would, and summarize the latencies.
+    """
+    parts = urlsplit(url)
+
+    def call(_):
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'SCRIPT_NAME': '',
+            'PATH_INFO': parts.path,
+            'QUERY_STRING': parts.query,
+            'SERVER_NAME': host,
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': host,
+            'HTTP_COOKIE': cookie,
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': BytesIO(),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        statuses = []
+        start = time.perf_counter()
+        response = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+        try:
+            for _chunk in response:
+                pass
+        finally:
+            response.close()
+        return time.perf_counter() - start, int(statuses[0].split()[0])
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        start = time.perf_counter()
+        results = list(pool.map(call, range(requests)))
+        return load_summary(results, time.perf_counter() - start)
+
+
+def asgi_load(application, url, host, cookie, requests, concurrency):
+    """
+    Send ``requests`` requests to an ASGI application on one event loop, at most
+    ``concurrency`` in flight at once, and summarize the latencies.
+    """
+    parts = urlsplit(url)
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': parts.path,
+        'raw_path': parts.path.encode(),
+        'query_string': parts.query.encode(),
+        'root_path': '',
+        'headers': [(b'host', host.encode()), (b'cookie', cookie.encode())],
+        'server': (host, 80),
+        'client': ('127.0.0.1', 0),
+    }
+
+    async def call(slots):
+        async with slots:
+            requested = asyncio.Event()
+            statuses = []
+
+            async def receive():
+                if requested.is_set():
+                    # Nothing follows the body; Django waits here for a disconnect
+                    await asyncio.Future()
+                requested.set()
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+
+            start = time.perf_counter()
+            await application(dict(scope), receive, send)
+            return time.perf_counter() - start, statuses[0]
+
+    async def run():
+        slots = asyncio.Semaphore(concurrency)
+        start = time.perf_counter()
+        results = await asyncio.gather(*[call(slots) for _ in range(requests)])
+        return load_summary(results, time.perf_counter() - start)
+
+    return asyncio.run(run())
+
+
+def log_sessions(user_id, sessions, rows, seed=0):
+    """
+    Log ``sessions`` workout sessions of ``rows`` exercises for the user through
+    the batch save path, one transaction each. Returns the start and end wall
+    clock times, the latency of every write and how many failed on a lock.
+    """
+    rng = random.Random(seed)
+    user = User.objects.get(pk=user_id)
+    plan = WorkoutPlan.objects.filter(user=user).first()
+    exercises = list(Exercise.objects.filter(user=user).values_list('id', flat=True))
+    latencies, locked = [], 0
+    started = time.time()
+    for i in range(sessions):
+        payload = {
+            'workout_plan': plan.pk,
+            'date': (plan.start_date + timedelta(days=i % 28)).isoformat(),
+            'duration': rng.randint(1800, 5400),
+            'notes': '',
+            'exercises': [
+                {'exercise': exercise, 'repetitions': rng.randint(5, 12), 'sets': rng.randint(3, 5), 'weight_used': rng.choice([None, 40.0, 60.0, 80.0])}
+                for exercise in rng.sample(exercises, min(rows, len(exercises)))
+            ],
+        }
+        start = time.perf_counter()
+        try:
+            save_batch(validate_batch(user, payload), WorkoutSession())
+        except OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            locked += 1
+        latencies.append(time.perf_counter() - start)
+    return {'started': started, 'finished': time.time(), 'latencies': latencies, 'locked': locked}
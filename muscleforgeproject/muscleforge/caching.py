@@ -0,0 +1,80 @@
+import time
+
+from django.core.cache import cache
+from django.core.cache.backends import db, locmem
+
+from .metrics import metrics
+
+MISSING = object()
+HIT = (('result', 'hit'),)
+MISS = (('result', 'miss'),)
+
+
+class CountingCacheMixin:
+    """Counts a cache backend's hits and misses for the metrics endpoint."""
+
+    def get(self, key, default=None, version=None):
+        # aget() and the {% cache %} tag read through get()
+        value = super().get(key, MISSING, version)
+        if value is MISSING:
+            metrics.inc('muscleforge_cache_gets_total', MISS)
+            return default
+        metrics.inc('muscleforge_cache_gets_total', HIT)
+        return value
+
+
+class LocMemCache(CountingCacheMixin, locmem.LocMemCache):
+    """Django's local memory cache, private to each process."""
+
+
+class DatabaseCache(CountingCacheMixin, db.DatabaseCache):
+    """Django's database cache, shared by every worker process."""
+
+
+def version_key(namespace, user_id):
+    return f'muscleforge:{namespace}:version:{user_id}'
+
+
+def get_version(namespace, user_id):
+    """
+    Return the user's current version for ``namespace``. Versions are write
+    timestamps in nanoseconds, so a version lost to eviction is replaced by a
+    newer one instead of restarting at a value an old cache entry may still use.
+    """
+    key = version_key(namespace, user_id)
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+async def aget_version(namespace, user_id):
+    """get_version() for async views, which can't read a database cache synchronously."""
+    key = version_key(namespace, user_id)
+    version = await cache.aget(key)
+    if version is None:
+        version = time.time_ns()
+        if not await cache.aadd(key, version, timeout=None):
+            version = await cache.aget(key, version)
+    return version
+
+
+def bump_version(namespace, user_id):
+    """Invalidate every entry cached under ``namespace`` for the user."""
+    key = version_key(namespace, user_id)
+    version = max(time.time_ns(), (cache.get(key) or 0) + 1)
+    cache.set(key, version, timeout=None)
+    return version
+
+
+def versioned_key(namespace, user_id, *parts):
+    version = get_version(namespace, user_id)
+    return ':'.join(['muscleforge', namespace, str(user_id), str(version), *map(str, parts)])
+
+
+async def aversioned_key(namespace, user_id, *parts):
+    """versioned_key() for async views."""
+    version = await aget_version(namespace, user_id)
+    return ':'.join(['muscleforge', namespace, str(user_id), str(version), *map(str, parts)])
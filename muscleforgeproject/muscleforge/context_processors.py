@@ -0,0 +1,38 @@
+from django.contrib.staticfiles.storage import staticfiles_storage
+
+from .caching import get_version
+
+# URL name prefixes and the sidebar section they belong to
+SECTIONS = [
+    ('muscleforge-home', 'home'),
+    ('workoutplan', 'workoutplans'),
+    ('workoutsession', 'workoutplans'),
+    ('workout-import', 'workoutplans'),
+    ('exercise', 'exercises'),
+    ('goal', 'goals'),
+]
+
+
+def layout(request):
+    """
+    The active sidebar section, the user's 'layout' version and the static
+    manifest version, which the cached fragments of the base templates vary on.
+    Saving a profile bumps the layout version, so the topbar never shows an old
+    name or picture, and collectstatic changes the manifest version, so the
+    fragments never link replaced assets.
+    """
+    match = request.resolver_match
+    name = (match.url_name or '') if match else ''
+    section = next((section for prefix, section in SECTIONS if name.startswith(prefix)), None)
+
+    def layout_version():
+        # Called by the template only where it's used, so pages without the topbar never load the user
+        user = getattr(request, 'user', None)
+        return get_version('layout', user.id) if user is not None and user.is_authenticated else None
+
+    return {'section': section, 'layout_version': layout_version, 'static_version': static_version()}
+
+
+def static_version():
+    """The hash of the collected static manifest, or '' when nothing is collected."""
+    return getattr(staticfiles_storage, 'manifest_hash', '')
@@ -0,0 +1,79 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Count, OuterRef, Q, Subquery
+
+from .caching import aversioned_key, versioned_key
+from .models import WorkoutPlan, WorkoutSession
+
+DASHBOARD_TIMEOUT = 60 * 60 * 24
+
+PLAN_FIELDS = ['id', 'title', 'start_date', 'end_date', 'status']
+SESSION_FIELDS = ['id', 'date', 'notes']
+
+
+def get_dashboard(user):
+    """Return the home page summary for ``user``, computing it on a cache miss."""
+    today = date.today()
+    # The summary depends on the date, so it's part of the key
+    key = versioned_key('dashboard', user.id, today.isoformat())
+    summary = cache.get(key)
+    if summary is None:
+        summary = build_dashboard(user.id, today)
+        cache.set(key, summary, DASHBOARD_TIMEOUT)
+    return summary
+
+
+async def aget_dashboard(user):
+    """get_dashboard() for async views."""
+    today = date.today()
+    key = await aversioned_key('dashboard', user.id, today.isoformat())
+    summary = await cache.aget(key)
+    if summary is None:
+        summary = dashboard_summary(await dashboard_query(user.id, today).aget())
+        await cache.aset(key, summary, DASHBOARD_TIMEOUT)
+    return summary
+
+
+def build_dashboard(user_id, today):
+    return dashboard_summary(dashboard_query(user_id, today).get())
+
+
+def dashboard_query(user_id, today):
+    """
+    Load the next upcoming plan, its first upcoming session and the goal counts
+    in a single query against the user's row.
+    """
+    upcoming_plans = WorkoutPlan.objects.filter(
+        user=OuterRef('pk'), start_date__gte=today, status=False
+    ).order_by('start_date', 'pk')
+    upcoming_sessions = WorkoutSession.objects.filter(
+        workout_plan=OuterRef('plan_id'), date__gte=today
+    ).order_by('pk')
+
+    annotations = {f'plan_{field}': Subquery(upcoming_plans.values(field)[:1]) for field in PLAN_FIELDS}
+    session_annotations = {f'session_{field}': Subquery(upcoming_sessions.values(field)[:1]) for field in SESSION_FIELDS}
+    return User.objects.filter(pk=user_id).annotate(
+        total_goals=Count('goal'),
+        completed_goals=Count('goal', filter=Q(goal__status=True)),
+        **annotations,
+    ).annotate(**session_annotations).values(
+        'total_goals', 'completed_goals', *annotations, *session_annotations
+    )
+
+
+def dashboard_summary(row):
+    active_plan = None
+    active_session = None
+    if row['plan_id'] is not None:
+        active_plan = {field: row[f'plan_{field}'] for field in PLAN_FIELDS}
+    if row['session_id'] is not None:
+        active_session = {field: row[f'session_{field}'] for field in SESSION_FIELDS}
+
+    return {
+        'active_plan': active_plan,
+        'total_goals': row['total_goals'],
+        'completed_goals': row['completed_goals'],
+        'active_session': active_session,
+    }
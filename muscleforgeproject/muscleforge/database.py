@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .instrumentation import record_query
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """
+    Set MUSCLEFORGE_SQLITE_PRAGMAS on every new SQLite connection. Pragmas are
+    per connection (journal_mode=WAL is also stored in the file), so with
+    persistent connections this runs once per worker rather than per request.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.MUSCLEFORGE_SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(connection_created)
+def instrument_queries(sender, connection, **kwargs):
+    # Reconnecting fires this again for the same wrapper
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
@@ -1,6 +1,16 @@
 from django import forms
-from django.forms import inlineformset_factory
-from .models import WorkoutPlan, WorkoutSession, ExerciseInSession, Goal
+from django.core.exceptions import ValidationError
+from django.forms import BaseInlineFormSet, inlineformset_factory
+from django.urls import reverse
+from .autocomplete import get_index
+from .models import WorkoutPlan, WorkoutSession, Exercise, ExerciseInSession, Goal
+
+# The largest values the columns hold on every database Django supports, so
+# larger numbers are field errors rather than failed inserts
+MAX_INTEGER = 2 ** 31 - 1
+MAX_ID = 2 ** 63 - 1
+# DurationField stores microseconds in a 64-bit integer
+MAX_DURATION_SECONDS = MAX_ID // 10 ** 6
 
 class WorkoutPlanForm(forms.ModelForm):
     class Meta:
@@ -19,13 +29,99 @@ class WorkoutSessionForm(forms.ModelForm):
             'date': forms.DateInput(attrs={'type': 'date'}),
         }
 
+class ExerciseAutocompleteWidget(forms.TextInput):
+    """
+    A text box that suggests the user's exercises as they type, with the
+    chosen exercise's id in a hidden input, instead of a <select> of them all.
+    """
+    template_name = 'muscleforge/widgets/exercise_autocomplete.html'
+
+    def __init__(self, attrs=None):
+        super().__init__(attrs)
+        self.index = None
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        exercise = self.index.exercise(value) if self.index is not None and value else None
+        context['widget'].update({
+            'exercise_name': exercise.name if exercise else '',
+            'url': reverse('api-exercise-autocomplete'),
+        })
+        return context
+
+class ExerciseChoiceField(forms.Field):
+    """
+    One of the exercises in ``index``, the user's ExerciseIndex, which both
+    validates the id and names it, so the forms of a formset run no queries.
+    """
+    widget = ExerciseAutocompleteWidget
+    default_error_messages = {
+        'invalid_choice': 'Select one of your exercises.',
+    }
+
+    def __init__(self, index=None, **kwargs):
+        super().__init__(**kwargs)
+        self.index = index
+
+    @property
+    def index(self):
+        return self._index
+
+    @index.setter
+    def index(self, index):
+        self._index = self.widget.index = index
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        exercise = self._index.exercise(value) if self._index is not None else None
+        if exercise is None:
+            raise ValidationError(self.error_messages['invalid_choice'], code='invalid_choice')
+        return exercise
+
+    def has_changed(self, initial, data):
+        if self.disabled:
+            return False
+        return str('' if initial is None else initial) != str('' if data is None else data)
+
 class ExerciseInSessionForm(forms.ModelForm):
+    exercise = ExerciseChoiceField()
+
     class Meta:
         model = ExerciseInSession
         fields = ['exercise', 'repetitions', 'sets', 'weight_used'] #excluded durations
 
+    def __init__(self, *args, index=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['exercise'].index = index
+
+    def _get_validation_exclusions(self):
+        # The formset checks every row's exercise still exists with one query; the model would run one per row
+        return {*super()._get_validation_exclusions(), 'exercise'}
+
+class BaseExerciseInSessionFormSet(BaseInlineFormSet):
+    """Shares the user's ExerciseIndex, kept between requests, with every form and the empty form."""
+
+    def __init__(self, *args, user, **kwargs):
+        self.user = user
+        kwargs['form_kwargs'] = {**kwargs.get('form_kwargs', {}), 'index': get_index(user.pk)}
+        super().__init__(*args, **kwargs)
+
+    def clean(self):
+        super().clean()
+        # The index may predate an exercise's deletion, so what will be saved is checked with one query
+        forms = [
+            form for form in self.forms
+            if form.cleaned_data.get('exercise') and not (self.can_delete and self._should_delete_form(form))
+        ]
+        chosen = {form.cleaned_data['exercise'].pk for form in forms}
+        existing = set(Exercise.objects.filter(user=self.user, pk__in=chosen).values_list('pk', flat=True)) if chosen else set()
+        for form in forms:
+            if form.cleaned_data['exercise'].pk not in existing:
+                form.add_error('exercise', ValidationError(form.fields['exercise'].error_messages['invalid_choice'], code='invalid_choice'))
+
 ExerciseInSessionFormSet = inlineformset_factory(
-    WorkoutSession, ExerciseInSession, form=ExerciseInSessionForm,
+    WorkoutSession, ExerciseInSession, form=ExerciseInSessionForm, formset=BaseExerciseInSessionFormSet,
     extra=1, can_delete=True, can_delete_extra=True
 )
 
@@ -37,3 +133,22 @@ class GoalForm(forms.ModelForm):
             'start_date': forms.DateInput(attrs={'type': 'date'}),
             'end_date': forms.DateInput(attrs={'type': 'date'}),
         }
+
+class WorkoutImportForm(forms.Form):
+    FORMAT_CHOICES = [('', 'Detect from file name'), ('csv', 'CSV'), ('json', 'JSON')]
+
+    file = forms.FileField(help_text='One row per set or exercise, with date, exercise, reps and optionally sets, weight, workout, notes and duration (seconds) columns.')
+    file_format = forms.ChoiceField(choices=FORMAT_CHOICES, required=False, label='Format')
+
+class SessionBatchForm(forms.Form):
+    workout_plan = forms.IntegerField(min_value=1, max_value=MAX_ID)
+    date = forms.DateField()
+    duration = forms.IntegerField(min_value=0, max_value=MAX_DURATION_SECONDS, required=False)  # seconds
+    notes = forms.CharField(required=False)
+
+class ExerciseRowForm(forms.Form):
+    id = forms.IntegerField(min_value=1, max_value=MAX_ID, required=False)
+    exercise = forms.IntegerField(min_value=1, max_value=MAX_ID)
+    repetitions = forms.IntegerField(min_value=0, max_value=MAX_INTEGER)
+    sets = forms.IntegerField(min_value=0, max_value=MAX_INTEGER)
+    weight_used = forms.FloatField(min_value=0, required=False)
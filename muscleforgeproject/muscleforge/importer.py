@@ -0,0 +1,263 @@
+import calendar
+import csv
+import io
+import json
+import math
+import re
+from collections import namedtuple
+from datetime import date, timedelta
+from itertools import groupby
+
+from django.db import transaction
+
+from .forms import MAX_INTEGER
+from .models import WorkoutPlan, Exercise, WorkoutSession, ExerciseInSession
+from .records import rebuild_records
+from .signals import EXERCISE_NAMESPACES, TRAINING_NAMESPACES, invalidate
+from .volume import rebuild_volume
+
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 20
+
+# Column names used by other trackers' exports, after normalize_header
+COLUMN_ALIASES = {
+    'date': 'date', 'day': 'date', 'workout_date': 'date', 'start_time': 'date',
+    'exercise': 'exercise', 'exercise_name': 'exercise', 'exercise_title': 'exercise',
+    'repetitions': 'repetitions', 'reps': 'repetitions',
+    'sets': 'sets', 'set_count': 'sets',
+    'weight': 'weight_used', 'weight_used': 'weight_used', 'weight_kg': 'weight_used', 'weight_lbs': 'weight_used',
+    'workout': 'workout', 'workout_name': 'workout', 'session': 'workout', 'title': 'workout',
+    'notes': 'notes', 'workout_notes': 'notes',
+    'duration': 'duration', 'duration_seconds': 'duration',
+}
+
+ImportRow = namedtuple('ImportRow', 'line date workout exercise repetitions sets weight_used notes duration')
+
+
+class FieldError(ValueError):
+    pass
+
+
+class WorkoutImportError(Exception):
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__('; '.join(errors[:MAX_REPORTED_ERRORS]))
+
+
+def normalize_header(name):
+    return re.sub(r'\W+', '_', str(name).strip().lower()).strip('_')
+
+
+def read_records(file, file_format=None, name=''):
+    """
+    Read an uploaded or opened binary file as a list of dicts, one per logged
+    set or exercise. ``file_format`` is 'csv' or 'json' and defaults to the
+    file extension; JSON may be a list of objects, an object with a "rows"
+    list, or one object per line.
+    """
+    if not file_format:
+        file_format = 'json' if name.lower().endswith(('.json', '.ndjson', '.jsonl')) else 'csv'
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    try:
+        if file_format == 'csv':
+            records = list(csv.DictReader(text))
+        else:
+            content = text.read()
+            try:
+                records = json.loads(content)
+            except ValueError:
+                records = [json.loads(line) for line in content.splitlines() if line.strip()]
+            if isinstance(records, dict):
+                records = records.get('rows', [])
+    except (UnicodeDecodeError, ValueError, csv.Error) as e:
+        raise WorkoutImportError([f'Could not read the file: {e}'])
+    finally:
+        text.detach()
+
+    if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+        raise WorkoutImportError(['Expected a list of rows'])
+    return records
+
+
+def normalize_record(record):
+    """Rename a record's keys to our field names using COLUMN_ALIASES, dropping unknown columns."""
+    normalized = {}
+    for key, value in record.items():
+        key = COLUMN_ALIASES.get(normalize_header(key))
+        if key is not None:
+            normalized.setdefault(key, value)
+    return normalized
+
+
+def parse_date(value):
+    # Accepts dates and the "2024-01-31 18:05:00" timestamps most trackers export
+    return date.fromisoformat(str(value).strip()[:10])
+
+
+def parse_count(value, default=None):
+    if value is None or str(value).strip() == '':
+        if default is None:
+            raise FieldError('is required')
+        return default
+    number = float(value)
+    # is_integer() is False for inf and nan too
+    if not number.is_integer() or number < 0:
+        raise FieldError('must be a whole number of at least 0')
+    if number > MAX_INTEGER:
+        raise FieldError(f'must be at most {MAX_INTEGER}')
+    return int(number)
+
+
+def parse_weight(value):
+    if value is None or str(value).strip() == '':
+        return None
+    weight = float(value)
+    if not math.isfinite(weight):
+        raise FieldError('must be a number')
+    if weight < 0:
+        raise FieldError('must not be negative')
+    return weight
+
+
+def parse_row(line, record):
+    errors = []
+
+    def field(name, parse):
+        try:
+            return parse(record.get(name))
+        except FieldError as e:
+            errors.append(f'Row {line}: {name} {e}')
+        except (TypeError, ValueError, OverflowError):
+            errors.append(f'Row {line}: invalid {name} {record.get(name)!r}')
+
+    exercise = str(record.get('exercise') or '').strip()
+    if not exercise:
+        errors.append(f'Row {line}: exercise is required')
+    elif len(exercise) > Exercise._meta.get_field('name').max_length:
+        errors.append(f'Row {line}: exercise name is too long')
+
+    row = ImportRow(
+        line=line,
+        date=field('date', parse_date),
+        workout=str(record.get('workout') or '').strip(),
+        exercise=exercise,
+        repetitions=field('repetitions', parse_count),
+        sets=field('sets', lambda value: parse_count(value, default=1)),
+        weight_used=field('weight_used', parse_weight),
+        notes=str(record.get('notes') or '').strip(),
+        duration=field('duration', lambda value: parse_count(value, default=0)),
+    )
+    return row, errors
+
+
+def validate_rows(records):
+    """
+    Check every record in one pass and return them as ImportRows, or raise
+    WorkoutImportError listing the bad rows. Nothing is written unless the
+    whole file is valid. Lines are numbered as in a CSV file with a header.
+    """
+    rows, errors = [], []
+    for line, record in enumerate(records, start=2):
+        row, row_errors = parse_row(line, normalize_record(record))
+        rows.append(row)
+        errors.extend(row_errors)
+    if errors:
+        raise WorkoutImportError(errors)
+    return rows
+
+
+def match_exercises(user, names):
+    """Map each exercise name, case-insensitively, to one of the user's Exercise ids, creating the missing ones."""
+    by_name = {}
+    for exercise_id, name in Exercise.objects.filter(user=user).order_by('id').values_list('id', 'name'):
+        by_name.setdefault(name.lower(), exercise_id)
+
+    missing = {}
+    for name in names:
+        missing.setdefault(name.lower(), name)
+    new = [
+        Exercise(user=user, name=name, difficulty_level='Unknown', exercise_type='Imported', equipment_needed='Unknown')
+        for key, name in missing.items() if key not in by_name
+    ]
+    for exercise in Exercise.objects.bulk_create(new):
+        by_name[exercise.name.lower()] = exercise.pk
+    if new:
+        # bulk_create skips the receiver that invalidates the exercise caches
+        invalidate(user.pk, EXERCISE_NAMESPACES)
+    return by_name, len(new)
+
+
+def month_plans(user, days):
+    """Create one WorkoutPlan per calendar month the imported sessions fall in."""
+    months = sorted({day.replace(day=1) for day in days})
+    today = date.today()
+    plans = []
+    for month in months:
+        end = month.replace(day=calendar.monthrange(month.year, month.month)[1])
+        plans.append(WorkoutPlan(user=user, title=f'Imported {month:%B %Y}', start_date=month, end_date=end, status=end < today))
+    return {plan.start_date: plan.pk for plan in WorkoutPlan.objects.bulk_create(plans)}
+
+
+def session_groups(rows):
+    """
+    Group rows into sessions by date and workout name, merging consecutive sets
+    of the same exercise, reps and weight into one ExerciseInSession row.
+    """
+    rows = sorted(rows, key=lambda row: (row.date, row.workout, row.line))
+    for (day, workout), session_rows in groupby(rows, key=lambda row: (row.date, row.workout)):
+        session_rows = list(session_rows)
+        entries = []
+        for key, sets in groupby(session_rows, key=lambda row: (row.exercise.lower(), row.repetitions, row.weight_used)):
+            entries.append((*key, sum(row.sets for row in sets)))
+        notes = '\n'.join(dict.fromkeys(row.notes for row in session_rows if row.notes))
+        duration = max(row.duration for row in session_rows)
+        yield day, workout, notes, duration, entries
+
+
+def import_workouts(user, records, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Import workout log records (see read_records) for ``user``. Sessions and
+    their exercises are bulk inserted ``batch_size`` sessions at a time, then
+    the user's read models are rebuilt once and their caches invalidated. It
+    all runs in one transaction, so a failed import leaves nothing behind.
+    """
+    rows = validate_rows(records)
+    summary = {'exercises_created': 0, 'plans': 0, 'sessions': 0, 'entries': 0}
+    if not rows:
+        return summary
+
+    with transaction.atomic():
+        exercises, summary['exercises_created'] = match_exercises(user, {row.exercise for row in rows})
+        plans = month_plans(user, {row.date for row in rows})
+        summary['plans'] = len(plans)
+
+        groups = session_groups(rows)
+        while batch := [group for _, group in zip(range(batch_size), groups)]:
+            sessions = WorkoutSession.objects.bulk_create([
+                WorkoutSession(
+                    workout_plan_id=plans[day.replace(day=1)],
+                    date=day,
+                    notes='\n'.join(filter(None, [workout, notes])),
+                    duration=timedelta(seconds=duration) if duration else None,
+                )
+                for day, workout, notes, duration, _ in batch
+            ])
+            entries = ExerciseInSession.objects.bulk_create([
+                ExerciseInSession(
+                    workout_session_id=session.pk,
+                    exercise_id=exercises[exercise],
+                    repetitions=repetitions,
+                    weight_used=weight_used,
+                    sets=sets,
+                )
+                for session, (*_, session_entries) in zip(sessions, batch)
+                for exercise, repetitions, weight_used, sets in session_entries
+            ])
+            summary['sessions'] += len(sessions)
+            summary['entries'] += len(entries)
+
+        # bulk_create skips the signals that keep these up to date
+        rebuild_volume([user.pk])
+        rebuild_records([user.pk])
+    invalidate(user.pk, TRAINING_NAMESPACES)
+    return summary
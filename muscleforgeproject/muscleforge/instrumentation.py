@@ -0,0 +1,91 @@
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.template.backends import django as django_backend
+
+from .querylog import query_log
+
+# The RequestTimings of the request being handled, if it is instrumented. A
+# context variable rather than a thread local, so queries that async views run
+# through sync_to_async are counted against the request that awaited them.
+current_timings = ContextVar('muscleforge_timings', default=None)
+
+
+class RequestTimings:
+    """
+    Where a request spent its time, in seconds. ``db``, ``template`` and
+    ``view`` add up to ``total``: queries run while rendering count as db
+    time, and view is everything else (the view and the middleware).
+    """
+    __slots__ = ('queries', 'db', 'rendering', 'render', 'render_db', 'total', 'view_name', 'log_queries')
+
+    def __init__(self, log_queries=False):
+        # Whether to add each query to the query log, under view_name once the view is resolved
+        self.log_queries = log_queries
+        self.view_name = None
+        self.queries = 0
+        self.db = 0.0
+        self.rendering = False
+        self.render = 0.0
+        # Part of db spent in queries the templates triggered
+        self.render_db = 0.0
+        self.total = 0.0
+
+    @property
+    def template(self):
+        return self.render - self.render_db
+
+    @property
+    def view(self):
+        return max(self.total - self.db - self.template, 0.0)
+
+    def server_timing(self):
+        return (
+            f'db;dur={self.db * 1000:.1f};desc="{self.queries} queries", '
+            f'tpl;dur={self.template * 1000:.1f}, '
+            f'view;dur={self.view * 1000:.1f}, '
+            f'total;dur={self.total * 1000:.1f}'
+        )
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper that adds each query to the current request's timings."""
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = perf_counter() - start
+        timings.queries += 1
+        timings.db += elapsed
+        if timings.rendering:
+            timings.render_db += elapsed
+        if timings.log_queries:
+            query_log.record(timings.view_name, sql, params, many, elapsed, context['connection'])
+
+
+class TimedTemplate(django_backend.Template):
+    def render(self, context=None, request=None):
+        timings = current_timings.get()
+        # Templates rendered from a template (e.g. crispy forms) are part of the outer render
+        if timings is None or timings.rendering:
+            return super().render(context, request)
+        timings.rendering = True
+        start = perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timings.render += perf_counter() - start
+            timings.rendering = False
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """The Django template backend, with render times added to the current request's timings."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
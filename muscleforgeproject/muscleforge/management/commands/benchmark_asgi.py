@@ -0,0 +1,86 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.test import Client
+
+from muscleforge.async_views import ASYNC_VIEWS
+from muscleforge.benchmark import benchmark_routes, asgi_load, wsgi_load
+from muscleforge.management.helpers import benchmark_user
+
+# (label, server, MUSCLEFORGE_ASYNC_ROUTES) for each configuration compared
+CONFIGURATIONS = [
+    ('wsgi', 'wsgi', ''),
+    ('asgi sync views', 'asgi', ''),
+    ('asgi async views', 'asgi', '*'),
+]
+
+
+class Command(BaseCommand):
+    help = "Compare throughput and tail latency of the read-heavy pages under WSGI, ASGI and ASGI with async views"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', help='Account to request the pages as, defaults to the first user with a workout plan')
+        parser.add_argument('--requests', type=int, default=400, help='Requests per route')
+        parser.add_argument('--concurrency', type=int, default=64, help='Requests in flight at once')
+        parser.add_argument('--routes', help='Comma separated route names, defaults to every route with an async view')
+        parser.add_argument('--server', choices=['wsgi', 'asgi'],
+                            help='Measure one entry point in this process and print JSON; without it each '
+                                 'configuration runs in its own process, so URLs are loaded with its async routes')
+
+    def handle(self, *args, **options):
+        user = benchmark_user(options['username'])
+        names = options['routes'].split(',') if options['routes'] else list(ASYNC_VIEWS)
+        routes = [(name, url) for name, url in benchmark_routes(user) if name in names]
+        if len(routes) != len(names):
+            raise CommandError(f"Unknown route(s): {', '.join(sorted(set(names) - {name for name, url in routes}))}")
+
+        if options['server']:
+            self.stdout.write(json.dumps(self.measure(user, routes, options)))
+            return
+
+        results = {}
+        for label, server, async_routes in CONFIGURATIONS:
+            command = [
+                sys.executable, str(settings.BASE_DIR / 'manage.py'), 'benchmark_asgi', '--server', server,
+                '--username', user.username, '--routes', ','.join(names),
+                '--requests', str(options['requests']), '--concurrency', str(options['concurrency']),
+            ]
+            env = {**os.environ, 'MUSCLEFORGE_ASYNC_ROUTES': async_routes}
+            finished = subprocess.run(command, env=env, capture_output=True, text=True)
+            if finished.returncode:
+                raise CommandError(f'{label} run failed:\n{finished.stderr}')
+            results[label] = json.loads(finished.stdout.strip().splitlines()[-1])
+
+        self.stdout.write(f"{'route':<24}{'entry point':<20}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+        for name, url in routes:
+            for label, result in results.items():
+                row = result[name]
+                self.stdout.write(
+                    f"{name:<24}{label:<20}{row['rps']:>9.1f}{row['p50_ms']:>9.1f}"
+                    f"{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}{row['errors']:>8}"
+                )
+
+    def measure(self, user, routes, options):
+        host = next((host for host in settings.ALLOWED_HOSTS if host != '*' and not host.startswith('.')), 'localhost')
+        client = Client()
+        client.force_login(user)
+        cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+        if options['server'] == 'wsgi':
+            application, load = get_wsgi_application(), wsgi_load
+        else:
+            application, load = get_asgi_application(), asgi_load
+        try:
+            results = {}
+            for name, url in routes:
+                # Warm up template and URL caches so they don't land in the tail
+                load(application, url, host, cookie, 1, 1)
+                results[name] = load(application, url, host, cookie, options['requests'], options['concurrency'])
+            return results
+        finally:
+            client.logout()
@@ -0,0 +1,58 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+
+from muscleforge.benchmark import log_sessions, percentile
+from muscleforge.models import WorkoutPlan
+
+
+class Command(BaseCommand):
+    help = "Log workout sessions from many processes at once and report write throughput, latency and lock errors"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help='Processes writing at the same time')
+        parser.add_argument('--sessions', type=int, default=50, help='Sessions logged by each worker')
+        parser.add_argument('--rows', type=int, default=6, help='Exercise rows per session')
+        parser.add_argument('--prefix', default='writebench', help='Username prefix of the accounts created for the run')
+        parser.add_argument('--keep', action='store_true', help="Keep the accounts and their sessions afterwards")
+
+    def handle(self, *args, **options):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            journal_mode = cursor.fetchone()[0]
+
+        users = []
+        for i in range(options['workers']):
+            user, _ = User.objects.get_or_create(username=f"{options['prefix']}{i}")
+            WorkoutPlan.objects.get_or_create(user=user, title='Write benchmark', defaults={
+                'start_date': date.today(), 'end_date': date.today() + timedelta(days=28),
+            })
+            users.append(user)
+
+        # Forked workers, like a pre-forking server's, must open their own connections
+        connections.close_all()
+        try:
+            with ProcessPoolExecutor(options['workers'], mp_context=multiprocessing.get_context('fork')) as pool:
+                futures = [pool.submit(log_sessions, user.pk, options['sessions'], options['rows'], seed) for seed, user in enumerate(users)]
+                results = [future.result() for future in futures]
+        finally:
+            if not options['keep']:
+                User.objects.filter(pk__in=[user.pk for user in users]).delete()
+
+        latencies = [latency for result in results for latency in result['latencies']]
+        locked = sum(result['locked'] for result in results)
+        elapsed = max(result['finished'] for result in results) - min(result['started'] for result in results)
+        self.stdout.write(f"profile {settings.MUSCLEFORGE_DB_PROFILE}, journal_mode {journal_mode}, {options['workers']} workers")
+        self.stdout.write(
+            f'{len(latencies) - locked} sessions written in {elapsed:.1f}s ({(len(latencies) - locked) / elapsed:.1f}/s), '
+            f'{locked} failed with "database is locked"'
+        )
+        self.stdout.write(
+            f'write latency p50 {percentile(latencies, 50) * 1000:.1f} ms, '
+            f'p95 {percentile(latencies, 95) * 1000:.1f} ms, p99 {percentile(latencies, 99) * 1000:.1f} ms'
+        )
@@ -0,0 +1,71 @@
+import re
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from muscleforge.benchmark import benchmark_routes
+from muscleforge.management.helpers import benchmark_user
+
+# "SCAN <table>" without "USING INDEX" is SQLite reading every row of the table
+FULL_SCAN = re.compile(r'\bSCAN (?!CONSTANT ROW)(?P<table>\w+)\b(?! USING (COVERING )?INDEX)')
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def full_scans(plan):
+    return [line for line in plan if FULL_SCAN.search(line)]
+
+
+class Command(BaseCommand):
+    help = "Run EXPLAIN QUERY PLAN on the queries every view issues and flag full table scans"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', help='Account to request the pages as, defaults to the first user with a workout plan')
+        parser.add_argument('--analyze', action='store_true', help='Run ANALYZE first so the planner has table statistics')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print the plan of every query, not only flagged ones')
+        parser.add_argument('--fail-on-scan', action='store_true', help='Exit with an error if any full table scan is found')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('explain_queries reads SQLite query plans')
+
+        user = benchmark_user(options['username'])
+        if options['analyze']:
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+        flagged = 0
+        # The requests write a login session; roll everything back afterwards
+        with transaction.atomic(), override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            client = Client()
+            client.force_login(user)
+            for name, url in benchmark_routes(user):
+                with CaptureQueriesContext(connection) as captured:
+                    client.get(url)
+                selects = [query['sql'] for query in captured if query['sql'].startswith('SELECT')]
+                self.stdout.write(self.style.MIGRATE_HEADING(f'{name} ({url}): {len(captured)} queries'))
+                for sql in selects:
+                    plan = explain(sql)
+                    scans = full_scans(plan)
+                    flagged += len(scans)
+                    if scans or options['verbose_plans']:
+                        self.stdout.write(f'  {sql}')
+                        for line in plan:
+                            style = self.style.ERROR if line in scans else str
+                            self.stdout.write(style(f'    {line}'))
+            transaction.set_rollback(True)
+
+        if flagged:
+            message = f'{flagged} full table scan(s) found'
+            if options['fail_on_scan']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS('No full table scans found'))
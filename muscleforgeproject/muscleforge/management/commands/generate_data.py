@@ -0,0 +1,151 @@
+import random
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from muscleforge.models import WorkoutPlan, Exercise, WorkoutSession, ExerciseInSession, Goal
+from muscleforge.records import rebuild_records
+from muscleforge.volume import rebuild_volume
+from users.models import UserProfile
+from users.signals import DEFAULT_EXERCISES
+
+PLAN_LENGTH = timedelta(weeks=4)
+SESSIONS_PER_WEEK = 3
+
+
+class Command(BaseCommand):
+    help = 'Generate a reproducible load-scale dataset of users with years of training history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help='Number of users to create')
+        parser.add_argument('--years', type=int, default=3, help='Years of history per user')
+        parser.add_argument('--seed', type=int, default=0, help='Seed for the random number generator')
+        parser.add_argument('--batch-size', type=int, default=100, help='Users written per transaction')
+        parser.add_argument('--prefix', default='loaduser', help='Username prefix')
+        parser.add_argument('--password', default='muscleforge', help='Password for every generated user')
+        parser.add_argument('--end-date', type=date.fromisoformat, default=None,
+                            help='Last day of generated history (YYYY-MM-DD), defaults to today')
+        parser.add_argument('--with-signals', action='store_true',
+                            help='Create users through the ORM so the users app signals run (slow)')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--users and --batch-size must be positive')
+
+        usernames = [f"{options['prefix']}{i}" for i in range(options['users'])]
+        if User.objects.filter(username__in=usernames).exists():
+            raise CommandError(f"Users with the prefix '{options['prefix']}' already exist, choose another --prefix")
+
+        self.rng = random.Random(options['seed'])
+        self.end_date = options['end_date'] or date.today()
+        self.start_date = self.end_date - timedelta(days=365 * options['years'])
+        password = make_password(options['password'])
+
+        for offset in range(0, len(usernames), options['batch_size']):
+            batch = usernames[offset:offset + options['batch_size']]
+            with transaction.atomic():
+                if options['with_signals']:
+                    users = self.create_users_with_signals(batch, password)
+                else:
+                    users = self.create_users(batch, password)
+                self.create_history(users)
+                rebuild_volume([user.pk for user in users])
+                rebuild_records([user.pk for user in users])
+            self.stdout.write(f'Created {offset + len(batch)}/{len(usernames)} users')
+
+        self.stdout.write(self.style.SUCCESS(f'Generated {len(usernames)} users'))
+
+    def create_users_with_signals(self, usernames, password):
+        users = []
+        for username in usernames:
+            user = User(username=username, email=f'{username}@example.com', password=password)
+            user.save()
+            users.append(user)
+        return users
+
+    def create_users(self, usernames, password):
+        # bulk_create skips the post_save receivers in users/signals.py, so the
+        # profile and the default exercise catalog are written here instead
+        users = User.objects.bulk_create([
+            User(username=username, email=f'{username}@example.com', password=password)
+            for username in usernames
+        ])
+        UserProfile.objects.bulk_create([UserProfile(user=user) for user in users])
+        Exercise.objects.bulk_create([
+            Exercise(user=user, **exercise)
+            for user in users
+            for exercise in DEFAULT_EXERCISES
+        ])
+        return users
+
+    def create_history(self, users):
+        rng = self.rng
+        exercises = {}
+        for exercise in Exercise.objects.filter(user__in=users).only('id', 'user_id').order_by('id'):
+            exercises.setdefault(exercise.user_id, []).append(exercise)
+
+        plans = []
+        goals = []
+        for user in users:
+            plan_start = self.start_date
+            index = 1
+            while plan_start < self.end_date:
+                plan_end = plan_start + PLAN_LENGTH
+                plans.append(WorkoutPlan(
+                    user=user,
+                    title=f'Plan {index}',
+                    start_date=plan_start,
+                    end_date=plan_end,
+                    status=plan_end < self.end_date,
+                ))
+                if rng.random() < 0.3:
+                    goals.append(Goal(
+                        user=user,
+                        title=f'Goal {len(goals) + 1}',
+                        description='Generated goal',
+                        start_date=plan_start,
+                        end_date=plan_start + PLAN_LENGTH * rng.randint(1, 6),
+                        status=rng.random() < 0.6,
+                    ))
+                plan_start = plan_end
+                index += 1
+        plans = WorkoutPlan.objects.bulk_create(plans, batch_size=1000)
+        Goal.objects.bulk_create(goals, batch_size=1000)
+
+        sessions = []
+        for plan in plans:
+            days = sorted(rng.sample(range(PLAN_LENGTH.days), SESSIONS_PER_WEEK * PLAN_LENGTH.days // 7))
+            for day in days:
+                sessions.append(WorkoutSession(
+                    workout_plan=plan,
+                    date=plan.start_date + timedelta(days=day),
+                    duration=timedelta(minutes=rng.randint(30, 100)),
+                    notes='',
+                ))
+        sessions = WorkoutSession.objects.bulk_create(sessions, batch_size=1000)
+
+        # ExerciseInSession is the largest table and nothing needs its primary keys
+        # back, so its rows skip model instantiation and go straight to executemany
+        entries = []
+        plan_users = {plan.pk: plan.user_id for plan in plans}
+        for session in sessions:
+            user_exercises = exercises[plan_users[session.workout_plan_id]]
+            for exercise in rng.sample(user_exercises, rng.randint(3, min(7, len(user_exercises)))):
+                entries.append((
+                    session.pk,
+                    exercise.pk,
+                    rng.randint(5, 15),
+                    rng.randint(2, 5),
+                    rng.choice([None, rng.randint(4, 60) * 2.5]),
+                ))
+
+        table = connection.ops.quote_name(ExerciseInSession._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {table} (workout_session_id, exercise_id, repetitions, sets, weight_used) '
+                'VALUES (%s, %s, %s, %s, %s)',
+                entries,
+            )
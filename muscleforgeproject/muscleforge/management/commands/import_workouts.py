@@ -0,0 +1,34 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from muscleforge.importer import IMPORT_BATCH_SIZE, WorkoutImportError, read_records, import_workouts
+
+
+class Command(BaseCommand):
+    help = "Import workout logs from another tracker's CSV or JSON export into a user's history"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSON file to import')
+        parser.add_argument('--username', required=True, help='Account to import the workouts into')
+        parser.add_argument('--format', dest='file_format', choices=['csv', 'json'], help='File format, defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help='Sessions inserted per transaction')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist")
+
+        try:
+            with open(options['path'], 'rb') as file:
+                records = read_records(file, options['file_format'], options['path'])
+            summary = import_workouts(user, records, batch_size=options['batch_size'])
+        except OSError as e:
+            raise CommandError(f'Could not open {options["path"]}: {e}')
+        except WorkoutImportError as e:
+            raise CommandError('\n'.join(['The file was not imported:', *e.errors]))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {summary['sessions']} sessions with {summary['entries']} exercises into "
+            f"{summary['plans']} workout plans, creating {summary['exercises_created']} exercises"
+        ))
@@ -0,0 +1,84 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.test.utils import override_settings
+
+from muscleforge.benchmark import benchmark_routes
+from muscleforge.management.helpers import benchmark_user
+from muscleforge.querylog import QueryStats, query_log, read_log
+
+SORTS = {
+    'total': lambda stats, per_request: stats.total_ms,
+    'count': lambda stats, per_request: stats.count,
+    'p95': lambda stats, per_request: stats.p95_ms,
+    # Many calls of one fingerprint per request is the N+1 pattern
+    'per-request': lambda stats, per_request: per_request,
+}
+
+
+class Command(BaseCommand):
+    help = "Print the query fingerprints that cost the most time, per view, from the query log"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', help='Query log to read, defaults to MUSCLEFORGE_QUERY_LOG_PATH')
+        parser.add_argument('--profile', action='store_true',
+                            help="Request every benchmarked page once instead of reading the log (rolled back afterwards)")
+        parser.add_argument('--username', help='Account to request the pages as with --profile, defaults to the first user with a workout plan')
+        parser.add_argument('--by', choices=['view', 'fingerprint'], default='view', help='Group by view and fingerprint, or by fingerprint alone')
+        parser.add_argument('--sort', choices=list(SORTS), default='total')
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--samples', action='store_true', help='Print the slowest logged query of each row with its plan')
+        parser.add_argument('--width', type=int, default=120, help='Characters of each fingerprint to print')
+
+    def handle(self, *args, **options):
+        if options['profile']:
+            stats, requests = self.profile(benchmark_user(options['username']))
+        else:
+            stats, requests = read_log(options['log'] or settings.MUSCLEFORGE_QUERY_LOG_PATH)
+        if not stats:
+            raise CommandError('No queries logged, set MUSCLEFORGE_QUERY_LOG=1 on the server or pass --profile')
+
+        if options['by'] == 'fingerprint':
+            stats, requests = self.by_fingerprint(stats), {None: sum(requests.values())}
+
+        rows = []
+        for (view, fingerprint), entry in stats.items():
+            per_request = entry.count / requests[view] if requests.get(view) else 0.0
+            rows.append((view, fingerprint, entry, per_request))
+        rows.sort(key=lambda row: SORTS[options['sort']](row[2], row[3]), reverse=True)
+
+        self.stdout.write(f"{'view':<32}{'req':>7}{'calls':>9}{'per req':>9}{'total ms':>11}{'p95 ms':>9}  fingerprint")
+        for view, fingerprint, entry, per_request in rows[:options['limit']]:
+            self.stdout.write(
+                f"{view or '-':<32}{requests.get(view, 0):>7}{entry.count:>9}{per_request:>9.1f}"
+                f"{entry.total_ms:>11.1f}{entry.p95_ms:>9g}  {fingerprint[:options['width']]}"
+            )
+            if options['samples'] and entry.sample:
+                sample = entry.sample
+                self.stdout.write(f"    slowest {sample['duration_ms']:.1f} ms: {sample['sql']} {sample['params']}")
+                for line in sample['plan'] or []:
+                    self.stdout.write(f'      {line}')
+
+    def by_fingerprint(self, stats):
+        merged = {}
+        for (view, fingerprint), entry in stats.items():
+            total = merged.setdefault((None, fingerprint), QueryStats())
+            total.merge(entry.count, entry.total_ms, entry.histogram)
+            if entry.sample and entry.sample['duration_ms'] >= (total.sample or {}).get('duration_ms', 0):
+                total.sample = entry.sample
+        return merged
+
+    def profile(self, user):
+        query_log.flush()
+        # The requests write a login session; roll everything back afterwards
+        with transaction.atomic(), override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'], MUSCLEFORGE_QUERY_LOG=True,
+            MUSCLEFORGE_QUERY_LOG_FLUSH=float('inf'),
+        ):
+            client = Client()
+            client.force_login(user)
+            for name, url in benchmark_routes(user):
+                client.get(url)
+            transaction.set_rollback(True)
+        return query_log.drain()
@@ -0,0 +1,23 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from muscleforge.volume import rebuild_volume
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-user, per-exercise, per-day training volume table from ExerciseInSession'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', action='append', dest='usernames',
+                            help='Only rebuild this user, can be given more than once')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows written per INSERT')
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['usernames']:
+            user_ids = list(User.objects.filter(username__in=options['usernames']).values_list('id', flat=True))
+            if len(user_ids) != len(set(options['usernames'])):
+                raise CommandError('One or more users do not exist')
+
+        created = rebuild_volume(user_ids, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {created} training volume rows'))
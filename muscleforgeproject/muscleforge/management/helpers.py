@@ -0,0 +1,20 @@
+from django.contrib.auth.models import User
+from django.core.management.base import CommandError
+
+from muscleforge.models import WorkoutPlan
+
+
+def benchmark_user(username=None):
+    """
+    The user a profiling command requests pages as: ``username``, or the first
+    user with a workout plan, as generate_data creates them.
+    """
+    if username:
+        try:
+            return User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise CommandError(f"User '{username}' does not exist")
+    user_id = WorkoutPlan.objects.values_list('user_id', flat=True).first()
+    if user_id is None:
+        raise CommandError('No user has a workout plan, run generate_data first or pass --username')
+    return User.objects.get(pk=user_id)
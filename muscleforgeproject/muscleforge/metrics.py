@@ -0,0 +1,156 @@
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from time import monotonic
+
+from django.conf import settings
+
+# Upper bounds, in seconds, of the request duration histogram buckets
+DURATION_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+# name: (type, help) of every metric, in the order they are exposed
+METRICS = {
+    'muscleforge_http_requests_total': ('counter', 'Requests handled, by URL name, method and status.'),
+    'muscleforge_http_request_duration_seconds': ('histogram', 'Time to build each response, by URL name.'),
+    'muscleforge_db_queries_total': ('counter', 'Database queries run while handling requests, by URL name.'),
+    'muscleforge_cache_gets_total': ('counter', 'Cache reads, by result.'),
+    'muscleforge_cache_hit_ratio': ('gauge', 'Share of cache reads that were hits.'),
+    'muscleforge_workout_sessions_logged_total': ('counter', 'Workout sessions created.'),
+    'muscleforge_users_registered_total': ('counter', 'Accounts created.'),
+}
+
+
+class Metrics:
+    """
+    Counters and histograms of this process. With MUSCLEFORGE_METRICS_DIR set,
+    each process writes its values to its own file there at most every
+    MUSCLEFORGE_METRICS_FLUSH seconds, and collect() adds up every file, so
+    preforked workers report as one server. Files of workers that have exited
+    are kept, and named by pid and start time so a new process given a dead
+    one's pid doesn't overwrite them, so counters never go backwards.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        # A new lock too, as a forked child may inherit one held by another thread
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.last_flush = monotonic()
+        self.started = time.time_ns()
+
+    def inc(self, name, labels=(), amount=1):
+        key = (name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        key = (name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                # Per bucket counts (the last one unbounded), then the sum of the values
+                histogram = self.histograms[key] = [0] * (len(DURATION_BUCKETS) + 1) + [0.0]
+            index = next((i for i, bound in enumerate(DURATION_BUCKETS) if value <= bound), len(DURATION_BUCKETS))
+            histogram[index] += 1
+            histogram[-1] += value
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'counters': [[name, labels, value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, labels, histogram[:]] for (name, labels), histogram in self.histograms.items()],
+            }
+
+    def flush(self, force=False):
+        directory = settings.MUSCLEFORGE_METRICS_DIR
+        if not directory or (not force and monotonic() - self.last_flush < settings.MUSCLEFORGE_METRICS_FLUSH):
+            return
+        self.last_flush = monotonic()
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'metrics-{os.getpid()}-{self.started}.json')
+        # Readers only ever see a complete file
+        temporary = f'{path}.{threading.get_ident()}.tmp'
+        with open(temporary, 'w') as file:
+            json.dump(self.snapshot(), file)
+        os.replace(temporary, path)
+
+    def collect(self):
+        """Counters and histograms of every process, keyed by (name, labels)."""
+        if not settings.MUSCLEFORGE_METRICS_DIR:
+            snapshots = [self.snapshot()]
+        else:
+            self.flush(force=True)
+            snapshots = []
+            for path in glob.glob(os.path.join(settings.MUSCLEFORGE_METRICS_DIR, 'metrics-*.json')):
+                try:
+                    with open(path) as file:
+                        snapshots.append(json.load(file))
+                except (OSError, ValueError):
+                    continue
+
+        counters, histograms = {}, {}
+        for snapshot in snapshots:
+            for name, labels, value in snapshot['counters']:
+                key = (name, tuple(map(tuple, labels)))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, histogram in snapshot['histograms']:
+                key = (name, tuple(map(tuple, labels)))
+                total = histograms.get(key)
+                histograms[key] = histogram if total is None else [a + b for a, b in zip(total, histogram)]
+        return counters, histograms
+
+
+metrics = Metrics()
+atexit.register(metrics.flush, force=True)
+# A forked worker starts from zero; what the parent counted is in the parent's file
+os.register_at_fork(after_in_child=metrics.reset)
+
+
+def observe_request(request, response, timings):
+    match = request.resolver_match
+    route = (match.url_name or match.view_name) if match else 'unmatched'
+    metrics.inc('muscleforge_http_requests_total', (('route', route), ('method', request.method), ('status', str(response.status_code))))
+    metrics.observe('muscleforge_http_request_duration_seconds', (('route', route),), timings.total)
+    metrics.inc('muscleforge_db_queries_total', (('route', route),), timings.queries)
+    metrics.flush()
+
+
+def escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def format_labels(labels):
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels) + '}' if labels else ''
+
+
+def render(counters, histograms):
+    """The metrics in the Prometheus text exposition format."""
+    hits = sum(value for (name, labels), value in counters.items() if name == 'muscleforge_cache_gets_total' and labels == (('result', 'hit'),))
+    gets = sum(value for (name, labels), value in counters.items() if name == 'muscleforge_cache_gets_total')
+    gauges = {('muscleforge_cache_hit_ratio', ()): hits / gets if gets else 0.0}
+
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+        if kind == 'histogram':
+            for (metric, labels), histogram in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip([*DURATION_BUCKETS, '+Inf'], histogram[:-1]):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{format_labels((*labels, ("le", str(bound))))} {cumulative}')
+                lines.append(f'{name}_sum{format_labels(labels)} {histogram[-1]}')
+                lines.append(f'{name}_count{format_labels(labels)} {cumulative}')
+        else:
+            values = gauges if kind == 'gauge' else counters
+            for (metric, labels), value in sorted(values.items()):
+                if metric == name:
+                    lines.append(f'{name}{format_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,164 @@
+import logging
+import mimetypes
+import os
+import re
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from .instrumentation import RequestTimings, current_timings
+from .metrics import observe_request
+from .querylog import query_log
+
+# ManifestStaticFilesStorage names, e.g. css/sb-admin-2.min.4a7c3f0e2b1d.css
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+# Preferred first
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+slow_request_logger = logging.getLogger('muscleforge.performance')
+
+
+def accepted_encodings(request):
+    return {value.split(';')[0].strip() for value in request.headers.get('Accept-Encoding', '').split(',')}
+
+
+def serve_asset(request, name):
+    """
+    Respond with the collected static file ``name`` from STATIC_ROOT, or None
+    if there isn't one. Precompressed variants are sent to clients that accept
+    them. Hashed names never change content, so browsers may keep them for a
+    year without revalidating; other names are revalidated every time.
+    """
+    try:
+        path = safe_join(settings.STATIC_ROOT, name)
+    except SuspiciousFileOperation:
+        return None
+    if not os.path.isfile(path):
+        return None
+
+    stat = os.stat(path)
+    immutable = bool(HASHED_NAME.search(name))
+    if not immutable and not was_modified_since(request.headers.get('If-Modified-Since'), stat.st_mtime):
+        return HttpResponseNotModified()
+
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    accepted = accepted_encodings(request)
+    encoding = None
+    for candidate, extension in ENCODINGS:
+        if candidate in accepted and os.path.isfile(path + extension):
+            path, encoding = path + extension, candidate
+            break
+
+    response = FileResponse(open(path, 'rb'), content_type=content_type)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Last-Modified'] = http_date(stat.st_mtime)
+    response.headers['Cache-Control'] = IMMUTABLE if immutable else 'public, no-cache'
+    return response
+
+
+class StaticAssetMiddleware:
+    """
+    Serve collected static files ahead of the rest of the stack when
+    MUSCLEFORGE_SERVE_STATIC is set, so they skip sessions, auth and the URL
+    resolver. Requests for files that aren't collected fall through.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.asset_response(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        return self.asset_response(request) or await self.get_response(request)
+
+    def asset_response(self, request):
+        if settings.MUSCLEFORGE_SERVE_STATIC and request.method in ('GET', 'HEAD') and request.path.startswith(settings.STATIC_URL):
+            return serve_asset(request, request.path[len(settings.STATIC_URL):])
+        return None
+
+
+class ServerTimingMiddleware:
+    """
+    Count the queries of each request and time its db, template and view work
+    (see muscleforge/instrumentation.py). The totals are sent in a
+    Server-Timing header, which browser dev tools show under the request, and
+    requests slower than MUSCLEFORGE_SLOW_REQUEST_MS are logged with them. With
+    MUSCLEFORGE_QUERY_LOG set, queries also go to the query log under their view.
+    Every request is counted in the /metrics endpoint's request metrics.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings = RequestTimings(settings.MUSCLEFORGE_QUERY_LOG)
+        token = current_timings.set(timings)
+        start = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        timings.total = perf_counter() - start
+        return self.report(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = RequestTimings(settings.MUSCLEFORGE_QUERY_LOG)
+        token = current_timings.set(timings)
+        start = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        timings.total = perf_counter() - start
+        return self.report(request, response, timings)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timings = current_timings.get()
+        if timings is not None:
+            timings.view_name = getattr(view_func, 'view_class', view_func).__name__
+
+    def report(self, request, response, timings):
+        observe_request(request, response, timings)
+        if timings.log_queries:
+            query_log.request_finished(timings.view_name)
+        if settings.MUSCLEFORGE_SERVER_TIMING:
+            response.headers['Server-Timing'] = timings.server_timing()
+        if timings.total * 1000 >= settings.MUSCLEFORGE_SLOW_REQUEST_MS:
+            match = request.resolver_match
+            fields = {
+                'method': request.method,
+                'path': request.path,
+                'route': match.view_name if match else None,
+                'status': response.status_code,
+                'queries': timings.queries,
+                'total_ms': round(timings.total * 1000, 1),
+                'db_ms': round(timings.db * 1000, 1),
+                'tpl_ms': round(timings.template * 1000, 1),
+                'view_ms': round(timings.view * 1000, 1),
+            }
+            slow_request_logger.warning(
+                'slow request %s', ' '.join(f'{key}={value}' for key, value in fields.items()), extra=fields
+            )
+        return response
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.1 on 2026-10-18 15:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('muscleforge', '0010_alter_workoutsession_duration'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='exercise',
+            index=models.Index(fields=['user', 'exercise_type'], name='exercise_user_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exerciseinsession',
+            index=models.Index(fields=['workout_session', 'exercise'], name='exerciseinsession_session_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='goal',
+            index=models.Index(fields=['user', 'status'], name='goal_user_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='goal',
+            index=models.Index(fields=['user', 'start_date'], name='goal_user_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workoutplan',
+            index=models.Index(fields=['user', 'status', 'start_date'], name='workoutplan_user_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workoutplan',
+            index=models.Index(fields=['user', 'start_date'], name='workoutplan_user_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workoutsession',
+            index=models.Index(fields=['workout_plan', 'date'], name='workoutsession_plan_date_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.1 on 2026-10-18 15:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_volume(apps, schema_editor):
+    from muscleforge.volume import rebuild_volume
+
+    rebuild_volume(
+        entry_model=apps.get_model('muscleforge', 'ExerciseInSession'),
+        volume_model=apps.get_model('muscleforge', 'ExerciseVolume'),
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('muscleforge', '0011_access_path_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExerciseVolume',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('volume', models.FloatField(default=0)),
+                ('total_reps', models.IntegerField(default=0)),
+                ('max_weight', models.FloatField(blank=True, null=True)),
+                ('exercise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='muscleforge.exercise')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='exercisevolume',
+            constraint=models.UniqueConstraint(fields=('user', 'exercise', 'date'), name='exercisevolume_user_exercise_date'),
+        ),
+        migrations.RunPython(backfill_volume, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.1 on 2026-10-18 16:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_records(apps, schema_editor):
+    from muscleforge.records import rebuild_records
+
+    rebuild_records(
+        entry_model=apps.get_model('muscleforge', 'ExerciseInSession'),
+        record_model=apps.get_model('muscleforge', 'PersonalRecord'),
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('muscleforge', '0012_exercisevolume'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PersonalRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('weight', 'Heaviest weight'), ('reps', 'Most reps at weight'), ('epley', 'Estimated 1RM (Epley)'), ('brzycki', 'Estimated 1RM (Brzycki)')], max_length=10)),
+                ('at_weight', models.FloatField(default=0)),
+                ('value', models.FloatField()),
+                ('entry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='muscleforge.exerciseinsession')),
+                ('exercise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='muscleforge.exercise')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='personalrecord',
+            constraint=models.UniqueConstraint(fields=('exercise', 'kind', 'at_weight'), name='personalrecord_exercise_kind_weight'),
+        ),
+        migrations.RunPython(backfill_records, migrations.RunPython.noop),
+    ]
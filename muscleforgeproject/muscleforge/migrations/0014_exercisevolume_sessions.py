@@ -0,0 +1,35 @@
+# Generated by Django 5.0.1 on 2026-10-18 16:08
+
+from django.db import migrations, models
+
+
+def backfill_volume(apps, schema_editor):
+    # Rebuilt rather than updated, so databases that migrated 0012 before it
+    # backfilled the table get their rows too
+    from muscleforge.volume import rebuild_volume
+
+    rebuild_volume(
+        entry_model=apps.get_model('muscleforge', 'ExerciseInSession'),
+        volume_model=apps.get_model('muscleforge', 'ExerciseVolume'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('muscleforge', '0013_personalrecord'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exercisevolume',
+            name='sessions',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='exercisevolume',
+            name='weighted_reps',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_volume, migrations.RunPython.noop),
+    ]
@@ -9,6 +9,12 @@ class WorkoutPlan(models.Model):
     end_date = models.DateField()
     status = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'status', 'start_date'], name='workoutplan_user_status_idx'),
+            models.Index(fields=['user', 'start_date'], name='workoutplan_user_start_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -23,6 +29,11 @@ class Exercise(models.Model):
     exercise_type = models.CharField(max_length=50)  
     equipment_needed = models.CharField(max_length=100)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'exercise_type'], name='exercise_user_type_idx'),
+        ]
+
     def __str__(self):
         return self.name
     
@@ -33,6 +44,11 @@ class WorkoutSession(models.Model):
     duration = models.DurationField(blank=True, null=True) 
     notes = models.TextField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['workout_plan', 'date'], name='workoutsession_plan_date_idx'),
+        ]
+
     def get_absolute_url(self):
         return reverse("workoutplan-detail", kwargs={"pk": self.workout_plan.pk})
 
@@ -43,6 +59,11 @@ class ExerciseInSession(models.Model):
     sets = models.IntegerField()
     weight_used = models.FloatField(blank=True, null=True)  
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['workout_session', 'exercise'], name='exerciseinsession_session_idx'),
+        ]
+
 class Goal(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     title = models.CharField(max_length=100, blank=True, null=True)
@@ -51,8 +72,55 @@ class Goal(models.Model):
     end_date = models.DateField()
     status = models.BooleanField(default=False)  
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'status'], name='goal_user_status_idx'),
+            models.Index(fields=['user', 'start_date'], name='goal_user_start_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
     def get_absolute_url(self):
         return reverse("goal-detail", kwargs={"pk": self.pk})
+
+class ExerciseVolume(models.Model):
+    """Per user, exercise and day totals of ExerciseInSession rows, maintained by muscleforge.volume."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    exercise = models.ForeignKey(Exercise, on_delete=models.CASCADE)
+    date = models.DateField()
+    volume = models.FloatField(default=0)
+    total_reps = models.IntegerField(default=0)
+    weighted_reps = models.IntegerField(default=0)  # reps of the rows with a weight, the divisor of average intensity
+    max_weight = models.FloatField(blank=True, null=True)
+    sessions = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'exercise', 'date'], name='exercisevolume_user_exercise_date'),
+        ]
+
+class PersonalRecord(models.Model):
+    """A user's best lift of one kind on an Exercise and the ExerciseInSession row that set it, maintained by muscleforge.records."""
+    WEIGHT = 'weight'
+    REPS = 'reps'
+    EPLEY = 'epley'
+    BRZYCKI = 'brzycki'
+    KIND_CHOICES = [
+        (WEIGHT, 'Heaviest weight'),
+        (REPS, 'Most reps at weight'),
+        (EPLEY, 'Estimated 1RM (Epley)'),
+        (BRZYCKI, 'Estimated 1RM (Brzycki)'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    exercise = models.ForeignKey(Exercise, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    at_weight = models.FloatField(default=0)  # only set for REPS records, 0 for bodyweight
+    value = models.FloatField()
+    entry = models.ForeignKey(ExerciseInSession, on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['exercise', 'kind', 'at_weight'], name='personalrecord_exercise_kind_weight'),
+        ]
@@ -0,0 +1,178 @@
+import base64
+import binascii
+import datetime
+import json
+from functools import reduce
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(values, direction):
+    payload = json.dumps({'v': values, 'd': direction}, default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        values, direction = payload['v'], payload['d']
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise InvalidCursor(token)
+    if direction not in (NEXT, PREVIOUS) or not isinstance(values, list):
+        raise InvalidCursor(token)
+    return values, direction
+
+
+def seek_filter(ordering, values, after):
+    """
+    Build the row-value comparison ``(a, b, ...) > (x, y, ...)`` (or ``<``) as
+    (a > x) OR (a = x AND b > y) OR ..., which an index on the ordering columns
+    can answer without reading the rows before the cursor.
+    """
+    lookup = 'gt' if after else 'lt'
+    clauses = []
+    for i, field in enumerate(ordering):
+        equal = {ordering[j]: values[j] for j in range(i)}
+        clauses.append(Q(**equal, **{f'{field}__{lookup}': values[i]}))
+    return reduce(lambda left, right: left | right, clauses)
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def paginate_keyset(queryset, ordering, cursor=None, page_size=25):
+    """
+    Return one KeysetPage of ``queryset`` ordered by ``ordering``, which must end
+    in a unique column. Pages are found by seeking past the cursor row instead of
+    by OFFSET, and no COUNT(*) is run, so every page costs the same.
+    """
+    queryset, direction = seek(queryset, ordering, cursor)
+    return keyset_page(list(queryset[:page_size + 1]), ordering, cursor, direction, page_size)
+
+
+async def apaginate_keyset(queryset, ordering, cursor=None, page_size=25):
+    """paginate_keyset() for async views, reading the page with the async ORM."""
+    queryset, direction = seek(queryset, ordering, cursor)
+    rows = [row async for row in queryset[:page_size + 1]]
+    return keyset_page(rows, ordering, cursor, direction, page_size)
+
+
+def cursor_values(model, ordering, values, cursor):
+    """
+    Convert a cursor's values to the types of the ``ordering`` fields, so a
+    well-formed token holding a value that isn't one of them (a word for a
+    date, a number past the column's range) is an InvalidCursor, not a query error.
+    """
+    if len(values) != len(ordering):
+        raise InvalidCursor(cursor)
+    converted = []
+    for field_name, value in zip(ordering, values):
+        if value is None:
+            raise InvalidCursor(cursor)
+        field = model._meta.get_field(field_name)
+        try:
+            value = field.to_python(value)
+            field.run_validators(value)
+        except (ValidationError, ValueError, TypeError, OverflowError):
+            raise InvalidCursor(cursor)
+        converted.append(value)
+    return converted
+
+
+def seek(queryset, ordering, cursor):
+    direction = NEXT
+    if cursor:
+        values, direction = decode_cursor(cursor)
+        values = cursor_values(queryset.model, ordering, values, cursor)
+        queryset = queryset.filter(seek_filter(ordering, values, after=direction == NEXT))
+
+    if direction == NEXT:
+        queryset = queryset.order_by(*ordering)
+    else:
+        queryset = queryset.order_by(*[f'-{field}' for field in ordering])
+    return queryset, direction
+
+
+def keyset_page(rows, ordering, cursor, direction, page_size):
+    """Build the page from up to ``page_size + 1`` rows read in ``direction``."""
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if direction == PREVIOUS:
+        rows.reverse()
+
+    def row_cursor(row, row_direction):
+        return encode_cursor([cursor_value(row, field) for field in ordering], row_direction)
+
+    next_cursor = previous_cursor = None
+    if rows:
+        if direction == NEXT and has_more or direction == PREVIOUS and cursor:
+            next_cursor = row_cursor(rows[-1], NEXT)
+        if direction == PREVIOUS and has_more or direction == NEXT and cursor:
+            previous_cursor = row_cursor(rows[0], PREVIOUS)
+    return KeysetPage(rows, next_cursor, previous_cursor)
+
+
+def cursor_value(row, field):
+    value = row[field] if isinstance(row, dict) else getattr(row, field)
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+
+class KeysetPaginationMixin:
+    """ListView mixin that pages ``get_queryset()`` by ``keyset_ordering``."""
+    keyset_ordering = ('id',)
+    page_size = 24
+    cursor_kwarg = 'cursor'
+
+    def get_keyset_page(self):
+        if not hasattr(self, '_keyset_page'):
+            cursor = self.request.GET.get(self.cursor_kwarg)
+            try:
+                self._keyset_page = paginate_keyset(self.object_list, self.keyset_ordering, cursor, self.page_size)
+            except InvalidCursor:
+                raise Http404('Invalid page cursor')
+        return self._keyset_page
+
+    async def aget_keyset_page(self):
+        """Read the page ahead of rendering, for async views that can't query from get_context_data()."""
+        cursor = self.request.GET.get(self.cursor_kwarg)
+        try:
+            self._keyset_page = await apaginate_keyset(self.object_list, self.keyset_ordering, cursor, self.page_size)
+        except InvalidCursor:
+            raise Http404('Invalid page cursor')
+        return self._keyset_page
+
+    def get_context_data(self, **kwargs):
+        page = self.get_keyset_page()
+        kwargs.setdefault('object_list', page.object_list)
+        context = super().get_context_data(**kwargs)
+        context['page'] = page
+        return context
@@ -0,0 +1,199 @@
+import atexit
+import json
+import logging
+import os
+import re
+import threading
+from functools import lru_cache
+from logging.handlers import RotatingFileHandler
+from time import monotonic
+
+from django.conf import settings
+from django.db import DatabaseError
+
+# Literals and placeholders become ?, and lists of them one (...), so queries
+# that differ only in their values or the length of an IN list share a fingerprint
+FINGERPRINT_RULES = [
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'%s|\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),
+    (re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+]
+# Upper bounds, in ms, of the duration histogram buckets; the last one is unbounded
+BUCKETS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+logger = logging.getLogger('muscleforge.querylog')
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql):
+    for pattern, replacement in FINGERPRINT_RULES:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def bucket(duration_ms):
+    for index, bound in enumerate(BUCKETS):
+        if duration_ms <= bound:
+            return index
+    return len(BUCKETS)
+
+
+def percentile_from_histogram(histogram, pct):
+    """The upper bound of the bucket holding the ``pct`` percentile, in ms."""
+    target = sum(histogram) * pct / 100
+    seen = 0
+    for index, count in enumerate(histogram):
+        seen += count
+        if count and seen >= target:
+            return BUCKETS[index] if index < len(BUCKETS) else float('inf')
+    return 0.0
+
+
+def explain(connection, sql, params):
+    """
+    The query plan of ``sql``, read with a cursor that bypasses the execute
+    wrappers so the EXPLAIN itself isn't logged. None if it can't be explained.
+    """
+    cursor = connection.create_cursor()
+    try:
+        cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+        return [str(row[-1]) for row in cursor.fetchall()]
+    except DatabaseError:
+        return None
+    finally:
+        cursor.close()
+
+
+class QueryStats:
+    __slots__ = ('count', 'total_ms', 'histogram', 'sample')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.histogram = [0] * (len(BUCKETS) + 1)
+        # The slowest query seen, with its plan, if it took MUSCLEFORGE_SLOW_QUERY_MS
+        self.sample = None
+
+    def add(self, duration_ms):
+        self.count += 1
+        self.total_ms += duration_ms
+        self.histogram[bucket(duration_ms)] += 1
+
+    def merge(self, count, total_ms, histogram):
+        self.count += count
+        self.total_ms += total_ms
+        self.histogram = [a + b for a, b in zip(self.histogram, histogram)]
+
+    @property
+    def p95_ms(self):
+        return percentile_from_histogram(self.histogram, 95)
+
+
+class QueryLog:
+    """
+    Count, total time and a duration histogram of every query, per view and
+    fingerprint, plus the number of requests per view. Every
+    MUSCLEFORGE_QUERY_LOG_FLUSH seconds the counts since the last flush are
+    appended to the rotating MUSCLEFORGE_QUERY_LOG_PATH as JSON lines, so
+    the logs of several processes add up; query_report reads them.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        # A new lock too, as a forked child may inherit one held by another thread
+        self.lock = threading.Lock()
+        self.stats = {}
+        self.requests = {}
+        self.last_flush = monotonic()
+
+    def record(self, view, sql, params, many, duration, connection):
+        duration_ms = duration * 1000
+        key = (view, fingerprint(sql))
+        with self.lock:
+            stats = self.stats.get(key)
+            if stats is None:
+                stats = self.stats[key] = QueryStats()
+            stats.add(duration_ms)
+            slowest = stats.sample['duration_ms'] if stats.sample else settings.MUSCLEFORGE_SLOW_QUERY_MS
+            keep = duration_ms >= slowest and not many
+        if keep:
+            # Planning only happens for a new slowest query of the period, so it stays rare
+            plan = explain(connection, sql, params) if sql.lstrip()[:6].upper() == 'SELECT' else None
+            stats.sample = {'duration_ms': round(duration_ms, 3), 'sql': sql, 'params': [repr(param) for param in params or ()], 'plan': plan}
+
+    def request_finished(self, view):
+        with self.lock:
+            self.requests[view] = self.requests.get(view, 0) + 1
+        if monotonic() - self.last_flush >= settings.MUSCLEFORGE_QUERY_LOG_FLUSH:
+            self.flush()
+
+    def drain(self):
+        """Return and forget the stats and request counts gathered since the last call."""
+        with self.lock:
+            stats, requests = self.stats, self.requests
+            self.stats, self.requests = {}, {}
+            self.last_flush = monotonic()
+        return stats, requests
+
+    def flush(self):
+        stats, requests = self.drain()
+        if not stats and not requests:
+            return
+        if not logger.handlers:
+            self.open_log()
+        for view, count in requests.items():
+            logger.info(json.dumps({'type': 'requests', 'view': view, 'count': count}))
+        for (view, fingerprint), entry in stats.items():
+            logger.info(json.dumps({
+                'type': 'stats', 'view': view, 'fingerprint': fingerprint,
+                'count': entry.count, 'total_ms': round(entry.total_ms, 3), 'histogram': entry.histogram,
+            }))
+            if entry.sample:
+                logger.info(json.dumps({'type': 'sample', 'view': view, 'fingerprint': fingerprint, **entry.sample}))
+
+    def open_log(self):
+        path = settings.MUSCLEFORGE_QUERY_LOG_PATH
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handler = RotatingFileHandler(path, maxBytes=settings.MUSCLEFORGE_QUERY_LOG_MAX_BYTES, backupCount=5)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+
+query_log = QueryLog()
+atexit.register(query_log.flush)
+# What was gathered before a fork is the parent's to flush
+os.register_at_fork(after_in_child=query_log.reset)
+
+
+def read_log(path):
+    """
+    Add up the query log at ``path`` and its rotated files. Returns the stats
+    per (view, fingerprint) and the number of requests per view.
+    """
+    stats, requests = {}, {}
+    for name in [f'{path}.{index}' for index in range(5, 0, -1)] + [path]:
+        if not os.path.exists(name):
+            continue
+        with open(name) as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if entry.get('type') == 'requests':
+                    requests[entry['view']] = requests.get(entry['view'], 0) + entry['count']
+                    continue
+                key = (entry['view'], entry['fingerprint'])
+                if key not in stats:
+                    stats[key] = QueryStats()
+                if entry['type'] == 'stats':
+                    stats[key].merge(entry['count'], entry['total_ms'], entry['histogram'])
+                elif entry['type'] == 'sample' and entry['duration_ms'] >= (stats[key].sample or {}).get('duration_ms', 0):
+                    stats[key].sample = {field: entry[field] for field in ('duration_ms', 'sql', 'params', 'plan')}
+    return stats, requests
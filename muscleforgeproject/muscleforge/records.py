@@ -0,0 +1,153 @@
+from collections import defaultdict
+from itertools import groupby
+from operator import itemgetter
+
+from django.db import transaction
+from django.db.models import F
+
+from .models import ExerciseInSession, PersonalRecord
+from .volume import USER, DATE
+
+
+def epley(weight, reps):
+    return weight if reps == 1 else weight * (1 + reps / 30)
+
+
+def brzycki(weight, reps):
+    # The formula divides by zero at 37 reps and turns negative after it
+    if reps >= 37:
+        return None
+    return weight * 36 / (37 - reps)
+
+
+ESTIMATORS = {
+    PersonalRecord.EPLEY: epley,
+    PersonalRecord.BRZYCKI: brzycki,
+}
+
+
+def entry_rows(entries, *ordering):
+    return entries.values(
+        'id', 'exercise_id', 'repetitions', 'weight_used', user_id=F(USER),
+    ).order_by(*ordering, DATE, 'id')
+
+
+def candidates(row):
+    """Yield the (kind, at_weight, value) records a single ExerciseInSession row could hold."""
+    weight, reps = row['weight_used'], row['repetitions']
+    if reps <= 0:
+        return
+    yield PersonalRecord.REPS, weight or 0.0, reps
+    if weight and weight > 0:
+        yield PersonalRecord.WEIGHT, 0.0, weight
+        for kind, estimate in ESTIMATORS.items():
+            value = estimate(weight, reps)
+            if value is not None:
+                yield kind, 0.0, value
+
+
+def best_records(rows, model=PersonalRecord):
+    """
+    Return the best PersonalRecord per (exercise_id, kind, at_weight) among ``rows``.
+    A record is only taken over by a strictly better lift, so when rows come in
+    date order the first lift to reach a value keeps it.
+    """
+    best = {}
+    for row in rows:
+        for kind, at_weight, value in candidates(row):
+            key = (row['exercise_id'], kind, at_weight)
+            if key not in best or value > best[key].value:
+                best[key] = model(
+                    user_id=row['user_id'],
+                    exercise_id=row['exercise_id'],
+                    kind=kind,
+                    at_weight=at_weight,
+                    value=value,
+                    entry_id=row['id'],
+                )
+    return best
+
+
+def save_records(records):
+    PersonalRecord.objects.bulk_create(
+        records,
+        update_conflicts=True,
+        unique_fields=['exercise', 'kind', 'at_weight'],
+        update_fields=['value', 'entry'],
+    )
+
+
+def held_exercises(entries):
+    """Exercises with a record set by one of ``entries``, which editing or deleting those rows can lower."""
+    return set(PersonalRecord.objects.filter(entry__in=entries).values_list('exercise_id', flat=True))
+
+
+def update_records(entries, recompute=()):
+    """
+    Bring the PersonalRecord table up to date after ``entries`` were saved. The
+    saved rows are only compared with the current records of their exercises, so
+    the cost follows the number of changed rows. Exercises in ``recompute`` lost
+    a record holder (see held_exercises) and are recomputed from their history.
+    """
+    recompute = set(recompute)
+    with transaction.atomic():
+        if recompute:
+            PersonalRecord.objects.filter(exercise_id__in=recompute).delete()
+            history = ExerciseInSession.objects.filter(exercise_id__in=recompute)
+            save_records(list(best_records(entry_rows(history)).values()))
+            entries = entries.exclude(exercise_id__in=recompute)
+
+        best = best_records(entry_rows(entries))
+        if not best:
+            return
+        current = {
+            (record.exercise_id, record.kind, record.at_weight): record.value
+            for record in PersonalRecord.objects.filter(exercise_id__in={key[0] for key in best})
+        }
+        save_records([
+            record for key, record in best.items()
+            if key not in current or record.value > current[key]
+        ])
+
+
+def rebuild_records(user_ids=None, batch_size=1000, entry_model=ExerciseInSession, record_model=PersonalRecord):
+    """
+    Rebuild the PersonalRecord table from scratch, for every user or only
+    ``user_ids``. Migrations pass their historical models.
+    """
+    entries = entry_model.objects.all()
+    records = record_model.objects.all()
+    if user_ids is not None:
+        entries = entries.filter(**{f'{USER}__in': user_ids})
+        records = records.filter(user_id__in=user_ids)
+
+    created = 0
+    with transaction.atomic():
+        records.delete()
+        batch = []
+        rows = entry_rows(entries, 'exercise_id').iterator(chunk_size=batch_size)
+        for _, exercise_rows in groupby(rows, key=itemgetter('exercise_id')):
+            batch.extend(best_records(exercise_rows, record_model).values())
+            if len(batch) >= batch_size:
+                record_model.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        record_model.objects.bulk_create(batch)
+        created += len(batch)
+    return created
+
+
+def records_by_entry(entries):
+    """Map ExerciseInSession ids among ``entries`` to the records they currently hold."""
+    by_entry = defaultdict(list)
+    for record in PersonalRecord.objects.filter(entry__in=entries).order_by('kind'):
+        by_entry[record.entry_id].append(record)
+    return by_entry
+
+
+async def arecords_by_entry(entries):
+    """records_by_entry() for async views."""
+    by_entry = defaultdict(list)
+    async for record in PersonalRecord.objects.filter(entry__in=entries).order_by('kind'):
+        by_entry[record.entry_id].append(record)
+    return by_entry
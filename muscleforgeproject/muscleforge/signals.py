@@ -0,0 +1,58 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .caching import bump_version
+from .metrics import metrics
+from .models import WorkoutPlan, Exercise, WorkoutSession, Goal
+
+# Cached namespaces built from each kind of row
+TRAINING_NAMESPACES = ('dashboard', 'progress', 'api')
+GOAL_NAMESPACES = ('dashboard', 'api')
+EXERCISE_NAMESPACES = ('progress', 'api', 'autocomplete')
+
+def invalidate(user_id, namespaces):
+    for namespace in namespaces:
+        bump_version(namespace, user_id)
+
+def session_owner_id(session):
+    if WorkoutSession.workout_plan.is_cached(session):
+        return session.workout_plan.user_id
+    return WorkoutPlan.objects.filter(pk=session.workout_plan_id).values_list('user_id', flat=True).first()
+
+def deleted_by_cascade(origin):
+    """
+    Whether a delete started from another model's rows, e.g. a plan whose
+    sessions the cascade removes. Their origin's post_delete invalidates once,
+    after the sessions are gone.
+    """
+    if origin is None:
+        return False
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model is not WorkoutSession
+
+@receiver([post_save, post_delete], sender=Goal)
+def invalidate_goals(sender, instance, **kwargs):
+    invalidate(instance.user_id, GOAL_NAMESPACES)
+
+@receiver([post_save, post_delete], sender=Exercise)
+def invalidate_exercises(sender, instance, **kwargs):
+    if instance.user_id is not None:
+        invalidate(instance.user_id, EXERCISE_NAMESPACES)
+
+# Deleting a plan removes its sessions, so it invalidates what the sessions feed
+@receiver([post_save, post_delete], sender=WorkoutPlan)
+def invalidate_training(sender, instance, **kwargs):
+    invalidate(instance.user_id, TRAINING_NAMESPACES)
+
+@receiver([post_save, post_delete], sender=WorkoutSession)
+def invalidate_training_for_session(sender, instance, origin=None, **kwargs):
+    if deleted_by_cascade(origin):
+        return
+    user_id = session_owner_id(instance)
+    if user_id is not None:
+        invalidate(user_id, TRAINING_NAMESPACES)
+
+@receiver(post_save, sender=WorkoutSession)
+def count_logged_sessions(sender, instance, created, **kwargs):
+    if created:
+        metrics.inc('muscleforge_workout_sessions_logged_total')
@@ -0,0 +1,73 @@
+// exercise_autocomplete.js
+(function($) {
+    $(document).ready(function() {
+        var timer = null;
+        var request = null;
+
+        function widget(element) {
+            return $(element).closest('.exercise-autocomplete');
+        }
+
+        function choose(box, id, name) {
+            box.find('.exercise-autocomplete-value').val(id);
+            box.find('[data-exercise-autocomplete]').val(name);
+            box.find('.dropdown-menu').removeClass('show').empty();
+        }
+
+        function suggest(input) {
+            var box = widget(input);
+            var menu = box.find('.dropdown-menu');
+            var query = $(input).val();
+            if (request) {
+                request.abort();
+            }
+            if (!$.trim(query)) {
+                menu.removeClass('show').empty();
+                return;
+            }
+            request = $.getJSON($(input).data('exercise-autocomplete'), {q: query}, function(data) {
+                menu.empty();
+                $.each(data.results, function(i, exercise) {
+                    // Typing the full name of an exercise picks it without a click
+                    if (exercise.name.toLowerCase() === $.trim(query).toLowerCase()) {
+                        box.find('.exercise-autocomplete-value').val(exercise.id);
+                    }
+                    $('<a href="#" class="dropdown-item"></a>')
+                        .text(exercise.name)
+                        .append($('<small class="text-muted ml-2"></small>').text(exercise.exercise_type))
+                        .data('exercise', exercise)
+                        .appendTo(menu);
+                });
+                menu.toggleClass('show', data.results.length > 0);
+            });
+        }
+
+        $(document).on('input', '[data-exercise-autocomplete]', function() {
+            var input = this;
+            // The id no longer matches what is typed until a suggestion is picked
+            widget(input).find('.exercise-autocomplete-value').val('');
+            clearTimeout(timer);
+            timer = setTimeout(function() { suggest(input); }, 150);
+        });
+
+        $(document).on('mousedown', '.exercise-autocomplete .dropdown-item', function(e) {
+            e.preventDefault();
+            var exercise = $(this).data('exercise');
+            choose(widget(this), exercise.id, exercise.name);
+        });
+
+        $(document).on('keydown', '[data-exercise-autocomplete]', function(e) {
+            var first = widget(this).find('.dropdown-item:first');
+            if (e.key === 'Enter' && first.length) {
+                e.preventDefault();
+                choose(widget(this), first.data('exercise').id, first.data('exercise').name);
+            } else if (e.key === 'Escape') {
+                widget(this).find('.dropdown-menu').removeClass('show');
+            }
+        });
+
+        $(document).on('blur', '[data-exercise-autocomplete]', function() {
+            widget(this).find('.dropdown-menu').removeClass('show');
+        });
+    });
+})(jQuery);
@@ -0,0 +1,54 @@
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Text formats worth compressing; images and woff fonts are compressed already
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.mjs', '.map', '.json', '.svg', '.txt', '.html', '.xml', '.ttf', '.otf', '.eot', '.ico')
+# Below this the encoding headers cost about as much as they save
+MIN_COMPRESS_SIZE = 256
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Manifest storage that also writes ``.gz`` (and ``.br`` when brotli is
+    installed) next to every hashed text asset at collectstatic time, for
+    StaticAssetMiddleware to serve without compressing per request.
+    """
+    manifest_strict = False
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in set(self.hashed_files.values()):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                self.compress(name)
+
+    def compress(self, name):
+        with self.open(name) as original:
+            content = original.read()
+        if len(content) < MIN_COMPRESS_SIZE:
+            return
+        encoded = {'gz': gzip.compress(content, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            encoded['br'] = brotli.compress(content)
+        for extension, compressed in encoded.items():
+            # Only keep variants that are meaningfully smaller
+            if len(compressed) < len(content) * 0.95:
+                compressed_name = f'{name}.{extension}'
+                if self.exists(compressed_name):
+                    self.delete(compressed_name)
+                self._save(compressed_name, ContentFile(compressed))
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # Not collected (development and tests), link the app's own copy
+            return name
@@ -0,0 +1,8 @@
+# The project's URLs with every route that has an async view served by it
+from django.urls import include, path
+from muscleforge import urls as muscleforge_urls
+from muscleforge.async_views import use_async_views
+from muscleforgeproject import urls
+
+urlpatterns = [pattern for pattern in urls.urlpatterns if getattr(pattern, 'urlconf_name', None) is not muscleforge_urls]
+urlpatterns.append(path('', include(use_async_views(muscleforge_urls.urlpatterns, ['*']))))
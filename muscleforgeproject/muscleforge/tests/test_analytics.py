@@ -0,0 +1,88 @@
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from muscleforge.analytics import build_progress, rolling_mean, week_starts, MONDAY_OFFSET
+from muscleforge.models import Exercise, WorkoutPlan, WorkoutSession, ExerciseInSession, ExerciseVolume
+from muscleforge.volume import refresh_volume, session_keys
+
+# Checking the progress series returned for an exercise
+class ExerciseProgressTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='user1', password='test123')
+        self.client.force_login(self.user)
+        self.plan = WorkoutPlan.objects.create(user=self.user, title='Plan', start_date=date(2024, 1, 1), end_date=date(2024, 3, 1))
+        self.squat = Exercise.objects.filter(user=self.user).first()
+        self.url = reverse('exercise-progress', kwargs={'pk': self.squat.pk})
+
+    def log(self, day, *rows):
+        session = WorkoutSession.objects.create(workout_plan=self.plan, date=day)
+        ExerciseInSession.objects.bulk_create([
+            ExerciseInSession(workout_session=session, exercise=self.squat, sets=sets, repetitions=reps, weight_used=weight)
+            for sets, reps, weight in rows
+        ])
+        refresh_volume(session_keys([session.pk]))
+        return session
+
+    def test_weekly_and_monthly_series(self):
+        # Tuesday and Thursday of one week, then a session two weeks later in February
+        self.log(date(2024, 1, 30), (3, 5, 100), (1, 10, None))
+        self.log(date(2024, 2, 1), (2, 5, 80))
+        self.log(date(2024, 2, 13), (3, 5, 100))
+        progress = self.client.get(self.url).json()
+
+        weekly = progress['weekly']
+        self.assertEqual(weekly['periods'], ['2024-01-29', '2024-02-05', '2024-02-12'])
+        self.assertEqual(weekly['volume'], [2300.0, 0.0, 1500.0])
+        self.assertEqual(weekly['total_reps'], [35, 0, 15])
+        self.assertEqual(weekly['average_intensity'], [92.0, None, 100.0])
+        self.assertEqual(weekly['sessions'], [2, 0, 1])
+        self.assertEqual(weekly['volume_rolling'], [2300.0, 1150.0, 1266.67])
+
+        monthly = progress['monthly']
+        self.assertEqual(monthly['periods'], ['2024-01-01', '2024-02-01'])
+        self.assertEqual(monthly['volume'], [1500.0, 2300.0])
+        self.assertEqual(monthly['sessions'], [1, 2])
+
+    def test_exercise_without_history(self):
+        self.assertEqual(self.client.get(self.url).json()['weekly'], None)
+
+    def test_cached_until_next_session_write(self):
+        self.log(date(2024, 1, 30), (3, 5, 100))
+        self.client.get(self.url)
+        with self.assertNumQueries(3):
+            self.assertEqual(self.client.get(self.url).json()['weekly']['volume'], [1500.0])
+
+        self.log(date(2024, 1, 31), (1, 1, 100))
+        self.assertEqual(self.client.get(self.url).json()['weekly']['volume'], [1600.0])
+
+    def test_other_users_exercise_is_404(self):
+        other = User.objects.create_user(username='user2', password='test123')
+        exercise = Exercise.objects.filter(user=other).first()
+        response = self.client.get(reverse('exercise-progress', kwargs={'pk': exercise.pk}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_rolling_mean(self):
+        self.assertEqual(rolling_mean(np.array([4, 0, 2, 6]), 2).tolist(), [4.0, 2.0, 1.0, 4.0])
+        self.assertEqual(str(week_starts(np.array([(np.datetime64('2024-01-31', 'D').astype(np.int64) + MONDAY_OFFSET) // 7]))[0]), '2024-01-29')
+
+    def test_ten_year_history_is_fast(self):
+        # Ten years of near daily training, about 100k logged rows at 30 per day
+        start = date(2014, 1, 1)
+        ExerciseVolume.objects.bulk_create([
+            ExerciseVolume(user=self.user, exercise=self.squat, date=start + timedelta(days=day), sessions=1,
+                           volume=3000.0, total_reps=90, weighted_reps=90, max_weight=100.0)
+            for day in range(3650) if day % 7
+        ])
+        build_progress(self.squat)
+        started = time.perf_counter()
+        progress = build_progress(self.squat)
+        elapsed = time.perf_counter() - started
+        self.assertEqual(sum(progress['weekly']['sessions']), 3650 - 522)
+        self.assertLess(elapsed, 0.1)
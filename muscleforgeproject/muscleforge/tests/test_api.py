@@ -0,0 +1,107 @@
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from muscleforge.caching import DatabaseCache, version_key
+from muscleforge.models import Exercise, WorkoutPlan, WorkoutSession, ExerciseInSession, Goal
+from muscleforge.pagination import encode_cursor
+
+# Checking the read-only JSON API and its conditional GET support
+class ApiTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='user1', password='test123')
+        self.other = User.objects.create_user(username='user2', password='test123')
+        self.client.force_login(self.user)
+        self.plan = WorkoutPlan.objects.create(user=self.user, title='Plan', start_date=date(2024, 1, 1), end_date=date(2024, 2, 1))
+        exercises = list(Exercise.objects.filter(user=self.user)[:3])
+        for day in range(5):
+            session = WorkoutSession.objects.create(workout_plan=self.plan, date=date(2024, 1, 1) + timedelta(days=day), duration=timedelta(minutes=45))
+            for exercise in exercises:
+                ExerciseInSession.objects.create(workout_session=session, exercise=exercise, repetitions=5, sets=3, weight_used=50)
+        Goal.objects.create(user=self.user, title='Goal', description='Squat more', start_date=date(2024, 1, 1), end_date=date(2024, 6, 1))
+        other_plan = WorkoutPlan.objects.create(user=self.other, title='Other', start_date=date(2024, 1, 1), end_date=date(2024, 2, 1))
+        self.other_session = WorkoutSession.objects.create(workout_plan=other_plan, date=date(2024, 1, 3))
+
+    def test_sessions_nest_exercises_with_fixed_queries(self):
+        url = reverse('api-session-list')
+        # session, user, one page of sessions and one prefetch of their exercises
+        with self.assertNumQueries(4):
+            data = self.client.get(url, {'page_size': 2}).json()
+        self.assertEqual(len(data['results']), 2)
+        first = data['results'][0]
+        self.assertEqual(first['date'], '2024-01-01')
+        self.assertEqual(first['duration'], 2700.0)
+        self.assertEqual(len(first['exercises']), 3)
+        self.assertEqual(set(first['exercises'][0]['exercise']), {'id', 'name'})
+
+        with self.assertNumQueries(4):
+            page = self.client.get(data['next']).json()
+        self.assertEqual([session['date'] for session in page['results']], ['2024-01-03', '2024-01-04'])
+        self.assertIsNotNone(page['previous'])
+
+    def test_only_own_rows(self):
+        ids = [session['id'] for session in self.client.get(reverse('api-session-list')).json()['results']]
+        self.assertNotIn(self.other_session.pk, ids)
+        response = self.client.get(reverse('api-session-detail', kwargs={'pk': self.other_session.pk}))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {'detail': 'Not found.'})
+
+    def test_plan_filter_and_bad_parameters(self):
+        response = self.client.get(reverse('api-session-list'), {'plan': self.other_session.workout_plan_id})
+        self.assertEqual(response.json()['results'], [])
+        self.assertEqual(self.client.get(reverse('api-session-list'), {'plan': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('api-plan-list'), {'cursor': 'bad'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('api-session-list'), {'cursor': encode_cursor(['Monday', 1], 'n')}).status_code, 400)
+
+    def test_not_modified_without_loading_rows(self):
+        url = reverse('api-plan-list')
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        # Only the login session and user are read
+        with self.assertNumQueries(2):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+        # Each page has its own tag
+        self.assertNotEqual(self.client.get(url, {'page_size': 1})['ETag'], etag)
+
+    def test_writes_change_the_etag(self):
+        url = reverse('api-goal-list')
+        etag = self.client.get(url)['ETag']
+        Goal.objects.create(user=self.user, title='New', description='More', start_date=date(2024, 2, 1), end_date=date(2024, 3, 1))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 2)
+
+        etag = response['ETag']
+        Exercise.objects.filter(user=self.user).first().save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_writes_in_another_worker_change_the_etag(self):
+        with override_settings(CACHES={**settings.CACHES, 'default': {'BACKEND': 'muscleforge.caching.DatabaseCache', 'LOCATION': 'muscleforge_cache'}}):
+            call_command('createcachetable', verbosity=0)
+            url = reverse('api-goal-list')
+            etag = self.client.get(url)['ETag']
+            # A worker process that handled a write bumps the version in the shared table
+            other_worker = DatabaseCache('muscleforge_cache', {})
+            key = version_key('api', self.user.pk)
+            other_worker.set(key, other_worker.get(key) + 1, timeout=None)
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+
+    def test_requires_login_and_get(self):
+        self.assertEqual(self.client.post(reverse('api-plan-list')).status_code, 405)
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('api-plan-list')).status_code, 401)
@@ -0,0 +1,126 @@
+import json
+from datetime import date, timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from muscleforge import urls as muscleforge_urls
+from muscleforge.async_views import ASYNC_VIEWS, use_async_views
+from muscleforge.benchmark import seed_user_data
+from muscleforge.caching import DatabaseCache
+from muscleforge.models import Exercise, WorkoutPlan, WorkoutSession, ExerciseInSession, Goal
+from muscleforge.records import rebuild_records
+
+# The production profile's cache, which can't be read synchronously inside the event loop
+SHARED_CACHES = {**settings.CACHES, 'default': {'BACKEND': 'muscleforge.caching.DatabaseCache', 'LOCATION': 'muscleforge_cache'}}
+
+# Checking that the async views render the same pages as the sync ones with the same queries
+@override_settings(ROOT_URLCONF='muscleforge.tests.async_urls')
+class AsyncViewsTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        caches['fragments'].clear()
+        self.user = User.objects.create_user(username='user1', password='test123')
+        self.other = User.objects.create_user(username='user2', password='test123')
+        self.client.force_login(self.user)
+        self.async_client.force_login(self.user)
+        self.plan = WorkoutPlan.objects.create(user=self.user, title='Plan', start_date=date.today(), end_date=date.today() + timedelta(days=30))
+        self.session = WorkoutSession.objects.create(workout_plan=self.plan, date=date.today(), duration=timedelta(minutes=45), notes='')
+        for exercise in Exercise.objects.filter(user=self.user)[:3]:
+            ExerciseInSession.objects.create(workout_session=self.session, exercise=exercise, repetitions=5, sets=3, weight_used=50)
+        rebuild_records([self.user.pk])
+        self.goal = Goal.objects.create(user=self.user, title='Goal', description='Squat more', start_date=date.today(), end_date=date.today() + timedelta(days=30))
+        session_kwargs = {'workoutplan_pk': self.plan.pk, 'session_pk': self.session.pk}
+        self.urls = {
+            'muscleforge-home': reverse('muscleforge-home'),
+            'exercise-list': reverse('exercise-list'),
+            'workoutplan-list': reverse('workoutplan-list'),
+            'workoutplan-detail': reverse('workoutplan-detail', kwargs={'pk': self.plan.pk}),
+            'workoutsession-detail': reverse('workoutsession-detail', kwargs=session_kwargs),
+            'goal-list': reverse('goal-list'),
+            'goal-detail': reverse('goal-detail', kwargs={'pk': self.goal.pk}),
+        }
+
+    async def test_pages_match_sync_views(self):
+        self.assertEqual(set(self.urls), set(ASYNC_VIEWS))
+        for name, url in self.urls.items():
+            with self.subTest(route=name):
+                response = await self.async_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIs(response.resolver_match.func, ASYNC_VIEWS[name])
+                with override_settings(ROOT_URLCONF='muscleforgeproject.urls'):
+                    expected = await self.sync_page(url)
+                self.assertEqual(strip_csrf(response.content), strip_csrf(expected))
+
+    async def sync_page(self, url):
+        from asgiref.sync import sync_to_async
+        return (await sync_to_async(self.client.get)(url)).content
+
+    def test_session_detail_queries(self):
+        # session, user, profile, session row with its plan, exercises with their exercise and records,
+        # and the topbar's layout version when it's read from a shared cache
+        self.client.get(self.urls['workoutsession-detail'])
+        with self.assertNumQueries(7 if isinstance(caches['default'], DatabaseCache) else 6):
+            response = self.client.get(self.urls['workoutsession-detail'])
+        self.assertContains(response, 'PR: ')
+        self.assertContains(response, str(self.plan))
+
+    async def test_other_users_rows_and_login(self):
+        other_plan = await WorkoutPlan.objects.acreate(user=self.other, title='Other', start_date=date.today(), end_date=date.today())
+        response = await self.async_client.get(reverse('workoutplan-detail', kwargs={'pk': other_plan.pk}))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual((await self.async_client.get(self.urls['goal-list'], {'cursor': 'bad'})).status_code, 404)
+        await self.async_client.alogout()
+        response = await self.async_client.get(self.urls['exercise-list'])
+        self.assertRedirects(response, f"{reverse('login')}?next={self.urls['exercise-list']}", fetch_redirect_response=False)
+
+# The same pages with the cache shared through the database, as under MUSCLEFORGE_DB_PROFILE=production
+@override_settings(ROOT_URLCONF='muscleforge.tests.async_urls', CACHES=SHARED_CACHES)
+class SharedCacheAsyncViewsTest(AsyncViewsTest):
+
+    def setUp(self):
+        call_command('createcachetable', verbosity=0)
+        super().setUp()
+
+    async def test_dashboard_is_cached_under_the_shared_version(self):
+        await self.async_client.get(self.urls['muscleforge-home'])
+        await Goal.objects.acreate(user=self.user, title='Second', description='Bench more', start_date=date.today(), end_date=date.today(), status=True)
+        response = await self.async_client.get(self.urls['muscleforge-home'])
+        self.assertEqual(response.context_data['completed_goals'], 1)
+
+def strip_csrf(content):
+    return b'\n'.join(line for line in content.splitlines() if b'csrfmiddlewaretoken' not in line)
+
+# Checking which routes are served by async views
+class AsyncRoutesTest(TestCase):
+
+    def test_only_selected_routes_are_async(self):
+        patterns = {pattern.name: pattern for pattern in use_async_views(muscleforge_urls.urlpatterns, ['goal-list'])}
+        self.assertIs(patterns['goal-list'].callback, ASYNC_VIEWS['goal-list'])
+        self.assertIsNot(patterns['goal-detail'].callback, ASYNC_VIEWS['goal-detail'])
+        self.assertEqual(str(patterns['goal-list'].pattern), 'goals/')
+        with self.assertRaises(ImproperlyConfigured):
+            use_async_views(muscleforge_urls.urlpatterns, ['goal-new'])
+
+# Checking that benchmark_asgi drives both entry points. The WSGI threads and the
+# ASGI thread pool open their own connections, so the data has to be committed.
+class BenchmarkAsgiCommandTest(TransactionTestCase):
+
+    def test_measures_each_entry_point(self):
+        user = User.objects.create_user(username='benchuser', password='12345')
+        seed_user_data(user, plans=2, sessions_per_plan=2, goals=2)
+        for server in ['wsgi', 'asgi']:
+            out = StringIO()
+            call_command('benchmark_asgi', '--server', server, '--username', 'benchuser', '--routes', 'goal-list,muscleforge-home',
+                         '--requests', '6', '--concurrency', '3', stdout=out)
+            results = json.loads(out.getvalue())
+            self.assertEqual(set(results), {'goal-list', 'muscleforge-home'})
+            self.assertEqual(results['goal-list']['requests'], 6)
+            self.assertEqual(results['goal-list']['errors'], 0)
+            self.assertLessEqual(results['goal-list']['p50_ms'], results['goal-list']['p99_ms'])
@@ -0,0 +1,89 @@
+from statistics import median
+from time import perf_counter
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from muscleforge.autocomplete import ExerciseIndex
+from muscleforge.models import Exercise
+
+# Checking that the index matches word prefixes, ranks leading matches first and forgives typos
+class ExerciseIndexTest(SimpleTestCase):
+
+    def setUp(self):
+        self.index = ExerciseIndex([
+            (1, 'Bench Press', 'Strength'), (2, 'Incline Bench Press', 'Strength'), (3, 'Overhead Press', 'Strength'),
+            (4, 'Push-up', 'Strength'), (5, 'Bulgarian Split Squat', 'Legs'), (6, 'Back Squat', 'Legs'),
+        ])
+
+    def names(self, query, limit=10):
+        return [name for _, name, _ in self.index.search(query, limit)]
+
+    def test_prefixes(self):
+        self.assertEqual(self.names('ben'), ['Bench Press', 'Incline Bench Press'])
+        self.assertEqual(self.names('press inc'), ['Incline Bench Press'])
+        self.assertEqual(self.names('PUSH'), ['Push-up'])
+        self.assertEqual(self.names('b', limit=2), ['Back Squat', 'Bench Press'])
+        self.assertEqual(self.names('  '), [])
+
+    def test_typos_fall_back_to_trigrams(self):
+        self.assertEqual(self.names('overhed press')[0], 'Overhead Press')
+        self.assertEqual(self.names('bulgarain'), ['Bulgarian Split Squat'])
+
+    def test_exercise_by_id(self):
+        self.assertEqual(self.index.exercise('3').name, 'Overhead Press')
+        self.assertIsNone(self.index.exercise(99))
+        self.assertIsNone(self.index.exercise('x'))
+
+    def test_lookups_take_under_a_millisecond(self):
+        index = ExerciseIndex([(i, f'Exercise {i} {word}', 'Strength') for i, word in enumerate(['curl', 'press', 'row', 'squat', 'lunge'] * 1000)])
+        timings = []
+        for query in ['e', 'exercise 12', 'pre', 'squat 4', 'lnge'] * 20:
+            start = perf_counter()
+            index.search(query)
+            timings.append(perf_counter() - start)
+        self.assertLess(median(timings), 0.001)
+
+# Checking the autocomplete endpoint and that exercise writes rebuild the user's index
+class ExerciseAutocompleteTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='user1', password='test123')
+        self.other = User.objects.create_user(username='user2', password='test123')
+        self.client.force_login(self.user)
+        self.url = reverse('api-exercise-autocomplete')
+
+    def search(self, query, **params):
+        response = self.client.get(self.url, {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [result['name'] for result in response.json()['results']]
+
+    def test_results(self):
+        exercise = Exercise.objects.get(user=self.user, name='Push-up')
+        response = self.client.get(self.url, {'q': 'pus'})
+        self.assertEqual(response.json(), {'results': [{'id': exercise.pk, 'name': 'Push-up', 'exercise_type': exercise.exercise_type}]})
+        self.assertEqual(len(self.search('', limit=5)), 0)
+        self.assertEqual(self.client.get(self.url, {'q': 'p', 'limit': 'x'}).status_code, 400)
+
+    def test_only_own_exercises(self):
+        Exercise.objects.create(user=self.other, name='Zercher Squat')
+        self.assertEqual(self.search('zerch'), [])
+
+    def test_index_is_kept_until_exercises_change(self):
+        self.search('pus')
+        with self.assertNumQueries(2):
+            self.search('pla')
+        exercise = Exercise.objects.create(user=self.user, name='Pendlay Row')
+        self.assertEqual(self.search('pendlay'), ['Pendlay Row'])
+        exercise.name = 'Yates Row'
+        exercise.save()
+        self.assertEqual(self.search('pendlay'), [])
+        self.assertEqual(self.search('yates'), ['Yates Row'])
+        exercise.delete()
+        self.assertEqual(self.search('yates'), [])
+
+    def test_requires_login(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url, {'q': 'p'}).status_code, 401)
@@ -0,0 +1,109 @@
+import json
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from muscleforge.models import Exercise, WorkoutPlan, WorkoutSession, ExerciseInSession, ExerciseVolume, PersonalRecord
+
+# Checking that the batch endpoint writes a whole session with a constant number of queries
+class SessionBatchTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='user1', password='test123')
+        self.client.force_login(self.user)
+        self.plan = WorkoutPlan.objects.create(user=self.user, title='Plan', start_date=date(2024, 1, 1), end_date=date(2024, 2, 1))
+        self.exercises = list(Exercise.objects.filter(user=self.user).values_list('id', flat=True))
+
+    def payload(self, count, **fields):
+        rows = [{'exercise': self.exercises[i % len(self.exercises)], 'repetitions': 5, 'sets': 3, 'weight_used': 50 + i}
+                for i in range(count)]
+        return {'workout_plan': self.plan.pk, 'date': '2024-01-02', 'duration': 3600, 'notes': 'Heavy', 'exercises': rows, **fields}
+
+    def post(self, url, payload):
+        return self.client.post(url, json.dumps(payload), content_type='application/json')
+
+    def create(self, count):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.post(reverse('api-session-batch'), self.payload(count))
+        self.assertEqual(response.status_code, 201)
+        return response.json(), len(captured)
+
+    def test_create_queries_do_not_grow_with_rows(self):
+        small, small_queries = self.create(2)
+        large, large_queries = self.create(40)
+        self.assertEqual(small_queries, large_queries)
+        self.assertEqual(len(large['exercises']), 40)
+        self.assertEqual(large['duration'], 3600.0)
+        self.assertEqual(ExerciseInSession.objects.filter(workout_session_id=large['id']).count(), 40)
+
+    def test_update_replaces_rows(self):
+        session, _ = self.create(3)
+        first, second, third = session['exercises']
+        rows = [
+            {'id': first['id'], 'exercise': first['exercise']['id'], 'repetitions': 8, 'sets': 4, 'weight_used': 80},
+            {'id': second['id'], 'exercise': second['exercise']['id'], 'repetitions': 5, 'sets': 3, 'weight_used': None},
+            {'exercise': self.exercises[5], 'repetitions': 10, 'sets': 2},
+        ]
+        url = reverse('api-session-batch-update', kwargs={'pk': session['id']})
+        with CaptureQueriesContext(connection) as small:
+            response = self.post(url, self.payload(0, exercises=rows, date='2024-01-03'))
+        self.assertEqual(response.status_code, 200)
+        entries = list(ExerciseInSession.objects.filter(workout_session_id=session['id']).order_by('id').values_list('id', 'repetitions', 'sets', 'weight_used'))
+        self.assertEqual(entries[:2], [(first['id'], 8, 4, 80.0), (second['id'], 5, 3, None)])
+        self.assertEqual(len(entries), 3)
+        self.assertNotIn(third['id'], [entry[0] for entry in entries])
+        self.assertEqual(set(ExerciseVolume.objects.values_list('date', flat=True)), {date(2024, 1, 3)})
+        self.assertTrue(PersonalRecord.objects.filter(entry_id=first['id'], kind=PersonalRecord.WEIGHT).exists())
+
+        ids = [entry[0] for entry in entries]
+        # Same shape as the first update (one row dropped, two kept, the session moved a day) with many more rows added
+        rows = [{'id': ids[i] if i < 2 else None, 'exercise': self.exercises[i % 11], 'repetitions': 5, 'sets': 3} for i in range(30)]
+        with CaptureQueriesContext(connection) as large:
+            self.post(url, self.payload(0, exercises=rows, date='2024-01-04'))
+        self.assertEqual(len(large), len(small))
+        self.assertEqual(ExerciseInSession.objects.filter(workout_session_id=session['id']).count(), 30)
+
+    def test_validation_reports_every_problem_and_writes_nothing(self):
+        other = User.objects.create_user(username='user2', password='test123')
+        other_plan = WorkoutPlan.objects.create(user=other, title='Other', start_date=date(2024, 1, 1), end_date=date(2024, 2, 1))
+        payload = self.payload(0, workout_plan=other_plan.pk, exercises=[
+            {'exercise': self.exercises[0], 'repetitions': 5, 'sets': 3},
+            {'exercise': Exercise.objects.filter(user=other).first().pk, 'repetitions': 5, 'sets': 3},
+            {'exercise': self.exercises[0], 'repetitions': -1},
+            {'id': 12345, 'exercise': self.exercises[0], 'repetitions': 5, 'sets': 3},
+        ])
+        response = self.post(reverse('api-session-batch'), payload)
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()['errors']
+        self.assertEqual(errors['workout_plan'], ['Unknown workout plan.'])
+        self.assertEqual(set(errors['exercises']), {'1', '2', '3'})
+        self.assertEqual(errors['exercises']['1'], {'exercise': ['Unknown exercise.']})
+        self.assertEqual(set(errors['exercises']['2']), {'repetitions', 'sets'})
+        self.assertEqual(errors['exercises']['3'], {'id': ['Not an exercise row of this session.']})
+        self.assertFalse(WorkoutSession.objects.exists())
+
+    def test_numbers_past_the_column_range_are_field_errors(self):
+        payload = self.payload(0, duration=10 ** 20, exercises=[
+            {'exercise': self.exercises[0], 'repetitions': 10 ** 30, 'sets': 3},
+            {'exercise': 10 ** 30, 'repetitions': 5, 'sets': 3},
+        ])
+        response = self.post(reverse('api-session-batch'), payload)
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()['errors']
+        self.assertEqual(set(errors), {'duration', 'exercises'})
+        self.assertEqual(set(errors['exercises']['0']), {'repetitions'})
+        self.assertEqual(set(errors['exercises']['1']), {'exercise'})
+        self.assertFalse(WorkoutSession.objects.exists())
+
+    def test_other_users_session_and_bad_requests(self):
+        session, _ = self.create(1)
+        other = User.objects.create_user(username='user2', password='test123')
+        self.client.force_login(other)
+        url = reverse('api-session-batch-update', kwargs={'pk': session['id']})
+        self.assertEqual(self.post(url, self.payload(1)).status_code, 404)
+        response = self.client.post(reverse('api-session-batch'), 'not json', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(reverse('api-session-batch')).status_code, 405)
@@ -0,0 +1,64 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import URLResolver, get_resolver
+
+from muscleforge.benchmark import UNBUDGETED_ROUTES, seed_user_data, benchmark_routes, measure, format_report
+
+BUDGETS_PATH = Path(__file__).with_name('budgets.json')
+
+# Query counts, p95 latency and p95 template render time for every route, measured against a seeded account.
+# Set MUSCLEFORGE_BENCHMARK_REPORT=1 to print the measured numbers.
+class RouteBudgetTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # Staff, so that /metrics is measured too
+        cls.user = User.objects.create_user(username='benchuser', password='12345', is_staff=True)
+        seed_user_data(cls.user)
+        # A second account so that every query has rows to filter out
+        other_user = User.objects.create_user(username='otheruser', password='12345')
+        seed_user_data(other_user, seed=1)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        with open(BUDGETS_PATH) as budgets_file:
+            self.budgets = json.load(budgets_file)
+
+    def test_routes_stay_within_budget(self):
+        results = {}
+        for name, url in benchmark_routes(self.user):
+            results[name] = result = measure(self.client, url)
+            with self.subTest(route=name):
+                self.assertIn(name, self.budgets, f'No budget checked in for {name}')
+                budget = self.budgets[name]
+                self.assertEqual(result['status'], 200)
+                self.assertLessEqual(result['queries'], budget['queries'])
+                self.assertLessEqual(result['p95_ms'], budget['p95_ms'])
+                self.assertLessEqual(result['render_p95_ms'], budget['render_p95_ms'])
+
+        if os.environ.get('MUSCLEFORGE_BENCHMARK_REPORT'):
+            sys.stderr.write('\n' + format_report(results) + '\n')
+
+    def test_every_route_is_budgeted(self):
+        # New routes need a budget, or a reason in UNBUDGETED_ROUTES
+        benchmarked = {name for name, url in benchmark_routes(self.user)}
+        self.assertEqual(route_names(get_resolver()) - set(UNBUDGETED_ROUTES), benchmarked)
+        self.assertEqual(set(self.budgets), benchmarked)
+
+def route_names(resolver):
+    """The names of the project's routes, leaving out the admin site's."""
+    names = set()
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            if pattern.namespace != 'admin':
+                names |= route_names(pattern)
+        elif pattern.name:
+            names.add(pattern.name)
+    return names
@@ -0,0 +1,59 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from muscleforge.benchmark import seed_user_data
+from muscleforge.management.commands.explain_queries import full_scans
+from muscleforge.models import Exercise, WorkoutPlan, WorkoutSession, ExerciseInSession, Goal
+
+def history(prefix):
+    entries = ExerciseInSession.objects.filter(workout_session__workout_plan__user__username__startswith=prefix)
+    return (
+        list(WorkoutPlan.objects.filter(user__username__startswith=prefix).values_list('title', 'start_date', 'status').order_by('id')),
+        list(WorkoutSession.objects.filter(workout_plan__user__username__startswith=prefix).values_list('date', 'duration').order_by('id')),
+        list(entries.values_list('exercise__name', 'repetitions', 'sets', 'weight_used').order_by('id')),
+        list(Goal.objects.filter(user__username__startswith=prefix).values_list('start_date', 'end_date', 'status').order_by('id')),
+    )
+
+# Checking that generate_data is reproducible and matches what the signals create for a regular user
+class GenerateDataCommandTest(TestCase):
+
+    def generate(self, prefix, *args):
+        call_command('generate_data', '--users', '3', '--years', '1', '--seed', '7',
+                     '--end-date', '2024-01-01', '--prefix', prefix, *args, stdout=StringIO())
+
+    def test_same_seed_generates_same_history(self):
+        self.generate('first')
+        self.generate('second')
+        self.assertEqual(User.objects.filter(username__startswith='first').count(), 3)
+        self.assertTrue(ExerciseInSession.objects.exists())
+        self.assertEqual(history('first'), history('second'))
+
+    def test_fast_path_matches_signal_catalog(self):
+        self.generate('fast')
+        self.generate('slow', '--with-signals')
+        for username in ['fast0', 'slow0']:
+            user = User.objects.get(username=username)
+            self.assertIsNotNone(user.userprofile)
+        fast = list(Exercise.objects.filter(user__username='fast0').values_list('name', 'description', 'difficulty_level', 'exercise_type', 'equipment_needed').order_by('id'))
+        slow = list(Exercise.objects.filter(user__username='slow0').values_list('name', 'description', 'difficulty_level', 'exercise_type', 'equipment_needed').order_by('id'))
+        self.assertEqual(len(fast), 11)
+        self.assertEqual(fast, slow)
+        self.assertEqual(history('fast'), history('slow'))
+
+# Checking that every view's queries are answered from indexes on benchmark-sized data
+class ExplainQueriesCommandTest(TestCase):
+
+    def test_flags_full_scans(self):
+        self.assertEqual(full_scans(['SCAN muscleforge_goal']), ['SCAN muscleforge_goal'])
+        self.assertEqual(full_scans(['SEARCH muscleforge_goal USING INDEX goal_user_status_idx (user_id=? AND status=?)']), [])
+        self.assertEqual(full_scans(['SCAN muscleforge_goal USING INDEX goal_user_start_idx', 'SCAN CONSTANT ROW']), [])
+
+    def test_views_do_not_scan_tables(self):
+        user = User.objects.create_user(username='benchuser', password='12345')
+        seed_user_data(user)
+        seed_user_data(User.objects.create_user(username='otheruser', password='12345'), seed=1)
+        out = StringIO()
+        call_command('explain_queries', '--username', 'benchuser', '--fail-on-scan', stdout=out)
+        self.assertIn('No full table scans found', out.getvalue())
@@ -0,0 +1,52 @@
+import os
+import tempfile
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.db import connections
+from django.test import SimpleTestCase, TestCase, override_settings
+from muscleforge.benchmark import log_sessions
+from muscleforge.models import WorkoutPlan, WorkoutSession, ExerciseInSession
+
+PRODUCTION_PRAGMAS = {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'busy_timeout': 20000, 'mmap_size': 1024 * 1024, 'cache_size': -4096}
+
+# Checking that the configured pragmas are set on every new connection
+class SqlitePragmasTest(SimpleTestCase):
+
+    def open(self, path):
+        wrapper = connections['default'].__class__({**connections['default'].settings_dict, 'NAME': path}, alias='pragmas')
+        wrapper.ensure_connection()
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_production_pragmas(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(MUSCLEFORGE_SQLITE_PRAGMAS=PRODUCTION_PRAGMAS):
+            wrapper = self.open(os.path.join(directory, 'db.sqlite3'))
+            self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+            # NORMAL
+            self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)
+            self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 20000)
+            self.assertEqual(self.pragma(wrapper, 'mmap_size'), 1024 * 1024)
+            self.assertEqual(self.pragma(wrapper, 'cache_size'), -4096)
+
+    def test_no_pragmas_by_default(self):
+        with tempfile.TemporaryDirectory() as directory:
+            wrapper = self.open(os.path.join(directory, 'db.sqlite3'))
+            self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'delete')
+
+# Checking the session logging each benchmark_writes worker runs
+class LogSessionsTest(TestCase):
+
+    def test_logs_sessions_through_the_batch_path(self):
+        user = User.objects.create_user(username='writebench0', password='12345')
+        WorkoutPlan.objects.create(user=user, title='Write benchmark', start_date=date(2024, 1, 1), end_date=date(2024, 1, 1) + timedelta(days=28))
+        result = log_sessions(user.pk, sessions=5, rows=4)
+        self.assertEqual(len(result['latencies']), 5)
+        self.assertEqual(result['locked'], 0)
+        self.assertEqual(WorkoutSession.objects.filter(workout_plan__user=user).count(), 5)
+        self.assertEqual(ExerciseInSession.objects.filter(workout_session__workout_plan__user=user).count(), 20)
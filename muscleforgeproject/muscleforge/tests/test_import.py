@@ -0,0 +1,131 @@
+import json
+import os
+import tempfile
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from muscleforge.importer import WorkoutImportError, read_records, import_workouts
+from muscleforge.models import Exercise, WorkoutPlan, WorkoutSession, ExerciseInSession, ExerciseVolume, PersonalRecord
+
+STRONG_CSV = b'''Date,Workout Name,Exercise Name,Set Order,Weight (kg),Reps,Notes
+2024-01-30 18:00:00,Push,bench press,1,60,8,
+2024-01-30 18:00:00,Push,bench press,2,60,8,
+2024-01-30 18:00:00,Push,bench press,3,65,6,felt strong
+2024-01-30 18:00:00,Push,Cable Fly,1,,12,
+2024-02-02 07:30:00,Legs,Squats,1,100,5,
+'''
+
+def import_csv(user, content=STRONG_CSV, **kwargs):
+    return import_workouts(user, read_records(BytesIO(content), 'csv'), **kwargs)
+
+# Checking that workout logs from other trackers are imported in bulk
+class WorkoutImportTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='user1', password='test123')
+
+    def test_imports_sessions_and_merges_sets(self):
+        summary = import_csv(self.user)
+        self.assertEqual(summary, {'exercises_created': 1, 'plans': 2, 'sessions': 2, 'entries': 4})
+
+        plans = WorkoutPlan.objects.filter(user=self.user).order_by('start_date')
+        self.assertEqual([plan.title for plan in plans], ['Imported January 2024', 'Imported February 2024'])
+        self.assertEqual(plans[0].end_date, date(2024, 1, 31))
+
+        session = WorkoutSession.objects.get(workout_plan=plans[0])
+        self.assertEqual(session.notes, 'Push\nfelt strong')
+        entries = list(session.exerciseinsession_set.order_by('id').values_list('exercise__name', 'sets', 'repetitions', 'weight_used'))
+        self.assertEqual(entries, [('Bench Press', 2, 8, 60.0), ('Bench Press', 1, 6, 65.0), ('Cable Fly', 1, 12, None)])
+        self.assertEqual(Exercise.objects.filter(user=self.user, name__iexact='bench press').count(), 1)
+
+    def test_rebuilds_read_models(self):
+        import_csv(self.user)
+        self.assertEqual(ExerciseVolume.objects.filter(user=self.user).count(), 3)
+        squat = Exercise.objects.get(user=self.user, name='Squats')
+        self.assertEqual(PersonalRecord.objects.get(exercise=squat, kind=PersonalRecord.WEIGHT).value, 100.0)
+
+    def test_invalid_rows_import_nothing(self):
+        content = b'date,exercise,reps,weight\n2024-01-30,Squats,5,100\nyesterday,Squats,-1,heavy\n2024-01-31,,5,\n'
+        with self.assertRaises(WorkoutImportError) as raised:
+            import_csv(self.user, content)
+        self.assertEqual(raised.exception.errors, [
+            "Row 3: invalid date 'yesterday'",
+            'Row 3: repetitions must be a whole number of at least 0',
+            "Row 3: invalid weight_used 'heavy'",
+            'Row 4: exercise is required',
+        ])
+        self.assertFalse(WorkoutSession.objects.exists())
+
+    def test_counts_past_the_column_range_are_row_errors(self):
+        content = b'date,exercise,reps,sets,weight,duration\n2024-01-30,Zercher Squat,inf,1,,\n2024-01-30,Zercher Squat,1e30,1,nan,\n2024-01-30,Zercher Squat,5,1,,1e20\n'
+        with self.assertRaises(WorkoutImportError) as raised:
+            import_csv(self.user, content)
+        self.assertEqual(raised.exception.errors, [
+            'Row 2: repetitions must be a whole number of at least 0',
+            'Row 3: repetitions must be at most 2147483647',
+            'Row 3: weight_used must be a number',
+            'Row 4: duration must be at most 2147483647',
+        ])
+        self.assertFalse(Exercise.objects.filter(name='Zercher Squat').exists())
+
+    def test_failed_import_leaves_nothing_behind(self):
+        with mock.patch('muscleforge.importer.rebuild_records', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                import_csv(self.user)
+        self.assertFalse(Exercise.objects.filter(user=self.user, exercise_type='Imported').exists())
+        self.assertFalse(WorkoutPlan.objects.filter(user=self.user).exists())
+        self.assertFalse(WorkoutSession.objects.exists())
+
+    def test_queries_do_not_grow_with_rows(self):
+        start = date(2020, 1, 1)
+        rows = [{'date': (start + timedelta(days=day)).isoformat(), 'exercise': 'Squats', 'reps': 5, 'weight': 100}
+                for day in range(0, 60, 2)]
+        with CaptureQueriesContext(connection) as small:
+            import_workouts(self.user, rows[:2])
+        with CaptureQueriesContext(connection) as large:
+            import_workouts(self.user, rows)
+        self.assertEqual(len(large), len(small))
+
+    def test_batches_give_the_same_result(self):
+        import_csv(self.user, batch_size=1)
+        other = User.objects.create_user(username='user2', password='test123')
+        import_csv(other)
+        history = lambda user: list(ExerciseInSession.objects.filter(workout_session__workout_plan__user=user).order_by('id').values_list(
+            'workout_session__date', 'exercise__name', 'sets', 'repetitions', 'weight_used'))
+        self.assertEqual(history(self.user), history(other))
+
+    def test_view_imports_json(self):
+        self.client.force_login(self.user)
+        rows = [{'date': '2024-03-01', 'exercise': 'Squats', 'sets': 5, 'repetitions': 5, 'weight_used': 80}]
+        upload = SimpleUploadedFile('log.json', json.dumps(rows).encode(), content_type='application/json')
+        response = self.client.post(reverse('workout-import'), {'file': upload}, follow=True)
+        self.assertRedirects(response, reverse('workoutplan-list'))
+        self.assertContains(response, 'Imported 1 sessions')
+        self.assertEqual(ExerciseInSession.objects.get().sets, 5)
+
+    def test_view_shows_row_errors(self):
+        self.client.force_login(self.user)
+        upload = SimpleUploadedFile('log.csv', b'date,exercise\n2024-03-01,Squats\n')
+        response = self.client.post(reverse('workout-import'), {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Row 2: repetitions is required')
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'log.csv')
+            with open(path, 'wb') as file:
+                file.write(STRONG_CSV)
+            out = StringIO()
+            call_command('import_workouts', path, '--username', 'user1', stdout=out)
+            self.assertIn('Imported 2 sessions', out.getvalue())
+            with self.assertRaises(CommandError):
+                call_command('import_workouts', path, '--username', 'nobody', stdout=out)
@@ -0,0 +1,64 @@
+import re
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from muscleforge.models import WorkoutPlan
+
+SERVER_TIMING = re.compile(r'db;dur=([\d.]+);desc="(\d+) queries", tpl;dur=([\d.]+), view;dur=([\d.]+), total;dur=([\d.]+)')
+
+
+def server_timing(response):
+    match = SERVER_TIMING.fullmatch(response.headers['Server-Timing'])
+    db, queries, template, view, total = match.groups()
+    return int(queries), float(db), float(template), float(view), float(total)
+
+
+# Checking that every response reports its queries and db, template and view times
+class ServerTimingTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='user1', password='test123')
+        self.client.force_login(self.user)
+        self.async_client.force_login(self.user)
+        self.plan = WorkoutPlan.objects.create(user=self.user, title='Plan', start_date=date.today(), end_date=date.today() + timedelta(days=30))
+
+    def test_header_matches_page_queries(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse('workoutplan-detail', kwargs={'pk': self.plan.pk}))
+        queries, db, template, view, total = server_timing(response)
+        self.assertEqual(queries, len(captured))
+        self.assertGreater(template, 0)
+        # The parts are rounded separately
+        self.assertAlmostEqual(db + template + view, total, delta=0.2)
+
+    def test_json_responses_have_no_template_time(self):
+        response = self.client.get(reverse('api-plan-list'))
+        queries, db, template, view, total = server_timing(response)
+        self.assertGreater(queries, 0)
+        self.assertEqual(template, 0)
+
+    @override_settings(ROOT_URLCONF='muscleforge.tests.async_urls')
+    async def test_async_views_count_their_queries(self):
+        response = await self.async_client.get(reverse('workoutplan-detail', kwargs={'pk': self.plan.pk}))
+        queries, db, template, view, total = server_timing(response)
+        self.assertGreater(queries, 0)
+        self.assertGreater(template, 0)
+
+    @override_settings(MUSCLEFORGE_SERVER_TIMING=False)
+    def test_header_can_be_turned_off(self):
+        self.assertNotIn('Server-Timing', self.client.get(reverse('workoutplan-list')).headers)
+
+    def test_slow_requests_are_logged(self):
+        with self.assertNoLogs('muscleforge.performance'):
+            self.client.get(reverse('workoutplan-list'))
+        with override_settings(MUSCLEFORGE_SLOW_REQUEST_MS=0), self.assertLogs('muscleforge.performance', 'WARNING') as logs:
+            self.client.get(reverse('workoutplan-list'))
+        record, = logs.records
+        self.assertEqual((record.route, record.status, record.method), ('workoutplan-list', 200, 'GET'))
+        self.assertIn('queries=', record.getMessage())
@@ -0,0 +1,97 @@
+import multiprocessing
+import re
+import tempfile
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from muscleforge.metrics import Metrics, metrics
+from muscleforge.models import WorkoutPlan, WorkoutSession
+
+SAMPLE = re.compile(r'^(\w+)(\{.*\})? (\S+)$')
+
+
+def log_in_child(count):
+    for _ in range(count):
+        metrics.inc('muscleforge_workout_sessions_logged_total')
+    metrics.flush(force=True)
+
+
+# Checking that /metrics reports requests, queries, cache reads and logged sessions
+@override_settings(MUSCLEFORGE_METRICS_TOKEN='scrape-token')
+class MetricsEndpointTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='user1', password='test123')
+        self.client.force_login(self.user)
+        self.plan = WorkoutPlan.objects.create(user=self.user, title='Plan', start_date=date.today(), end_date=date.today() + timedelta(days=30))
+
+    def scrape(self, **extra):
+        extra.setdefault('HTTP_AUTHORIZATION', 'Bearer scrape-token')
+        response = self.client.get(reverse('metrics'), **extra)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        samples = {}
+        for line in response.content.decode().splitlines():
+            if not line.startswith('#'):
+                name, labels, value = SAMPLE.match(line).groups()
+                samples[name + (labels or '')] = float(value)
+        return samples
+
+    def test_requests_and_queries_per_route(self):
+        before = self.scrape()
+        self.client.get(reverse('goal-list'))
+        self.client.get(reverse('goal-list'))
+        after = self.scrape()
+        requests = 'muscleforge_http_requests_total{route="goal-list",method="GET",status="200"}'
+        self.assertEqual(after[requests] - before.get(requests, 0), 2)
+        count = 'muscleforge_http_request_duration_seconds_count{route="goal-list"}'
+        self.assertEqual(after[count] - before.get(count, 0), 2)
+        self.assertEqual(after['muscleforge_http_request_duration_seconds_bucket{route="goal-list",le="+Inf"}'], after[count])
+        self.assertGreater(after['muscleforge_db_queries_total{route="goal-list"}'], before.get('muscleforge_db_queries_total{route="goal-list"}', 0))
+
+    def test_cache_reads_and_business_counters(self):
+        before = self.scrape()
+        self.client.get(reverse('muscleforge-home'))
+        self.client.get(reverse('muscleforge-home'))
+        WorkoutSession.objects.create(workout_plan=self.plan, date=date.today(), duration=timedelta(minutes=30), notes='')
+        after = self.scrape()
+        hits = 'muscleforge_cache_gets_total{result="hit"}'
+        self.assertGreater(after[hits], before.get(hits, 0))
+        self.assertTrue(0 < after['muscleforge_cache_hit_ratio'] <= 1)
+        sessions = 'muscleforge_workout_sessions_logged_total'
+        self.assertEqual(after[sessions] - before.get(sessions, 0), 1)
+
+    def test_only_token_or_staff(self):
+        # Behind a local proxy every request comes from localhost
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='127.0.0.1').status_code, 403)
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        with override_settings(MUSCLEFORGE_METRICS_TOKEN=None):
+            self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer None').status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        self.scrape(HTTP_AUTHORIZATION='')
+
+    def test_worker_processes_add_up(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(MUSCLEFORGE_METRICS_DIR=directory):
+            before = self.scrape().get('muscleforge_workout_sessions_logged_total', 0)
+            workers = [multiprocessing.get_context('fork').Process(target=log_in_child, args=(3,)) for _ in range(2)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            after = self.scrape()['muscleforge_workout_sessions_logged_total']
+        self.assertEqual(after - before, 6)
+
+    def test_reused_pid_keeps_the_dead_workers_counts(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(MUSCLEFORGE_METRICS_DIR=directory):
+            for _ in range(2):
+                # Two processes, one after the other, given the same pid
+                worker = Metrics()
+                worker.inc('muscleforge_workout_sessions_logged_total', amount=2)
+                worker.flush(force=True)
+            counters, _ = Metrics().collect()
+        self.assertEqual(counters[('muscleforge_workout_sessions_logged_total', ())], 4)
@@ -0,0 +1,62 @@
+from datetime import date, timedelta
+
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+# Checking that the migrations creating read models fill them from the history
+# that's already stored, so an upgraded database doesn't need a manual rebuild
+class ReadModelBackfillTest(TransactionTestCase):
+
+    def migrate(self, *targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(list(targets))
+        executor.loader.build_graph()
+        return executor.loader.project_state(list(targets)).apps
+
+    def tearDown(self):
+        self.migrate(*MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def seed(self, apps):
+        """Two sessions on one day and one on the next, logged before the read models existed."""
+        User = apps.get_model('auth', 'User')
+        Exercise = apps.get_model('muscleforge', 'Exercise')
+        WorkoutPlan = apps.get_model('muscleforge', 'WorkoutPlan')
+        WorkoutSession = apps.get_model('muscleforge', 'WorkoutSession')
+        ExerciseInSession = apps.get_model('muscleforge', 'ExerciseInSession')
+
+        user = User.objects.create(username='lifter')
+        squat = Exercise.objects.create(user=user, name='Squat', description='', difficulty_level='Beginner', exercise_type='Strength', equipment_needed='Barbell')
+        plan = WorkoutPlan.objects.create(user=user, title='Plan', start_date=date(2024, 1, 1), end_date=date(2024, 2, 1))
+        for day, weight in [(1, 100), (1, 110), (2, None)]:
+            session = WorkoutSession.objects.create(workout_plan=plan, date=date(2024, 1, day), duration=timedelta(minutes=45), notes='')
+            ExerciseInSession.objects.create(workout_session=session, exercise=squat, repetitions=5, sets=3, weight_used=weight)
+        return user, squat
+
+    def test_volume_is_backfilled(self):
+        user, squat = self.seed(self.migrate(('muscleforge', '0011_access_path_indexes')))
+        ExerciseVolume = self.migrate(('muscleforge', '0012_exercisevolume')).get_model('muscleforge', 'ExerciseVolume')
+        self.assertEqual(
+            sorted(ExerciseVolume.objects.values_list('user_id', 'exercise_id', 'date', 'volume', 'total_reps', 'max_weight')),
+            [(user.pk, squat.pk, date(2024, 1, 1), 3150.0, 30, 110.0), (user.pk, squat.pk, date(2024, 1, 2), 0.0, 15, None)],
+        )
+
+    def test_records_are_backfilled(self):
+        user, squat = self.seed(self.migrate(('muscleforge', '0011_access_path_indexes')))
+        apps = self.migrate(('muscleforge', '0013_personalrecord'))
+        PersonalRecord = apps.get_model('muscleforge', 'PersonalRecord')
+        heaviest = apps.get_model('muscleforge', 'ExerciseInSession').objects.get(weight_used=110)
+        records = {(record.kind, record.at_weight): (record.value, record.entry_id) for record in PersonalRecord.objects.filter(user_id=user.pk, exercise_id=squat.pk)}
+        self.assertEqual(records[('weight', 0.0)], (110.0, heaviest.pk))
+        self.assertEqual(records[('reps', 0.0)][0], 5)
+        self.assertEqual(len(records), 6)
+
+    def test_session_counts_are_backfilled_into_missing_rows(self):
+        user, squat = self.seed(self.migrate(('muscleforge', '0011_access_path_indexes')))
+        # A database that ran 0012 while it still created the table empty
+        self.migrate(('muscleforge', '0013_personalrecord')).get_model('muscleforge', 'ExerciseVolume').objects.all().delete()
+        ExerciseVolume = self.migrate(('muscleforge', '0014_exercisevolume_sessions')).get_model('muscleforge', 'ExerciseVolume')
+        self.assertEqual(
+            sorted(ExerciseVolume.objects.values_list('user_id', 'exercise_id', 'date', 'volume', 'weighted_reps', 'sessions')),
+            [(user.pk, squat.pk, date(2024, 1, 1), 3150.0, 30, 2), (user.pk, squat.pk, date(2024, 1, 2), 0.0, 0, 1)],
+        )
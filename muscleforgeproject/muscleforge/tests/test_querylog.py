@@ -0,0 +1,104 @@
+import os
+import tempfile
+from datetime import date, timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from muscleforge.models import Exercise, WorkoutPlan, WorkoutSession, ExerciseInSession, Goal
+from muscleforge.querylog import fingerprint, percentile_from_histogram, query_log, read_log, BUCKETS
+
+# Checking that queries differing only in their values share a fingerprint
+class FingerprintTest(SimpleTestCase):
+
+    def test_literals_and_lists_are_stripped(self):
+        self.assertEqual(
+            fingerprint('SELECT "a"."id" FROM "a" WHERE ("a"."id" IN (%s, %s, %s) AND "a"."name" = \'it\'\'s\')  LIMIT 21'),
+            'SELECT "a"."id" FROM "a" WHERE ("a"."id" IN (...) AND "a"."name" = ?) LIMIT ?',
+        )
+        self.assertEqual(fingerprint('SELECT * FROM t WHERE id IN (%s)'), fingerprint('SELECT * FROM t WHERE id IN (%s, %s)'))
+        self.assertEqual(fingerprint('INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)'), 'INSERT INTO t (a, b) VALUES (...)')
+        # Digits inside identifiers, like Django's T3 aliases, are kept
+        self.assertEqual(fingerprint('SELECT T3."id" FROM t T3'), 'SELECT T3."id" FROM t T3')
+
+    def test_percentile_is_a_bucket_bound(self):
+        histogram = [0] * (len(BUCKETS) + 1)
+        histogram[BUCKETS.index(1)] = 95
+        histogram[BUCKETS.index(100)] = 5
+        self.assertEqual(percentile_from_histogram(histogram, 95), 1)
+        self.assertEqual(percentile_from_histogram(histogram, 99), 100)
+
+
+# Checking that logged queries are aggregated per view and fingerprint and reported
+class QueryLogTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        query_log.drain()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, 'queries.log')
+        settings = override_settings(MUSCLEFORGE_QUERY_LOG=True, MUSCLEFORGE_QUERY_LOG_PATH=self.path, MUSCLEFORGE_SLOW_QUERY_MS=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(self.close_log)
+
+        self.user = User.objects.create_user(username='user1', password='test123')
+        self.client.force_login(self.user)
+        self.plan = WorkoutPlan.objects.create(user=self.user, title='Plan', start_date=date.today(), end_date=date.today() + timedelta(days=30))
+        self.session = WorkoutSession.objects.create(workout_plan=self.plan, date=date.today(), duration=timedelta(minutes=45), notes='')
+        for exercise in Exercise.objects.filter(user=self.user)[:3]:
+            ExerciseInSession.objects.create(workout_session=self.session, exercise=exercise, repetitions=5, sets=3, weight_used=50)
+        Goal.objects.create(user=self.user, title='Goal', description='Squat more', start_date=date.today(), end_date=date.today() + timedelta(days=30))
+
+    def close_log(self):
+        from muscleforge.querylog import logger
+        for handler in logger.handlers[:]:
+            handler.close()
+            logger.removeHandler(handler)
+
+    def test_flushed_log_adds_up(self):
+        url = reverse('workoutsession-detail', kwargs={'workoutplan_pk': self.plan.pk, 'session_pk': self.session.pk})
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get(url)
+            self.client.get(url)
+            query_log.flush()
+            self.client.get(url)
+            query_log.flush()
+
+        stats, requests = read_log(self.path)
+        self.assertEqual(requests['WorkoutSessionDetailView'], 3)
+        # Every query run is counted once, across both flushes
+        self.assertEqual(sum(entry.count for entry in stats.values()), len(captured))
+        entries = {key: entry for key, entry in stats.items() if key[0] == 'WorkoutSessionDetailView'}
+        # No query runs more than once per page, however many exercises the session has
+        self.assertEqual(max(entry.count for entry in entries.values()), 3)
+        samples = [entry.sample for entry in entries.values() if entry.sample and entry.sample['sql'].startswith('SELECT')]
+        self.assertTrue(samples)
+        self.assertTrue(all(sample['plan'] for sample in samples))
+
+    def test_report(self):
+        url = reverse('workoutsession-detail', kwargs={'workoutplan_pk': self.plan.pk, 'session_pk': self.session.pk})
+        self.client.get(url)
+        self.client.get(reverse('workoutplan-list'))
+        query_log.flush()
+
+        out = StringIO()
+        call_command('query_report', '--log', self.path, '--sort', 'per-request', '--samples', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith('view'))
+        self.assertIn('WorkoutSessionDetailView', out.getvalue())
+        self.assertIn('WorkoutPlanListView', out.getvalue())
+        self.assertIn('slowest', out.getvalue())
+
+    def test_profile_requests_the_pages(self):
+        out = StringIO()
+        call_command('query_report', '--profile', '--username', 'user1', '--by', 'fingerprint', '--limit', '5', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 6)
+        self.assertFalse(os.path.exists(self.path))
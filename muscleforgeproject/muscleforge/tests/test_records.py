@@ -0,0 +1,91 @@
+from datetime import date
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from muscleforge.models import Exercise, WorkoutPlan, WorkoutSession, ExerciseInSession, PersonalRecord
+from muscleforge.records import epley, brzycki
+from muscleforge.tests.test_volume import session_data
+
+def record_table():
+    return sorted(PersonalRecord.objects.values_list('exercise_id', 'kind', 'at_weight', 'value', 'entry_id'))
+
+# Checking the one-rep max estimates
+class EstimatedOneRepMaxTest(TestCase):
+
+    def test_estimates(self):
+        self.assertEqual(epley(100, 1), 100)
+        self.assertAlmostEqual(epley(100, 10), 133.33, places=2)
+        self.assertEqual(brzycki(100, 1), 100)
+        self.assertAlmostEqual(brzycki(100, 10), 133.33, places=2)
+        self.assertIsNone(brzycki(100, 37))
+
+# Checking that personal records follow session writes and are flagged on the session page
+class PersonalRecordTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='user1', password='test123')
+        self.client.force_login(self.user)
+        self.plan = WorkoutPlan.objects.create(user=self.user, title='Plan', start_date=date(2024, 1, 1), end_date=date(2024, 2, 1))
+        self.squat = Exercise.objects.filter(user=self.user).first()
+
+    def log(self, day, weight, reps=5):
+        self.client.post(reverse('workoutsession-new', kwargs={'workoutplan_pk': self.plan.pk}), session_data(self.plan, day, [
+            {'exercise': self.squat.pk, 'repetitions': reps, 'sets': 3, 'weight_used': weight},
+        ]))
+        return ExerciseInSession.objects.latest('id')
+
+    def record(self, kind, at_weight=0):
+        return PersonalRecord.objects.get(exercise=self.squat, kind=kind, at_weight=at_weight)
+
+    def detail_url(self, entry):
+        return reverse('workoutsession-detail', kwargs={'workoutplan_pk': self.plan.pk, 'session_pk': entry.workout_session_id})
+
+    def test_heavier_lift_takes_over_records(self):
+        first = self.log('2024-01-02', 100)
+        second = self.log('2024-01-04', 110)
+        self.assertEqual(self.record(PersonalRecord.WEIGHT).entry, second)
+        self.assertEqual(self.record(PersonalRecord.EPLEY).value, epley(110, 5))
+        self.assertEqual(self.record(PersonalRecord.REPS, 100).entry, first)
+        self.assertEqual(self.record(PersonalRecord.REPS, 110).entry, second)
+
+    def test_equal_lift_keeps_first_holder(self):
+        first = self.log('2024-01-02', 100)
+        self.log('2024-01-04', 100)
+        self.assertEqual(self.record(PersonalRecord.WEIGHT).entry, first)
+
+    def test_lowering_or_deleting_holder_falls_back_to_history(self):
+        first = self.log('2024-01-02', 100)
+        second = self.log('2024-01-04', 110)
+        self.client.post(reverse('workoutsession-update', kwargs={'workoutplan_pk': self.plan.pk, 'session_pk': second.workout_session_id}), session_data(self.plan, '2024-01-04', [
+            {'id': second.pk, 'exercise': self.squat.pk, 'repetitions': 5, 'sets': 3, 'weight_used': 90},
+        ], initial=1))
+        self.assertEqual(self.record(PersonalRecord.WEIGHT).entry, first)
+
+        third = self.log('2024-01-06', 120)
+        self.client.post(reverse('workoutsession-delete', kwargs={'workoutplan_pk': self.plan.pk, 'session_pk': third.workout_session_id}))
+        self.assertEqual(self.record(PersonalRecord.WEIGHT).entry, first)
+        self.assertFalse(PersonalRecord.objects.filter(at_weight=120).exists())
+
+    def test_session_page_flags_record_rows(self):
+        first = self.log('2024-01-02', 100)
+        response = self.client.get(self.detail_url(first))
+        self.assertContains(response, 'PR: Heaviest weight')
+        second = self.log('2024-01-04', 110)
+        self.assertNotContains(self.client.get(self.detail_url(first)), 'PR: Heaviest weight')
+        self.assertContains(self.client.get(self.detail_url(second)), 'PR: Heaviest weight')
+
+    def test_rebuild_matches_incremental_updates(self):
+        self.log('2024-01-02', 100, reps=8)
+        self.log('2024-01-03', '', reps=20)
+        self.log('2024-01-04', 110)
+        self.log('2024-01-05', 100, reps=10)
+        incremental = record_table()
+        PersonalRecord.objects.all().delete()
+        call_command('rebuild_records', stdout=StringIO())
+        self.assertEqual(record_table(), incremental)
+
+        self.client.post(reverse('workoutplan-delete', kwargs={'pk': self.plan.pk}))
+        self.assertEqual(record_table(), [])
@@ -0,0 +1,70 @@
+import gzip
+import os
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.test import TestCase, override_settings
+from muscleforge.storage import CompressedManifestStaticFilesStorage
+
+CSS = 'body { background: url("icon.svg"); }\n' + '.card { margin: 0 auto; padding: 1rem; }\n' * 40
+SVG = '<svg xmlns="http://www.w3.org/2000/svg"><rect width="10" height="10"/></svg>'
+
+# Checking that collected assets get hashed names and precompressed copies, and are served with far-future caching
+class StaticAssetPipelineTest(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = os.path.join(directory.name, 'collected')
+        source = FileSystemStorage(location=os.path.join(directory.name, 'source'))
+        for name, content in [('css/app.css', CSS), ('css/icon.svg', SVG), ('js/tiny.js', 'let a = 1;')]:
+            source.save(name, ContentFile(content))
+        self.storage = CompressedManifestStaticFilesStorage(location=self.root, base_url='/static/')
+        paths = {}
+        for name in ['css/app.css', 'css/icon.svg', 'js/tiny.js']:
+            self.storage.save(name, source.open(name))
+            paths[name] = (source, name)
+        list(self.storage.post_process(paths))
+        self.css = self.storage.stored_name('css/app.css')
+
+    def read(self, name):
+        with open(os.path.join(self.root, name), 'rb') as file:
+            return file.read()
+
+    def test_collect_hashes_and_compresses(self):
+        self.assertRegex(self.css, r'^css/app\.[0-9a-f]{12}\.css$')
+        self.assertEqual(gzip.decompress(self.read(self.css + '.gz')), self.read(self.css))
+        # References between assets point at the hashed names
+        self.assertIn(os.path.basename(self.storage.stored_name('css/icon.svg')).encode(), self.read(self.css))
+        # Too small to be worth compressing
+        self.assertFalse(os.path.exists(os.path.join(self.root, self.storage.stored_name('js/tiny.js') + '.gz')))
+
+    def test_uncollected_names_are_linked_unhashed(self):
+        self.assertEqual(self.storage.stored_name('css/missing.css'), 'css/missing.css')
+
+    def test_serves_precompressed_hashed_assets_as_immutable(self):
+        with override_settings(STATIC_ROOT=self.root, MUSCLEFORGE_SERVE_STATIC=True):
+            response = self.client.get(f'/static/{self.css}', HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertEqual(response['Content-Type'], 'text/css')
+            self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+            self.assertEqual(response['Vary'], 'Accept-Encoding')
+            self.assertEqual(b''.join(response.streaming_content), self.read(self.css + '.gz'))
+
+            response = self.client.get(f'/static/{self.css}')
+            self.assertNotIn('Content-Encoding', response)
+            self.assertEqual(b''.join(response.streaming_content), self.read(self.css))
+
+    def test_unhashed_names_are_revalidated(self):
+        with override_settings(STATIC_ROOT=self.root, MUSCLEFORGE_SERVE_STATIC=True):
+            response = self.client.get('/static/css/app.css')
+            self.assertEqual(response['Cache-Control'], 'public, no-cache')
+            response = self.client.get('/static/css/app.css', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(self.client.get('/static/../source/css/app.css').status_code, 404)
+            self.assertEqual(self.client.get('/static/css/missing.css').status_code, 404)
+
+    def test_disabled_by_default_under_debug(self):
+        with override_settings(STATIC_ROOT=self.root, MUSCLEFORGE_SERVE_STATIC=False):
+            self.assertEqual(self.client.get(f'/static/{self.css}').status_code, 404)
@@ -1,9 +1,23 @@
-from django.test import TestCase
+import re
+from django.db import connection
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth.models import User
-from muscleforge.models import Exercise, WorkoutPlan, WorkoutSession, Goal
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache, caches
+from unittest import mock
+from muscleforge.caching import DatabaseCache, version_key
+from muscleforge.models import Exercise, WorkoutPlan, WorkoutSession, ExerciseInSession, Goal
+from muscleforge.pagination import encode_cursor
+from muscleforge.signals import TRAINING_NAMESPACES
 from datetime import date, timedelta
 
+# The production profile's cache, shared by every worker through the database
+SHARED_CACHES = {**settings.CACHES, 'default': {'BACKEND': 'muscleforge.caching.DatabaseCache', 'LOCATION': 'muscleforge_cache'}}
+
 # Checking if the ExerciseListView correctly returns exercises for the logged-in user
 class ExerciseListViewTest(TestCase):
     def setUp(self):
@@ -86,7 +100,7 @@ class WorkoutPlanDetailViewTest(TestCase):
     def test_user_cannot_access_other_users_workout_plan_detail(self):
         self.client.login(username='user2', password='test123')
         response = self.client.get(reverse('workoutplan-detail', kwargs={'pk': self.workout_plan.pk}))
-        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.status_code, 404)
 
 # Check if WorkoutPlanUpdateView only allows access to the owner of the plan and that it successfully updates the plan's data
 class WorkoutPlanUpdateViewTest(TestCase):
@@ -110,7 +124,7 @@ class WorkoutPlanUpdateViewTest(TestCase):
         other_user = User.objects.create_user(username='user2', password='test123')
         self.client.login(username='user2', password='test123')
         response = self.client.post(reverse('workoutplan-update', kwargs={'pk': self.workout_plan.pk}), {})
-        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.status_code, 404)
 
 # Checks if the GoalListView correctly returns only the goals for the logged-in user, ensuring user data is properly isolated
 class GoalListViewTest(TestCase):
@@ -135,3 +149,443 @@ class GoalListViewTest(TestCase):
         self.assertEqual(response.context['goals'][0].user, self.user1)
         self.assertEqual(response.context['goals'][0].title, "User 1 Goal")
 
+# Checking that owner-checked views load their object and its workout plan only once per request
+class CachedObjectMixinTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='user1', password='test123')
+        self.workout_plan = WorkoutPlan.objects.create(title="Plan 1", start_date=date.today(), end_date=date.today() + timedelta(days=10), user=self.user)
+        self.session = WorkoutSession.objects.create(workout_plan=self.workout_plan, date=date.today(), duration=timedelta(minutes=45))
+        ExerciseInSession.objects.create(workout_session=self.session, exercise=Exercise.objects.filter(user=self.user).first(), repetitions=10, sets=3)
+        self.goal = Goal.objects.create(title="Goal", user=self.user, start_date=date.today(), end_date=date.today() + timedelta(days=10))
+        self.exercise = Exercise.objects.filter(user=self.user).first()
+        self.session_kwargs = {'workoutplan_pk': self.workout_plan.pk, 'session_pk': self.session.pk}
+        self.client.force_login(self.user)
+
+    def queries_for_table(self, url, table):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in captured if re.search(f'"{table}"\\."id" = \\d', query['sql'])]
+
+    def test_workoutplan_views_fetch_plan_once(self):
+        for name in ['workoutplan-detail', 'workoutplan-update', 'workoutplan-delete']:
+            with self.subTest(name=name):
+                queries = self.queries_for_table(reverse(name, kwargs={'pk': self.workout_plan.pk}), 'muscleforge_workoutplan')
+                self.assertEqual(len(queries), 1)
+
+    def test_goal_and_exercise_views_fetch_object_once(self):
+        for name, obj, table in [
+            ('goal-detail', self.goal, 'muscleforge_goal'),
+            ('goal-update', self.goal, 'muscleforge_goal'),
+            ('goal-delete', self.goal, 'muscleforge_goal'),
+            ('exercise-update', self.exercise, 'muscleforge_exercise'),
+            ('exercise-delete', self.exercise, 'muscleforge_exercise'),
+        ]:
+            with self.subTest(name=name):
+                queries = self.queries_for_table(reverse(name, kwargs={'pk': obj.pk}), table)
+                self.assertEqual(len(queries), 1)
+
+    def test_workoutsession_views_fetch_session_and_plan_once(self):
+        for name in ['workoutsession-detail', 'workoutsession-update', 'workoutsession-delete']:
+            with self.subTest(name=name):
+                url = reverse(name, kwargs=self.session_kwargs)
+                # the plan is joined into the session lookup rather than fetched on its own
+                self.assertEqual(len(self.queries_for_table(url, 'muscleforge_workoutplan')), 0)
+                session_queries = self.queries_for_table(url, 'muscleforge_workoutsession')
+                self.assertEqual(len(session_queries), 1)
+                self.assertIn('JOIN "muscleforge_workoutplan"', session_queries[0])
+
+    def test_workoutsession_update_query_count(self):
+        url = reverse('workoutsession-update', kwargs=self.session_kwargs)
+        # auth session and user, session with its plan, existing rows, profile picture,
+        # workout plan choices and the exercise index shared by every form
+        with self.assertNumQueries(7):
+            self.client.get(url)
+
+# Checking that plan and session detail pages load their rows with a fixed number of queries
+class DetailPageQueryCountTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='user1', password='test123')
+        self.exercises = list(Exercise.objects.filter(user=self.user))
+        self.client.force_login(self.user)
+
+    def plan_with_sessions(self, count, rows=1):
+        plan = WorkoutPlan.objects.create(title="Plan", start_date=date.today(), end_date=date.today() + timedelta(days=365), user=self.user)
+        sessions = WorkoutSession.objects.bulk_create(
+            WorkoutSession(workout_plan=plan, date=date.today() + timedelta(days=i % 365), duration=timedelta(minutes=45), notes=f'Session {i}')
+            for i in range(count)
+        )
+        ExerciseInSession.objects.bulk_create(
+            ExerciseInSession(workout_session=session, exercise=self.exercises[i % len(self.exercises)], repetitions=10, sets=3, weight_used=20 + i)
+            for session in sessions for i in range(rows)
+        )
+        return plan, sessions
+
+    def queries(self, url):
+        # Warm the layout fragments so both pages compare only their own queries
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(captured)
+
+    def test_plan_detail_with_hundreds_of_sessions(self):
+        small, _ = self.plan_with_sessions(1)
+        large, sessions = self.plan_with_sessions(300)
+        _, small_queries = self.queries(reverse('workoutplan-detail', kwargs={'pk': small.pk}))
+        response, large_queries = self.queries(reverse('workoutplan-detail', kwargs={'pk': large.pk}))
+        # auth session and user, the plan, and its sessions
+        self.assertEqual(large_queries, 4)
+        self.assertEqual(small_queries, large_queries)
+        self.assertContains(response, 'Session 299')
+        dates = [session.date for session in response.context['workout_plan'].workoutsession_set.all()]
+        self.assertEqual(dates, sorted(dates))
+
+    def test_session_detail_with_dozens_of_exercises(self):
+        plan, (small,) = self.plan_with_sessions(1, rows=1)
+        _, (large,) = self.plan_with_sessions(1, rows=40)
+        _, small_queries = self.queries(reverse('workoutsession-detail', kwargs={'workoutplan_pk': plan.pk, 'session_pk': small.pk}))
+        response, large_queries = self.queries(reverse('workoutsession-detail', kwargs={'workoutplan_pk': large.workout_plan_id, 'session_pk': large.pk}))
+        # auth session and user, the session with its plan, its rows with their exercises, and their records
+        self.assertEqual(large_queries, 5)
+        self.assertEqual(small_queries, large_queries)
+        self.assertEqual(len(response.context['exercises']), 40)
+        for exercise in self.exercises:
+            self.assertContains(response, exercise.name)
+
+# Checking that the session formset loads the user's exercise choices once for all of its rows
+class ExerciseChoicesTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='user1', password='test123')
+        self.client.force_login(self.user)
+        self.exercises = list(Exercise.objects.filter(user=self.user))
+        self.plan = WorkoutPlan.objects.create(title="Plan", start_date=date.today(), end_date=date.today() + timedelta(days=10), user=self.user)
+        self.session = WorkoutSession.objects.create(workout_plan=self.plan, date=date.today(), duration=timedelta(minutes=45))
+        self.rows = ExerciseInSession.objects.bulk_create(
+            ExerciseInSession(workout_session=self.session, exercise=self.exercises[i % len(self.exercises)], repetitions=10, sets=3)
+            for i in range(30)
+        )
+        self.url = reverse('workoutsession-update', kwargs={'workoutplan_pk': self.plan.pk, 'session_pk': self.session.pk})
+
+    def post_data(self, exercise_ids):
+        data = {
+            'workout_plan': self.plan.pk, 'date': date.today(), 'notes': '', 'duration': '3600',
+            'exerciseinsession_set-TOTAL_FORMS': str(len(exercise_ids)),
+            'exerciseinsession_set-INITIAL_FORMS': str(len(self.rows)),
+        }
+        for i, (row, exercise_id) in enumerate(zip(self.rows, exercise_ids)):
+            data.update({
+                f'exerciseinsession_set-{i}-id': row.pk, f'exerciseinsession_set-{i}-exercise': exercise_id,
+                f'exerciseinsession_set-{i}-repetitions': 8, f'exerciseinsession_set-{i}-sets': 4,
+            })
+        return data
+
+    def exercise_queries(self, captured):
+        return [query['sql'] for query in captured if 'FROM "muscleforge_exercise"' in query['sql']]
+
+    def test_edit_page_loads_choices_once(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(self.url)
+        exercise_queries = self.exercise_queries(captured)
+        self.assertEqual(len(exercise_queries), 1)
+        self.assertNotIn('"muscleforge_exercise"."description"', exercise_queries[0])
+        formset = response.context['formset']
+        self.assertEqual(len(formset.forms), 31)
+        self.assertEqual(formset.forms[0]['exercise'].value(), self.rows[0].exercise_id)
+        # Rows name their exercise and look the others up as the user types, instead of listing them all
+        self.assertNotContains(response, '<option value="%s"' % self.exercises[-1].pk)
+        self.assertContains(response, 'value="%s"' % self.exercises[0].name)
+        self.assertContains(response, 'data-exercise-autocomplete="%s"' % reverse('api-exercise-autocomplete'), count=31)
+
+    def test_post_validates_against_the_users_exercises_once(self):
+        # Warm the user's index, so the one query left checks the chosen exercises still exist
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.post(self.url, self.post_data([exercise.pk for exercise in self.exercises[:1]] * 30))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(self.exercise_queries(captured)), 1)
+        self.assertEqual(set(ExerciseInSession.objects.filter(workout_session=self.session).values_list('exercise_id', 'repetitions')), {(self.exercises[0].pk, 8)})
+
+    def test_other_users_exercise_is_rejected(self):
+        other = User.objects.create_user(username='user2', password='test123')
+        foreign = Exercise.objects.filter(user=other).first()
+        response = self.client.post(self.url, self.post_data([foreign.pk] + [self.exercises[0].pk] * 29))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('exercise', response.context['formset'].forms[0].errors)
+        self.assertFalse(ExerciseInSession.objects.filter(exercise=foreign).exists())
+
+    def test_exercise_deleted_by_another_worker_is_rejected(self):
+        exercise = Exercise.objects.create(user=self.user, name='Zercher Squat')
+        exercise_id = exercise.pk
+        self.client.get(self.url)
+        # The worker that deleted it bumped a version this one hasn't seen, so its index still has it
+        key = version_key('autocomplete', self.user.pk)
+        version = cache.get(key)
+        exercise.delete()
+        cache.set(key, version, timeout=None)
+        response = self.client.post(self.url, self.post_data([exercise_id] + [self.exercises[0].pk] * 29))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('exercise', response.context['formset'].forms[0].errors)
+
+# Checking that ownership is enforced by the object lookup itself, so foreign rows are a 404
+class OwnershipScopingTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='user1', password='test123')
+        self.other_user = User.objects.create_user(username='user2', password='test123')
+        self.workout_plan = WorkoutPlan.objects.create(title="Plan 1", start_date=date.today(), end_date=date.today() + timedelta(days=10), user=self.user)
+        self.other_plan = WorkoutPlan.objects.create(title="Plan 2", start_date=date.today(), end_date=date.today() + timedelta(days=10), user=self.user)
+        self.session = WorkoutSession.objects.create(workout_plan=self.workout_plan, date=date.today(), duration=timedelta(minutes=45))
+        self.goal = Goal.objects.create(title="Goal", user=self.user, start_date=date.today(), end_date=date.today() + timedelta(days=10))
+        self.exercise = Exercise.objects.filter(user=self.user).first()
+
+    def test_other_user_gets_404(self):
+        self.client.force_login(self.other_user)
+        session_kwargs = {'workoutplan_pk': self.workout_plan.pk, 'session_pk': self.session.pk}
+        urls = [
+            reverse('exercise-update', kwargs={'pk': self.exercise.pk}),
+            reverse('exercise-delete', kwargs={'pk': self.exercise.pk}),
+            reverse('goal-detail', kwargs={'pk': self.goal.pk}),
+            reverse('goal-update', kwargs={'pk': self.goal.pk}),
+            reverse('goal-delete', kwargs={'pk': self.goal.pk}),
+            reverse('workoutplan-delete', kwargs={'pk': self.workout_plan.pk}),
+            reverse('workoutsession-new', kwargs={'workoutplan_pk': self.workout_plan.pk}),
+            reverse('workoutsession-detail', kwargs=session_kwargs),
+            reverse('workoutsession-update', kwargs=session_kwargs),
+            reverse('workoutsession-delete', kwargs=session_kwargs),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.post(reverse('goal-delete', kwargs={'pk': self.goal.pk})).status_code, 404)
+        self.assertTrue(Goal.objects.filter(pk=self.goal.pk).exists())
+
+    def test_session_must_belong_to_plan_in_url(self):
+        self.client.force_login(self.user)
+        kwargs = {'workoutplan_pk': self.other_plan.pk, 'session_pk': self.session.pk}
+        for name in ['workoutsession-detail', 'workoutsession-update', 'workoutsession-delete']:
+            with self.subTest(name=name):
+                self.assertEqual(self.client.get(reverse(name, kwargs=kwargs)).status_code, 404)
+        self.client.post(reverse('workoutsession-delete', kwargs=kwargs))
+        self.assertTrue(WorkoutSession.objects.filter(pk=self.session.pk).exists())
+
+    def test_owner_lookup_is_a_single_query(self):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse('goal-detail', kwargs={'pk': self.goal.pk}))
+        self.assertEqual(response.status_code, 200)
+        goal_queries = [query['sql'] for query in captured if 'muscleforge_goal' in query['sql']]
+        self.assertEqual(len(goal_queries), 1)
+        self.assertIn('"muscleforge_goal"."user_id" = ', goal_queries[0])
+        # the owner is never loaded separately from the authenticated user
+        self.assertEqual(len([query for query in captured if 'FROM "auth_user"' in query['sql']]), 1)
+
+    def test_session_form_only_offers_own_plans(self):
+        WorkoutPlan.objects.create(title="Foreign plan", start_date=date.today(), end_date=date.today(), user=self.other_user)
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('workoutsession-new', kwargs={'workoutplan_pk': self.workout_plan.pk}))
+        plans = response.context['form'].fields['workout_plan'].queryset
+        self.assertQuerySetEqual(plans, [self.workout_plan, self.other_plan], ordered=False)
+
+# Checking that the home dashboard is computed in one query, cached, and invalidated by writes
+class HomeDashboardTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='user1', password='test123')
+        self.other_user = User.objects.create_user(username='user2', password='test123')
+        self.plan = WorkoutPlan.objects.create(title="Upcoming", start_date=date.today() + timedelta(days=1), end_date=date.today() + timedelta(days=30), user=self.user)
+        WorkoutPlan.objects.create(title="Later", start_date=date.today() + timedelta(days=5), end_date=date.today() + timedelta(days=30), user=self.user)
+        WorkoutPlan.objects.create(title="Foreign", start_date=date.today(), end_date=date.today() + timedelta(days=30), user=self.other_user)
+        self.session = WorkoutSession.objects.create(workout_plan=self.plan, date=date.today() + timedelta(days=2), duration=timedelta(minutes=30))
+        Goal.objects.create(title="Done", user=self.user, start_date=date.today(), end_date=date.today(), status=True)
+        Goal.objects.create(title="Open", user=self.user, start_date=date.today(), end_date=date.today())
+        Goal.objects.create(title="Foreign", user=self.other_user, start_date=date.today(), end_date=date.today(), status=True)
+        self.client.force_login(self.user)
+
+    def dashboard_queries(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse('muscleforge-home'))
+        self.assertEqual(response.status_code, 200)
+        return response, [query for query in captured if 'muscleforge_' in query['sql']]
+
+    def test_summary_is_one_query_then_cached(self):
+        response, queries = self.dashboard_queries()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(response.context['active_plan']['title'], "Upcoming")
+        self.assertEqual(response.context['active_session']['id'], self.session.pk)
+        self.assertEqual(response.context['total_goals'], 2)
+        self.assertEqual(response.context['completed_goals'], 1)
+        self.assertContains(response, "Upcoming")
+
+        response, queries = self.dashboard_queries()
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(response.context['total_goals'], 2)
+
+    def test_writes_invalidate_summary(self):
+        self.dashboard_queries()
+        Goal.objects.create(title="New", user=self.user, start_date=date.today(), end_date=date.today(), status=True)
+        response, queries = self.dashboard_queries()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(response.context['completed_goals'], 2)
+
+        self.session.delete()
+        response, _ = self.dashboard_queries()
+        self.assertIsNone(response.context['active_session'])
+
+        self.plan.delete()
+        response, _ = self.dashboard_queries()
+        self.assertEqual(response.context['active_plan']['title'], "Later")
+
+    def test_plan_delete_invalidates_once(self):
+        WorkoutSession.objects.bulk_create([
+            WorkoutSession(workout_plan=self.plan, date=date.today() + timedelta(days=day), duration=timedelta(minutes=30))
+            for day in range(3, 53)
+        ])
+        with override_settings(CACHES=SHARED_CACHES):
+            call_command('createcachetable', verbosity=0)
+            self.dashboard_queries()
+            with CaptureQueriesContext(connection) as captured:
+                self.plan.delete()
+            response, _ = self.dashboard_queries()
+        # The cascaded sessions neither look up their deleted plan nor bump the versions again
+        self.assertFalse([query for query in captured if query['sql'].startswith('SELECT "muscleforge_workoutplan"."user_id"')])
+        writes = [query for query in captured if query['sql'].startswith(('INSERT INTO "muscleforge_cache"', 'UPDATE "muscleforge_cache"'))]
+        self.assertEqual(len(writes), len(TRAINING_NAMESPACES))
+        self.assertEqual(response.context['active_plan']['title'], "Later")
+
+    def test_other_users_writes_keep_summary_cached(self):
+        self.dashboard_queries()
+        Goal.objects.create(title="Foreign 2", user=self.other_user, start_date=date.today(), end_date=date.today())
+        _, queries = self.dashboard_queries()
+        self.assertEqual(len(queries), 0)
+
+    def test_workers_share_versions_through_the_database_cache(self):
+        with override_settings(CACHES=SHARED_CACHES):
+            call_command('createcachetable', verbosity=0)
+            self.dashboard_queries()
+            # Another worker process reads the same table
+            other_worker = DatabaseCache('muscleforge_cache', {})
+            before = other_worker.get(version_key('dashboard', self.user.pk))
+            Goal.objects.create(title="New", user=self.user, start_date=date.today(), end_date=date.today(), status=True)
+            self.assertGreater(other_worker.get(version_key('dashboard', self.user.pk)), before)
+            response, queries = self.dashboard_queries()
+            self.assertEqual(response.context['completed_goals'], 2)
+
+    def test_empty_dashboard(self):
+        self.client.force_login(self.other_user)
+        WorkoutPlan.objects.filter(user=self.other_user).delete()
+        Goal.objects.filter(user=self.other_user).delete()
+        response = self.client.get(reverse('muscleforge-home'))
+        self.assertIsNone(response.context['active_plan'])
+        self.assertIsNone(response.context['active_session'])
+        self.assertEqual(response.context['total_goals'], 0)
+
+# Checking that list views page through every row with cursors, without COUNT(*) or OFFSET
+class KeysetPaginationTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='user1', password='test123')
+        # Several goals share a start date so the id tie-breaker matters
+        Goal.objects.bulk_create([
+            Goal(title=f"Goal {i}", user=self.user, description='', start_date=date(2024, 1, 1) + timedelta(days=i // 4), end_date=date(2024, 12, 31))
+            for i in range(60)
+        ])
+        self.expected = list(Goal.objects.filter(user=self.user).order_by('start_date', 'id').values_list('id', flat=True))
+        self.client.force_login(self.user)
+
+    def walk(self, cursor_attr):
+        seen = []
+        url = reverse('goal-list')
+        pages = 0
+        while url:
+            with CaptureQueriesContext(connection) as captured:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            for query in captured:
+                self.assertNotIn('COUNT(', query['sql'])
+                self.assertNotIn('OFFSET', query['sql'])
+            page = response.context['page']
+            seen.append([goal.id for goal in response.context['goals']])
+            cursor = getattr(page, cursor_attr)
+            url = f"{reverse('goal-list')}?cursor={cursor}" if cursor else None
+            pages += 1
+            self.assertLess(pages, 10)
+        return seen
+
+    def test_forward_walk_covers_every_goal_once(self):
+        pages = self.walk('next_cursor')
+        self.assertEqual([len(page) for page in pages], [24, 24, 12])
+        self.assertEqual([goal_id for page in pages for goal_id in page], self.expected)
+
+    def test_previous_cursor_returns_preceding_page(self):
+        first = self.client.get(reverse('goal-list')).context['page']
+        second = self.client.get(f"{reverse('goal-list')}?cursor={first.next_cursor}").context['page']
+        back = self.client.get(f"{reverse('goal-list')}?cursor={second.previous_cursor}").context['page']
+        self.assertEqual([goal.id for goal in back], [goal.id for goal in first])
+        self.assertFalse(back.has_previous)
+        self.assertTrue(back.has_next)
+
+    def test_invalid_cursor_is_404(self):
+        response = self.client.get(f"{reverse('goal-list')}?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, 404)
+        # Well-formed cursors whose values aren't a start date and an id
+        for values in (['soon', 1], ['2024-01-01', 'x'], ['2024-01-01', 10 ** 30], [None, 1], [['2024-01-01'], 1]):
+            with self.subTest(values=values):
+                response = self.client.get(reverse('goal-list'), {'cursor': encode_cursor(values, 'n')})
+                self.assertEqual(response.status_code, 404)
+
+# Checking the cached fragments of the base layout: the active section and the user's topbar
+class LayoutFragmentCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches['fragments'].clear()
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        self.client.force_login(self.user)
+
+    def active_section(self, url):
+        return re.search(r'<li class="nav-item active">\s*<a class="nav-link" href="([^"]+)"', self.client.get(url).content.decode()).group(1)
+
+    def test_sidebar_marks_the_active_section(self):
+        self.assertEqual(self.active_section(reverse('goal-list')), reverse('goal-list'))
+        self.assertEqual(self.active_section(reverse('exercise-list')), reverse('exercise-list'))
+        self.assertEqual(self.active_section(reverse('workout-import')), reverse('workoutplan-list'))
+        self.assertEqual(self.active_section(reverse('muscleforge-home')), reverse('muscleforge-home'))
+
+    def test_topbar_is_cached_until_the_profile_changes(self):
+        self.client.get(reverse('goal-list'))
+        # The profile picture is only read when the topbar is rendered
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get(reverse('goal-list'))
+        self.assertFalse([query for query in captured if 'users_userprofile' in query['sql']])
+
+        self.user.username = 'renamed'
+        self.user.save()
+        self.assertContains(self.client.get(reverse('goal-list')), 'renamed')
+
+        other = User.objects.create_user(username='otheruser', password='12345')
+        self.client.force_login(other)
+        self.assertContains(self.client.get(reverse('goal-list')), 'otheruser')
+
+    def test_fragments_are_read_without_queries_from_the_shared_cache(self):
+        with override_settings(CACHES=SHARED_CACHES):
+            call_command('createcachetable', verbosity=0)
+            self.client.get(reverse('exercise-list'))
+            with CaptureQueriesContext(connection) as captured:
+                self.client.get(reverse('exercise-list'))
+        # Only the topbar's layout version is read from the shared table
+        cache_reads = [query['sql'] for query in captured if 'muscleforge_cache' in query['sql']]
+        self.assertEqual(len(cache_reads), 1)
+        self.assertIn(version_key('layout', self.user.pk), cache_reads[0])
+
+    def test_collected_assets_replace_the_cached_links(self):
+        self.assertContains(self.client.get(reverse('goal-list')), 'muscleforge/css/sb-admin-2.min.css')
+        collected = mock.patch.object(type(staticfiles_storage._wrapped), 'stored_name', lambda storage, name: name.replace('.min.', '.0123456789ab.min.'))
+        with collected, mock.patch.object(staticfiles_storage, 'manifest_hash', 'after-collectstatic', create=True):
+            response = self.client.get(reverse('goal-list'))
+        self.assertContains(response, 'muscleforge/css/sb-admin-2.0123456789ab.min.css')
+        self.assertContains(response, 'muscleforge/js/sb-admin-2.0123456789ab.min.js')
@@ -0,0 +1,101 @@
+from datetime import date, timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from muscleforge.models import Exercise, WorkoutPlan, WorkoutSession, ExerciseInSession, ExerciseVolume
+from muscleforge.volume import rebuild_volume
+
+PREFIX = 'exerciseinsession_set'
+
+def session_data(plan, day, rows, initial=0):
+    data = {
+        'workout_plan': plan.pk,
+        'date': day,
+        'notes': '',
+        'duration': '3600',
+        f'{PREFIX}-TOTAL_FORMS': str(len(rows)),
+        f'{PREFIX}-INITIAL_FORMS': str(initial),
+    }
+    for i, row in enumerate(rows):
+        for field, value in row.items():
+            data[f'{PREFIX}-{i}-{field}'] = value
+    return data
+
+def volume_table():
+    return sorted(ExerciseVolume.objects.values_list('exercise_id', 'date', 'volume', 'total_reps', 'max_weight'))
+
+# Checking that the training volume table follows session writes made through the views
+class ExerciseVolumeTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='user1', password='test123')
+        self.client.force_login(self.user)
+        self.plan = WorkoutPlan.objects.create(user=self.user, title='Plan', start_date=date(2024, 1, 1), end_date=date(2024, 2, 1))
+        self.squat, self.bench = Exercise.objects.filter(user=self.user)[:2]
+
+    def create_session(self, day='2024-01-02'):
+        self.client.post(reverse('workoutsession-new', kwargs={'workoutplan_pk': self.plan.pk}), session_data(self.plan, day, [
+            {'exercise': self.squat.pk, 'repetitions': 5, 'sets': 5, 'weight_used': 100},
+            {'exercise': self.squat.pk, 'repetitions': 3, 'sets': 1, 'weight_used': 110},
+            {'exercise': self.bench.pk, 'repetitions': 10, 'sets': 3, 'weight_used': ''},
+        ]))
+        return WorkoutSession.objects.latest('id')
+
+    def update_url(self, session):
+        return reverse('workoutsession-update', kwargs={'workoutplan_pk': self.plan.pk, 'session_pk': session.pk})
+
+    def test_create_adds_daily_totals(self):
+        self.create_session()
+        self.assertEqual(volume_table(), sorted([
+            (self.squat.pk, date(2024, 1, 2), 5 * 5 * 100 + 3 * 110, 28, 110.0),
+            (self.bench.pk, date(2024, 1, 2), 0.0, 30, None),
+        ]))
+
+    def test_edit_moves_and_recomputes_days(self):
+        session = self.create_session()
+        rows = list(ExerciseInSession.objects.filter(workout_session=session).order_by('id'))
+        self.client.post(self.update_url(session), session_data(self.plan, '2024-01-03', [
+            {'id': rows[0].pk, 'exercise': self.squat.pk, 'repetitions': 5, 'sets': 5, 'weight_used': 120},
+            {'id': rows[1].pk, 'exercise': self.squat.pk, 'repetitions': 3, 'sets': 1, 'weight_used': 110, 'DELETE': 'on'},
+            {'id': rows[2].pk, 'exercise': self.bench.pk, 'repetitions': 10, 'sets': 3, 'weight_used': ''},
+        ], initial=3))
+        self.assertEqual(volume_table(), sorted([
+            (self.squat.pk, date(2024, 1, 3), 5 * 5 * 120, 25, 120.0),
+            (self.bench.pk, date(2024, 1, 3), 0.0, 30, None),
+        ]))
+
+    def test_deleting_session_or_plan_removes_totals(self):
+        session = self.create_session()
+        self.create_session('2024-01-05')
+        self.client.post(reverse('workoutsession-delete', kwargs={'workoutplan_pk': self.plan.pk, 'session_pk': session.pk}))
+        self.assertEqual({day for _, day, *_ in volume_table()}, {date(2024, 1, 5)})
+        self.client.post(reverse('workoutplan-delete', kwargs={'pk': self.plan.pk}))
+        self.assertEqual(volume_table(), [])
+
+    def test_deleting_a_large_plan(self):
+        exercises = list(Exercise.objects.filter(user=self.user)[:6])
+        sessions = WorkoutSession.objects.bulk_create([
+            WorkoutSession(workout_plan=self.plan, date=date(2024, 1, 1) + timedelta(days=i), duration=timedelta(minutes=45), notes='')
+            for i in range(200)
+        ])
+        ExerciseInSession.objects.bulk_create([
+            ExerciseInSession(workout_session=session, exercise=exercise, repetitions=5, sets=3, weight_used=50)
+            for session in sessions for exercise in exercises
+        ])
+        rebuild_volume([self.user.pk])
+        self.assertEqual(ExerciseVolume.objects.count(), 1200)
+        response = self.client.post(reverse('workoutplan-delete', kwargs={'pk': self.plan.pk}))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(volume_table(), [])
+
+    def test_rebuild_matches_incremental_updates(self):
+        self.create_session()
+        self.create_session()
+        self.create_session('2024-01-04')
+        incremental = volume_table()
+        ExerciseVolume.objects.all().delete()
+        call_command('rebuild_volume', stdout=StringIO())
+        self.assertEqual(volume_table(), incremental)
@@ -1,17 +1,20 @@
 from django.urls import path
 from django.conf import settings
 from django.conf.urls.static import static
-from . import views
+from . import api, views
+from .async_views import use_async_views
 from .views import (
     ExerciseListView,
     ExerciseCreateView,
     ExerciseUpdateView,
     ExerciseDeleteView,
+    ExerciseProgressView,
     WorkoutPlanListView,
     WorkoutPlanCreateView,
     WorkoutPlanDetailView,
     WorkoutPlanUpdateView,
     WorkoutPlanDeleteView,
+    WorkoutImportView,
     WorkoutSessionCreateView,
     WorkoutSessionDetailView,
     WorkoutSessionUpdateView,
@@ -29,9 +32,11 @@ urlpatterns = [
     path('exercises/new/', ExerciseCreateView.as_view(), name="exercise-new"),
     path('exercises/<int:pk>/update/', ExerciseUpdateView.as_view(), name="exercise-update"),
     path('exercises/<int:pk>/delete/', ExerciseDeleteView.as_view(), name="exercise-delete"),
+    path('exercises/<int:pk>/progress/', ExerciseProgressView.as_view(), name="exercise-progress"),
     path('workoutplans/', WorkoutPlanListView.as_view(), name="workoutplan-list"),
     path('workoutplans/<int:pk>/', WorkoutPlanDetailView.as_view(), name="workoutplan-detail"),
     path('workoutplans/new/', WorkoutPlanCreateView.as_view(), name="workoutplan-new"),
+    path('workoutplans/import/', WorkoutImportView.as_view(), name="workout-import"),
     path('workoutplans/<int:pk>/update/', WorkoutPlanUpdateView.as_view(), name="workoutplan-update"),
     path('workoutplans/<int:pk>/delete/', WorkoutPlanDeleteView.as_view(), name="workoutplan-delete"),
     path('workoutplans/<int:workoutplan_pk>/workoutsession/new', WorkoutSessionCreateView.as_view(), name="workoutsession-new"),
@@ -43,7 +48,19 @@ urlpatterns = [
     path('goals/<int:pk>/', GoalDetailView.as_view(), name="goal-detail"),
     path('goals/<int:pk>/update/', GoalUpdateView.as_view(), name="goal-update"),
     path('goals/<int:pk>/delete/', GoalDeleteView.as_view(), name="goal-delete"),
+    path('api/v1/plans/', api.plan_list, name="api-plan-list"),
+    path('api/v1/plans/<int:pk>/', api.plan_detail, name="api-plan-detail"),
+    path('api/v1/sessions/', api.session_list, name="api-session-list"),
+    path('api/v1/sessions/<int:pk>/', api.session_detail, name="api-session-detail"),
+    path('api/v1/sessions/batch/', api.session_batch_create, name="api-session-batch"),
+    path('api/v1/sessions/<int:pk>/batch/', api.session_batch_update, name="api-session-batch-update"),
+    path('api/v1/exercises/autocomplete/', api.exercise_autocomplete, name="api-exercise-autocomplete"),
+    path('api/v1/goals/', api.goal_list, name="api-goal-list"),
+    path('api/v1/goals/<int:pk>/', api.goal_detail, name="api-goal-detail"),
+    path('metrics', views.metrics, name="metrics"),
 ]
 
+urlpatterns = use_async_views(urlpatterns, settings.MUSCLEFORGE_ASYNC_ROUTES)
+
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
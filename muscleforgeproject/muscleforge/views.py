@@ -1,4 +1,7 @@
+import hmac
+
 from django import forms
+from django.conf import settings
 from django.urls import reverse_lazy
 from django.shortcuts import render, get_object_or_404, redirect
 from django.views.generic import (
@@ -6,43 +9,78 @@ from django.views.generic import (
     DetailView, 
     CreateView, 
     UpdateView, 
-    DeleteView
+    DeleteView,
+    FormView
 )
 from django.views.generic.base import TemplateResponseMixin, ContextMixin, View
+from django.views.generic.detail import BaseDetailView
 from django.views.generic.edit import ModelFormMixin
-from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.decorators import login_required
+from django.contrib import messages
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.views.decorators.http import require_safe
 from .models import WorkoutPlan, Exercise, WorkoutSession, ExerciseInSession, Goal
-from .forms import WorkoutPlanForm, WorkoutSessionForm, ExerciseInSessionFormSet, GoalForm
-from datetime import timedelta, date
+from .forms import WorkoutPlanForm, WorkoutSessionForm, ExerciseInSessionFormSet, GoalForm, WorkoutImportForm
+from .analytics import get_progress
+from .metrics import metrics as process_metrics, render as render_metrics
+from .dashboard import get_dashboard
+from .importer import WorkoutImportError, MAX_REPORTED_ERRORS, read_records, import_workouts
+from .pagination import KeysetPaginationMixin
+from .volume import entry_keys, session_keys, refresh_volume
+from .records import held_exercises, update_records, records_by_entry
+from datetime import timedelta
 
 @login_required
 def home(request):
-    today = date.today()
-    upcoming_plans = WorkoutPlan.objects.filter(start_date__gte=today, status=False, user=request.user).order_by('start_date')  
-    active_plan = upcoming_plans.first()
+    return render(request, 'muscleforge/home.html', context=get_dashboard(request.user))
 
-    total_goals = Goal.objects.filter(user=request.user).count()
-    completed_goals = Goal.objects.filter(user=request.user, status=True).count()
+class OwnedObjectMixin:
+    """
+    Restricts the view to rows owned by the request user, so a foreign pk is a 404
+    from the same lookup that loads the object, and keeps that object and its parent
+    WorkoutPlan on the view for the rest of the request.
+    """
+    owner_field = 'user'
+    workoutplan_url_kwarg = 'workoutplan_pk'
 
-    active_session = None
-    
-    if active_plan:
-        active_session = WorkoutSession.objects.filter(workout_plan=active_plan.id, date__gte=today).first()
+    def get_queryset(self):
+        return super().get_queryset().filter(**{self.owner_field: self.request.user})
 
-    context = {
-        'active_plan': active_plan,
-        'total_goals': total_goals,
-        'completed_goals': completed_goals,
-        'active_session': active_session
-    }
+    def get_object(self, queryset=None):
+        if queryset is not None:
+            return super().get_object(queryset)
+        if not hasattr(self, '_cached_object'):
+            self._cached_object = super().get_object()
+        return self._cached_object
+
+    def get_workout_plan(self):
+        if not hasattr(self, '_cached_workout_plan'):
+            workoutplan_pk = self.kwargs.get(self.workoutplan_url_kwarg)
+            if workoutplan_pk is None:
+                self._cached_workout_plan = self.get_object()
+            else:
+                self._cached_workout_plan = get_object_or_404(WorkoutPlan, pk=workoutplan_pk, user=self.request.user)
+        return self._cached_workout_plan
+
+class WorkoutSessionObjectMixin(OwnedObjectMixin):
+    """Looks sessions up through the plan in the URL, so a session from another plan is a 404."""
+    owner_field = 'workout_plan__user'
+    pk_url_kwarg = 'session_pk'
 
-    return render(request, 'muscleforge/home.html', context=context)
+    def get_queryset(self):
+        queryset = super().get_queryset().select_related('workout_plan')
+        return queryset.filter(workout_plan_id=self.kwargs.get(self.workoutplan_url_kwarg))
+
+    def get_workout_plan(self):
+        return self.get_object().workout_plan
 
-class ExerciseListView(LoginRequiredMixin, ListView):
+class ExerciseListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Exercise
     context_object_name = 'exercises'
-    ordering = ['exercise_type']
+    keyset_ordering = ('exercise_type', 'id')
 
     def get_queryset(self):
         return self.model.objects.filter(user=self.request.user)
@@ -70,7 +108,7 @@ class ExerciseCreateView(LoginRequiredMixin, CreateView): # dodati login reguire
         context["title"] = 'Add Exercise'
         return context
 
-class ExerciseUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView): # dodati login reguired
+class ExerciseUpdateView(LoginRequiredMixin, OwnedObjectMixin, UpdateView): # dodati login reguired
     model = Exercise
     fields = ['name', 'description', 'difficulty_level', 'exercise_type', 'equipment_needed']
     success_url = '/exercises/'
@@ -82,13 +120,7 @@ class ExerciseUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView): #
         context["title"] = 'Update Exercise'
         return context
 
-    def test_func(self):
-        exercise = self.get_object()
-        if self.request.user.id == exercise.user.id:
-            return True
-        return False
-
-class ExerciseDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView): # dodati login reguired
+class ExerciseDeleteView(LoginRequiredMixin, OwnedObjectMixin, DeleteView): # dodati login reguired
     model = Exercise
     success_url = '/exercises/'
 
@@ -98,16 +130,16 @@ class ExerciseDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView): #
         context["title"] = 'Delete Exercise'
         return context
 
-    def test_func(self):
-        exercise = self.get_object()
-        if self.request.user.id == exercise.user.id:
-            return True
-        return False
+class ExerciseProgressView(LoginRequiredMixin, OwnedObjectMixin, BaseDetailView):
+    model = Exercise
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse(get_progress(self.get_object()))
 
-class WorkoutPlanListView(LoginRequiredMixin, ListView):
+class WorkoutPlanListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = WorkoutPlan
     context_object_name = 'workoutplans'
-    ordering = ['start_date']
+    keyset_ordering = ('start_date', 'id')
 
     def get_queryset(self):
         return self.model.objects.filter(user=self.request.user)
@@ -133,24 +165,23 @@ class WorkoutPlanCreateView(LoginRequiredMixin, CreateView):
         context["title"] = 'Delete Exercise'
         return context
 
-class WorkoutPlanDetailView(LoginRequiredMixin, UserPassesTestMixin, DetailView):
+class WorkoutPlanDetailView(LoginRequiredMixin, OwnedObjectMixin, DetailView):
     model = WorkoutPlan
     context_object_name = 'workout_plan'
 
+    def get_queryset(self):
+        # The template lists every session of the plan; one query for all of them, in date order
+        sessions = WorkoutSession.objects.order_by('date', 'id')
+        return super().get_queryset().prefetch_related(Prefetch('workoutsession_set', queryset=sessions))
+
     def get_context_data(self, **kwargs):
-        workoutplan = self.get_object()
+        workoutplan = self.object
         context = super().get_context_data(**kwargs)
         context["breadcrumbs"] = [{'title': 'Workout Plans', 'url': reverse_lazy('workoutplan-list')}, {'title': f'{workoutplan.title}'}]
         context['title'] = f'{workoutplan.title}'
         return context
 
-    def test_func(self):
-        workout_plan = self.get_object()
-        if self.request.user.id == workout_plan.user.id:
-            return True
-        return False
-
-class WorkoutPlanUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
+class WorkoutPlanUpdateView(LoginRequiredMixin, OwnedObjectMixin, UpdateView):
     model = WorkoutPlan
     form_class = WorkoutPlanForm
     context_object_name = 'workout_plan'
@@ -160,7 +191,7 @@ class WorkoutPlanUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView)
         return super().form_valid(form)
 
     def get_context_data(self, **kwargs):
-        workoutplan = self.get_object()
+        workoutplan = self.object
         context = super().get_context_data(**kwargs)
         context["breadcrumbs"] = [
             {'title': 'Workout Plans', 'url': reverse_lazy('workoutplan-list')}, 
@@ -169,24 +200,22 @@ class WorkoutPlanUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView)
         context['action'] = 'Update'
         return context
 
-    def test_func(self):
-        workout_plan = self.get_object()
-        if self.request.user.id == workout_plan.user.id:
-            return True
-        return False
-
-class WorkoutPlanDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
+class WorkoutPlanDeleteView(LoginRequiredMixin, OwnedObjectMixin, DeleteView):
     model = WorkoutPlan
     success_url = '/workoutplans/'
 
-    def test_func(self):
-        workout_plan = self.get_object()
-        if self.request.user.id == workout_plan.user.id:
-            return True
-        return False
+    def form_valid(self, form):
+        with transaction.atomic():
+            entries = ExerciseInSession.objects.filter(workout_session__workout_plan=self.object)
+            volume_keys = entry_keys(entries)
+            record_exercises = held_exercises(entries)
+            response = super().form_valid(form)
+            refresh_volume(volume_keys)
+            update_records(ExerciseInSession.objects.none(), recompute=record_exercises)
+        return response
 
     def get_context_data(self, **kwargs):
-        workoutplan = self.get_object()
+        workoutplan = self.object
         context = super().get_context_data(**kwargs)
         context["breadcrumbs"] = [
             {'title': 'Workout Plans', 'url': reverse_lazy('workoutplan-list')}, 
@@ -195,6 +224,31 @@ class WorkoutPlanDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView)
         context['action'] = 'Delete'
         return context
 
+class WorkoutImportView(LoginRequiredMixin, FormView):
+    form_class = WorkoutImportForm
+    template_name = 'muscleforge/workout_import.html'
+    success_url = '/workoutplans/'
+
+    def form_valid(self, form):
+        upload = form.cleaned_data['file']
+        try:
+            records = read_records(upload.file, form.cleaned_data['file_format'], upload.name)
+            summary = import_workouts(self.request.user, records)
+        except WorkoutImportError as e:
+            for error in e.errors[:MAX_REPORTED_ERRORS]:
+                form.add_error('file', error)
+            if len(e.errors) > MAX_REPORTED_ERRORS:
+                form.add_error('file', f'... and {len(e.errors) - MAX_REPORTED_ERRORS} more errors')
+            return self.form_invalid(form)
+        messages.success(self.request, f"Imported {summary['sessions']} sessions with {summary['entries']} exercises into {summary['plans']} workout plans.")
+        return super().form_valid(form)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["breadcrumbs"] = [{'title': 'Workout Plans', 'url': reverse_lazy('workoutplan-list')}, {'title': 'Import Workouts'}]
+        context["title"] = 'Import Workouts'
+        return context
+
 class WorkoutSessionFormsetMixin(ModelFormMixin):
     form_class = WorkoutSessionForm
     formset_class = ExerciseInSessionFormSet
@@ -202,46 +256,55 @@ class WorkoutSessionFormsetMixin(ModelFormMixin):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['title'] = 'Session'
-        if self.request.POST:
-            context['formset'] = self.formset_class(self.request.POST, instance=self.object)
-        else:
-            context['formset'] = self.formset_class(instance=self.object)
+        if 'formset' not in context:
+            context['formset'] = self.get_formset()
         return context
 
-    def form_valid(self, form):
-        context = self.get_context_data()
-        formset = context['formset']
-        if formset.is_valid():
-            # This call is necessary to ensure the form's instance is populated with form data.
-            self.object = form.save(commit=False)
-            self.object.user = self.request.user
-
-            duration_seconds = int(self.request.POST.get('duration', 0))
-            self.object.duration = timedelta(seconds=duration_seconds)
+    def get_formset(self):
+        # Exercise choices are limited to the user's own, for rendering and validation alike
+        if self.request.method == 'POST':
+            return self.formset_class(self.request.POST, instance=self.object, user=self.request.user)
+        return self.formset_class(instance=self.object, user=self.request.user)
 
-            self.object.save()
+    def get_form(self, form_class=None):
+        form = super().get_form(form_class)
+        form.fields['workout_plan'].queryset = WorkoutPlan.objects.filter(user=self.request.user)
+        return form
 
-            formset.instance = self.object
-            formset.save()
+    def form_valid(self, form):
+        formset = self.get_formset()
+        if formset.is_valid():
+            with transaction.atomic():
+                # Days and records the session counted towards before this edit, read before the save changes them
+                volume_keys, record_exercises = set(), set()
+                if self.object and self.object.pk:
+                    volume_keys = session_keys([self.object.pk])
+                    record_exercises = held_exercises(ExerciseInSession.objects.filter(workout_session=self.object))
+
+                # This call is necessary to ensure the form's instance is populated with form data.
+                self.object = form.save(commit=False)
+                self.object.user = self.request.user
+
+                duration_seconds = int(self.request.POST.get('duration', 0))
+                self.object.duration = timedelta(seconds=duration_seconds)
+
+                self.object.save()
+
+                formset.instance = self.object
+                formset.save()
+                refresh_volume(volume_keys | session_keys([self.object.pk]))
+                update_records(ExerciseInSession.objects.filter(workout_session=self.object), recompute=record_exercises)
             return super(ModelFormMixin, self).form_valid(form)
         else:
-            return self.render_to_response(self.get_context_data(form=form))
+            return self.render_to_response(self.get_context_data(form=form, formset=formset))
 
-class WorkoutSessionCreateView(LoginRequiredMixin, UserPassesTestMixin, WorkoutSessionFormsetMixin, CreateView):
+class WorkoutSessionCreateView(LoginRequiredMixin, OwnedObjectMixin, WorkoutSessionFormsetMixin, CreateView):
     model = WorkoutSession
     form_class = WorkoutSessionForm
 
     def get_context_data(self, **kwargs):
         context = super(WorkoutSessionCreateView, self).get_context_data(**kwargs)
-        if self.request.method == 'POST':
-            context['formset'] = ExerciseInSessionFormSet(self.request.POST, self.request.FILES)
-        else:
-            exercise_formset = ExerciseInSessionFormSet()
-            for form in exercise_formset.forms:
-                form.fields['exercise'].queryset = Exercise.objects.filter(user=self.request.user)
-            context['formset'] = exercise_formset
-
-        workoutplan = get_object_or_404(WorkoutPlan, pk=self.kwargs.get('workoutplan_pk'))
+        workoutplan = self.get_workout_plan()
         context["breadcrumbs"] = [
             {'title': 'Workout Plans', 'url': reverse_lazy('workoutplan-list')}, 
             {'title': f'{workoutplan.title}', 'url': reverse_lazy('workoutplan-detail', kwargs={'pk': workoutplan.id})}, 
@@ -251,29 +314,16 @@ class WorkoutSessionCreateView(LoginRequiredMixin, UserPassesTestMixin, WorkoutS
 
     def get_initial(self):
         initial = super(WorkoutSessionCreateView, self).get_initial()
-        workoutplan_pk = self.kwargs.get('workoutplan_pk')
-        if workoutplan_pk:
-            initial['workout_plan'] = workoutplan_pk
+        initial['workout_plan'] = self.get_workout_plan().pk
         return initial
 
-    def test_func(self):
-        workoutplan_pk = self.kwargs.get('workoutplan_pk')
-        workout_plan = get_object_or_404(WorkoutPlan, pk=workoutplan_pk)
-        if self.request.user.id == workout_plan.user.id:
-            return True
-        return False
-
-class WorkoutSessionUpdateView(LoginRequiredMixin, UserPassesTestMixin, WorkoutSessionFormsetMixin, UpdateView):
+class WorkoutSessionUpdateView(LoginRequiredMixin, WorkoutSessionObjectMixin, WorkoutSessionFormsetMixin, UpdateView):
     model = WorkoutSession
     form_class = WorkoutSessionForm
 
-    def get_object(self, queryset=None):
-        session_pk = self.kwargs.get('session_pk')
-        return get_object_or_404(WorkoutSession, pk=session_pk)
-    
     def get_context_data(self, **kwargs):
         context = super(WorkoutSessionUpdateView, self).get_context_data(**kwargs)
-        workout_session = self.get_object()
+        workout_session = self.object
         duration_seconds = workout_session.duration.total_seconds()
 
         hours = duration_seconds // 3600
@@ -284,90 +334,71 @@ class WorkoutSessionUpdateView(LoginRequiredMixin, UserPassesTestMixin, WorkoutS
         context['minutes'] = int(minutes)
         context['seconds'] = int(seconds)
 
-        if self.request.method == 'POST':
-            context['formset'] = ExerciseInSessionFormSet(self.request.POST, self.request.FILES)
-        else:
-            exercise_formset = ExerciseInSessionFormSet(instance=workout_session)
-            for form in exercise_formset.forms:
-                form.fields['exercise'].queryset = Exercise.objects.filter(user=self.request.user)
-            context['formset'] = exercise_formset
-
-        workoutplan = get_object_or_404(WorkoutPlan, pk=self.kwargs.get('workoutplan_pk'))
+        workoutplan = self.get_workout_plan()
         context["breadcrumbs"] = [
             {'title': 'Workout Plans', 'url': reverse_lazy('workoutplan-list')}, 
             {'title': f'{workoutplan.title}', 'url': reverse_lazy('workoutplan-detail', kwargs={'pk': workoutplan.id})},
-            {'title': 'Workout Session Details', 'url': reverse_lazy('workoutsession-detail', kwargs={'workoutplan_pk': workoutplan.id, 'session_pk': self.get_object().id})}, 
+            {'title': 'Workout Session Details', 'url': reverse_lazy('workoutsession-detail', kwargs={'workoutplan_pk': workoutplan.id, 'session_pk': self.object.id})}, 
             {'title': 'Edit Workout Session'}]
 
         return context
-    
-    def test_func(self):
-        workoutplan_pk = self.kwargs.get('workoutplan_pk')
-        workout_plan = get_object_or_404(WorkoutPlan, pk=workoutplan_pk)
-        if self.request.user.id == workout_plan.user.id:
-            return True
-        return False
-
-class WorkoutSessionDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
+
+class WorkoutSessionDeleteView(LoginRequiredMixin, WorkoutSessionObjectMixin, DeleteView):
     model = WorkoutSession
 
     def get_success_url(self):
-        workout_plan_id = self.object.workout_plan.id
+        workout_plan_id = self.object.workout_plan_id
         return reverse_lazy('workoutplan-detail', kwargs={'pk': workout_plan_id})
 
-    def get_object(self, queryset=None):
-        session_pk = self.kwargs.get('session_pk')
-        return get_object_or_404(WorkoutSession, pk=session_pk)
-    
-    def test_func(self):
-        workoutplan_pk = self.kwargs.get('workoutplan_pk')
-        workout_plan = get_object_or_404(WorkoutPlan, pk=workoutplan_pk)
-        if self.request.user.id == workout_plan.user.id:
-            return True
-        return False
+    def form_valid(self, form):
+        with transaction.atomic():
+            volume_keys = session_keys([self.object.pk])
+            record_exercises = held_exercises(ExerciseInSession.objects.filter(workout_session=self.object))
+            response = super().form_valid(form)
+            refresh_volume(volume_keys)
+            update_records(ExerciseInSession.objects.none(), recompute=record_exercises)
+        return response
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        workoutplan = get_object_or_404(WorkoutPlan, pk=self.kwargs.get('workoutplan_pk'))
+        workoutplan = self.get_workout_plan()
         context["breadcrumbs"] = [
             {'title': 'Workout Plans', 'url': reverse_lazy('workoutplan-list')}, 
             {'title': f'{workoutplan.title}', 'url': reverse_lazy('workoutplan-detail', kwargs={'pk': workoutplan.id})},
-            {'title': 'Workout Session Details', 'url': reverse_lazy('workoutsession-detail', kwargs={'workoutplan_pk': workoutplan.id, 'session_pk': self.get_object().id})}, 
+            {'title': 'Workout Session Details', 'url': reverse_lazy('workoutsession-detail', kwargs={'workoutplan_pk': workoutplan.id, 'session_pk': self.object.id})}, 
             {'title': 'Delete Workout Session'}]
         return context
-    
 
-class WorkoutSessionDetailView(LoginRequiredMixin, UserPassesTestMixin, DetailView):
+def flag_records(exercises, records):
+    for exercise in exercises:
+        exercise.records = records.get(exercise.pk, [])
+
+class WorkoutSessionDetailView(LoginRequiredMixin, WorkoutSessionObjectMixin, DetailView):
     model = WorkoutSession
     context_object_name = 'workout_session'
 
-    def get_object(self, queryset=None):
-        session_pk = self.kwargs.get('session_pk')
-        return get_object_or_404(WorkoutSession, pk=session_pk)
+    def get_exercises(self):
+        return ExerciseInSession.objects.filter(workout_session_id=self.kwargs.get('session_pk')).select_related('exercise')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['title'] = 'Session Details'
-        context['exercises'] = ExerciseInSession.objects.filter(workout_session_id=self.kwargs.get('session_pk'))
+        if 'exercises' not in context:
+            context['exercises'] = self.get_exercises()
+            # Records are looked up by the rows that hold them, so flagging PRs never reads the user's history
+            flag_records(context['exercises'], records_by_entry(context['exercises']))
         
-        workoutplan = get_object_or_404(WorkoutPlan, pk=self.kwargs.get('workoutplan_pk'))
+        workoutplan = self.get_workout_plan()
         context["breadcrumbs"] = [
             {'title': 'Workout Plans', 'url': reverse_lazy('workoutplan-list')}, 
             {'title': f'{workoutplan.title}', 'url': reverse_lazy('workoutplan-detail', kwargs={'pk': workoutplan.id})}, 
             {'title': 'Session Details'}]
         return context
-    
-    def test_func(self):
-        workoutplan_pk = self.kwargs.get('workoutplan_pk')
-        workout_plan = get_object_or_404(WorkoutPlan, pk=workoutplan_pk)
-        if self.request.user.id == workout_plan.user.id:
-            return True
-        return False
-
-class GoalListView(LoginRequiredMixin, ListView):
+
+class GoalListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Goal
     context_object_name = 'goals'
-    ordering = ['start_date']
+    keyset_ordering = ('start_date', 'id')
 
     def get_queryset(self):
         return self.model.objects.filter(user=self.request.user)
@@ -378,12 +409,12 @@ class GoalListView(LoginRequiredMixin, ListView):
         context["title"] = 'Goals'
         return context
 
-class GoalDetailView(LoginRequiredMixin, UserPassesTestMixin, DetailView):
+class GoalDetailView(LoginRequiredMixin, OwnedObjectMixin, DetailView):
     model = Goal
     context_object_name = 'goal'
 
     def get_context_data(self, **kwargs):
-        workoutplan = self.get_object()
+        workoutplan = self.object
         context = super().get_context_data(**kwargs)
         context["breadcrumbs"] = [
             {'title': 'Goals', 'url': reverse_lazy('goal-list')}, 
@@ -391,12 +422,6 @@ class GoalDetailView(LoginRequiredMixin, UserPassesTestMixin, DetailView):
         context['title'] = 'Goal Details'
         return context
 
-    def test_func(self):
-        workout_plan = self.get_object()
-        if self.request.user.id == workout_plan.user.id:
-            return True
-        return False
-
 class GoalCreateView(LoginRequiredMixin, CreateView):
     model = Goal
     form_class = GoalForm
@@ -414,7 +439,7 @@ class GoalCreateView(LoginRequiredMixin, CreateView):
         context["action"] = 'Add'
         return context
 
-class GoalUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
+class GoalUpdateView(LoginRequiredMixin, OwnedObjectMixin, UpdateView):
     model = Goal
     form_class = GoalForm
 
@@ -423,7 +448,7 @@ class GoalUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
         return super().form_valid(form)
 
     def get_context_data(self, **kwargs):
-        goal = self.get_object()
+        goal = self.object
         context = super().get_context_data(**kwargs)
         context["breadcrumbs"] = [
             {'title': 'Goals', 'url': reverse_lazy('goal-list')}, 
@@ -433,18 +458,12 @@ class GoalUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
         context["action"] = 'Update'
         return context
 
-    def test_func(self):
-        goal = self.get_object()
-        if self.request.user.id == goal.user.id:
-            return True
-        return False
-
-class GoalDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
+class GoalDeleteView(LoginRequiredMixin, OwnedObjectMixin, DeleteView):
     model = Goal
     success_url = '/goals/'
 
     def get_context_data(self, **kwargs):
-        goal = self.get_object()
+        goal = self.object
         context = super().get_context_data(**kwargs)
         context["breadcrumbs"] = [
             {'title': 'Goals', 'url': reverse_lazy('goal-list')}, 
@@ -453,12 +472,19 @@ class GoalDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
         context["title"] = 'Delete Goal'
         return context
     
-    def test_func(self):
-        goal = self.get_object()
-        if self.request.user.id == goal.user.id:
-            return True
-        return False
 
 
 def custom_404(request, exception):
-    return render(request, 'muscleforge/404.html', status=404)
\ No newline at end of file
+    return render(request, 'muscleforge/404.html', status=404)
+
+
+@require_safe
+def metrics(request):
+    # Scraped with MUSCLEFORGE_METRICS_TOKEN or viewed by staff. The client
+    # address proves nothing, as behind a local proxy every request is from localhost.
+    token = settings.MUSCLEFORGE_METRICS_TOKEN
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    scraper = bool(token) and hmac.compare_digest(authorization.encode(), f'Bearer {token}'.encode())
+    if not scraper and not request.user.is_staff:
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(*process_metrics.collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
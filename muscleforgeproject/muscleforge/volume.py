@@ -0,0 +1,105 @@
+from functools import reduce
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import ExerciseInSession, ExerciseVolume
+
+USER = 'workout_session__workout_plan__user_id'
+DATE = 'workout_session__date'
+# Keys refreshed per query; each one is a clause of an OR, which the database nests
+KEYS_PER_QUERY = 100
+
+
+def entry_keys(entries):
+    """Return the (user_id, exercise_id, date) days an ExerciseInSession queryset contributes to."""
+    return set(entries.values_list(USER, 'exercise_id', DATE).distinct())
+
+
+def session_keys(session_ids):
+    return entry_keys(ExerciseInSession.objects.filter(workout_session_id__in=session_ids))
+
+
+def day_totals(entries):
+    """Group an ExerciseInSession queryset into per user, exercise and day totals."""
+    return entries.values(USER, 'exercise_id', DATE).annotate(
+        total_volume=Sum(F('sets') * F('repetitions') * Coalesce('weight_used', Value(0.0))),
+        rep_total=Sum(F('sets') * F('repetitions')),
+        weighted_rep_total=Sum(F('sets') * F('repetitions'), filter=Q(weight_used__isnull=False), default=0),
+        heaviest=Max('weight_used'),
+        session_count=Count('workout_session', distinct=True),
+    ).order_by()
+
+
+def to_volume(row, model=ExerciseVolume):
+    values = {
+        'user_id': row[USER],
+        'exercise_id': row['exercise_id'],
+        'date': row[DATE],
+        'volume': row['total_volume'],
+        'total_reps': row['rep_total'],
+        'weighted_reps': row['weighted_rep_total'],
+        'max_weight': row['heaviest'],
+        'sessions': row['session_count'],
+    }
+    # A migration's historical model may not have every total yet
+    fields = {field.attname for field in model._meta.concrete_fields}
+    return model(**{name: value for name, value in values.items() if name in fields})
+
+
+def keys_filter(keys, user='user_id', exercise='exercise_id', date='date'):
+    return reduce(lambda left, right: left | right, (
+        Q(**{user: user_id, exercise: exercise_id, date: day})
+        for user_id, exercise_id, day in keys
+    ))
+
+
+def refresh_volume(keys):
+    """
+    Recompute the ExerciseVolume rows for the given (user_id, exercise_id, date)
+    keys from their ExerciseInSession rows. Cost depends on the number of keys,
+    not on the size of the user's history.
+    """
+    keys = sorted(set(keys))
+    with transaction.atomic():
+        for start in range(0, len(keys), KEYS_PER_QUERY):
+            chunk = keys[start:start + KEYS_PER_QUERY]
+            rows = [to_volume(row) for row in day_totals(
+                ExerciseInSession.objects.filter(keys_filter(chunk, USER, 'exercise_id', DATE))
+            )]
+            ExerciseVolume.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['user', 'exercise', 'date'],
+                update_fields=['volume', 'total_reps', 'weighted_reps', 'max_weight', 'sessions'],
+            )
+            emptied = set(chunk) - {(row.user_id, row.exercise_id, row.date) for row in rows}
+            if emptied:
+                ExerciseVolume.objects.filter(keys_filter(emptied)).delete()
+
+
+def rebuild_volume(user_ids=None, batch_size=1000, entry_model=ExerciseInSession, volume_model=ExerciseVolume):
+    """
+    Rebuild the ExerciseVolume table from scratch, for every user or only
+    ``user_ids``. Migrations pass their historical models.
+    """
+    entries = entry_model.objects.all()
+    volumes = volume_model.objects.all()
+    if user_ids is not None:
+        entries = entries.filter(**{f'{USER}__in': user_ids})
+        volumes = volumes.filter(user_id__in=user_ids)
+
+    created = 0
+    with transaction.atomic():
+        volumes.delete()
+        batch = []
+        for row in day_totals(entries).iterator(chunk_size=batch_size):
+            batch.append(to_volume(row, volume_model))
+            if len(batch) >= batch_size:
+                volume_model.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        volume_model.objects.bulk_create(batch)
+        created += len(batch)
+    return created
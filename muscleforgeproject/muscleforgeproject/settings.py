@@ -46,6 +46,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'muscleforge.middleware.StaticAssetMiddleware',
+    'muscleforge.middleware.ServerTimingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -54,19 +56,55 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Send each response's query count and db/template/view times in a Server-Timing
+# header, and log requests that take at least MUSCLEFORGE_SLOW_REQUEST_MS
+MUSCLEFORGE_SERVER_TIMING = os.environ.get('MUSCLEFORGE_SERVER_TIMING', '1') == '1'
+MUSCLEFORGE_SLOW_REQUEST_MS = int(os.environ.get('MUSCLEFORGE_SLOW_REQUEST_MS', 500))
+
+# Aggregate every query by view and fingerprint into a rotating log that the
+# query_report command reads (see muscleforge/querylog.py). The slowest query of
+# each, if it took at least MUSCLEFORGE_SLOW_QUERY_MS, is kept with its plan.
+MUSCLEFORGE_QUERY_LOG = os.environ.get('MUSCLEFORGE_QUERY_LOG') == '1'
+MUSCLEFORGE_QUERY_LOG_PATH = os.path.join(BASE_DIR, 'logs', 'queries.log')
+MUSCLEFORGE_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+MUSCLEFORGE_QUERY_LOG_FLUSH = 10
+MUSCLEFORGE_SLOW_QUERY_MS = int(os.environ.get('MUSCLEFORGE_SLOW_QUERY_MS', 100))
+
+# Directory where each worker process writes its metrics so /metrics adds up all
+# of them; set it when running several workers, e.g. under gunicorn. Unset, the
+# endpoint reports the process that serves it.
+MUSCLEFORGE_METRICS_DIR = os.environ.get('MUSCLEFORGE_METRICS_DIR')
+MUSCLEFORGE_METRICS_FLUSH = 1
+# Bearer token a scraper sends as "Authorization: Bearer <token>" to read /metrics;
+# without it only staff users can
+MUSCLEFORGE_METRICS_TOKEN = os.environ.get('MUSCLEFORGE_METRICS_TOKEN')
+
 ROOT_URLCONF = 'muscleforgeproject.urls'
 
+# Routes served by their async view under ASGI (see muscleforge/async_views.py),
+# e.g. MUSCLEFORGE_ASYNC_ROUTES=muscleforge-home,goal-list or '*' for all of them
+MUSCLEFORGE_ASYNC_ROUTES = [route for route in os.environ.get('MUSCLEFORGE_ASYNC_ROUTES', '').split(',') if route]
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Django's backend, timing renders for ServerTimingMiddleware
+        'BACKEND': 'muscleforge.instrumentation.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'muscleforge.context_processors.layout',
+            ],
+            # Compile each template once per process. The development server's
+            # autoreloader clears the cache when a template file changes.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
             ],
         },
     },
@@ -85,6 +123,57 @@ DATABASES = {
     }
 }
 
+# PRAGMAs set on every new SQLite connection (see muscleforge/database.py)
+MUSCLEFORGE_SQLITE_PRAGMAS = {}
+
+# MUSCLEFORGE_DB_PROFILE=production tunes SQLite for many concurrent workers
+MUSCLEFORGE_DB_PROFILE = os.environ.get('MUSCLEFORGE_DB_PROFILE', 'development')
+
+if MUSCLEFORGE_DB_PROFILE == 'production':
+    DATABASES['default'].update({
+        # Keep connections (and their pragmas) for 10 minutes, checking them before reuse
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+    })
+    MUSCLEFORGE_SQLITE_PRAGMAS = {
+        # Readers no longer block the writer, and commits only fsync at checkpoints
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        # Wait up to 20s for the write lock instead of failing with "database is locked"
+        'busy_timeout': 20000,
+        'mmap_size': 256 * 1024 * 1024,
+        # Negative sizes are in KiB, so 64 MiB of page cache per connection
+        'cache_size': -64 * 1024,
+    }
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+# Both backends count hits and misses for /metrics
+CACHES = {
+    'default': {
+        'BACKEND': 'muscleforge.caching.LocMemCache',
+        'LOCATION': 'muscleforge',
+    },
+    # The mostly static fragments of the base layouts, kept in each process so
+    # reading them never costs a query. The topbar's fragment still follows the
+    # user's 'layout' version in the default cache.
+    'fragments': {
+        'BACKEND': 'muscleforge.caching.LocMemCache',
+        'LOCATION': 'muscleforge-fragments',
+    },
+}
+
+if MUSCLEFORGE_DB_PROFILE == 'production':
+    # Every worker has to see the per-user cache versions the others bump on a
+    # write, or it keeps serving pages and API responses cached before it. Create
+    # the table once with `python manage.py createcachetable`.
+    CACHES['default'] = {
+        'BACKEND': 'muscleforge.caching.DatabaseCache',
+        'LOCATION': 'muscleforge_cache',
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -122,9 +211,29 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+
+# collectstatic gives assets content-hashed names and writes .gz/.br copies of them
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'muscleforge.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Serve STATIC_ROOT from the app with far-future caching (see muscleforge/middleware.py).
+# The development server serves the apps' static directories instead.
+MUSCLEFORGE_SERVE_STATIC = not DEBUG
+
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
 
+# Threads that build profile picture thumbnails after the upload request returns;
+# 0 builds them inline in the request (as the tests do)
+MUSCLEFORGE_IMAGE_WORKERS = int(os.environ.get('MUSCLEFORGE_IMAGE_WORKERS', 2))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
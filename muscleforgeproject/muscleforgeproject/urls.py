@@ -28,6 +28,8 @@ urlpatterns = [
     path('logout/', user_views.logout_view, name='logout'),
     path('profile/', user_views.profile, name='profile'),
     path('settings/', user_views.account_settings, name='account-settings'),
+    path('settings/export/<str:export_format>/', user_views.export_data, name='account-export'),
+    path('settings/export/<str:export_format>/<str:table>/', user_views.export_data, name='account-export-table'),
     path('', include('muscleforge.urls'))
 ]
 
@@ -0,0 +1,185 @@
+import base64
+import csv
+import io
+import json
+import os
+import zipfile
+from datetime import date, datetime, timedelta
+
+from asgiref.sync import sync_to_async
+from django.core.files.storage import default_storage
+from django.core.handlers.asgi import ASGIRequest
+
+from muscleforge.models import WorkoutPlan, Exercise, WorkoutSession, ExerciseInSession, Goal
+from .models import UserProfile
+
+EXPORT_CHUNK_SIZE = 2000
+# Returned by next() once an export is exhausted
+DONE = object()
+STREAM_BUFFER_SIZE = 64 * 1024
+# Multiple of 3 so each block base64-encodes without padding in the middle of the stream
+PICTURE_BLOCK_SIZE = 3 * 16 * 1024
+
+TABLES = {
+    'profile': ['height', 'weight', 'gender', 'age', 'fitness_goals', 'profile_picture'],
+    'exercises': ['id', 'name', 'description', 'difficulty_level', 'exercise_type', 'equipment_needed'],
+    'workout_plans': ['id', 'title', 'start_date', 'end_date', 'status'],
+    'workout_sessions': ['id', 'workout_plan_id', 'date', 'duration', 'notes'],
+    'exercises_in_session': ['id', 'workout_session_id', 'exercise_id', 'exercise__name', 'repetitions', 'sets', 'weight_used'],
+    'goals': ['id', 'title', 'description', 'start_date', 'end_date', 'status'],
+}
+
+
+def table_queryset(user, table):
+    querysets = {
+        'profile': UserProfile.objects.filter(user=user),
+        'exercises': Exercise.objects.filter(user=user),
+        'workout_plans': WorkoutPlan.objects.filter(user=user),
+        'workout_sessions': WorkoutSession.objects.filter(workout_plan__user=user),
+        'exercises_in_session': ExerciseInSession.objects.filter(workout_session__workout_plan__user=user),
+        'goals': Goal.objects.filter(user=user),
+    }
+    return querysets[table].order_by('id').values_list(*TABLES[table])
+
+
+def table_rows(user, table):
+    """Yield the user's rows of ``table`` as exportable values, fetching EXPORT_CHUNK_SIZE rows at a time."""
+    for row in table_queryset(user, table).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [export_value(value) for value in row]
+
+
+def export_value(value):
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def buffered(chunks, size=STREAM_BUFFER_SIZE):
+    """Join small string chunks into pieces of about ``size`` characters for the response."""
+    pending = []
+    length = 0
+    for chunk in chunks:
+        pending.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield ''.join(pending)
+            pending = []
+            length = 0
+    if pending:
+        yield ''.join(pending)
+
+
+class Echo:
+    """File-like object whose write returns the line, so csv.writer can produce lines lazily."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(user, table):
+    writer = csv.writer(Echo())
+    yield writer.writerow(TABLES[table])
+    for row in table_rows(user, table):
+        yield writer.writerow(row)
+
+
+def export_csv(user, table):
+    return buffered(csv_lines(user, table))
+
+
+def picture_name(user):
+    name = UserProfile.objects.filter(user=user).values_list('profile_picture', flat=True).first()
+    if name and default_storage.exists(name):
+        return name
+    return None
+
+
+def picture_blocks(name):
+    with default_storage.open(name, 'rb') as picture:
+        while block := picture.read(PICTURE_BLOCK_SIZE):
+            yield block
+
+
+def ndjson_lines(user):
+    for table, fields in TABLES.items():
+        for row in table_rows(user, table):
+            yield json.dumps({'table': table, **dict(zip(fields, row))}) + '\n'
+
+    name = picture_name(user)
+    if name:
+        yield json.dumps({'table': 'profile_picture', 'name': os.path.basename(name)})[:-1] + ', "content_base64": "'
+        for block in picture_blocks(name):
+            yield base64.b64encode(block).decode()
+        yield '"}\n'
+
+
+def export_ndjson(user):
+    """One JSON object per line, tagged with its table, ending with the base64 profile picture."""
+    return buffered(ndjson_lines(user))
+
+
+class StreamSink(io.RawIOBase):
+    """
+    Unseekable file that keeps what is written until drained. ZipFile detects
+    that it can't seek back and writes each member's sizes after its data.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def export_zip(user):
+    """Stream a ZIP with one CSV per table and the profile picture, compressing as rows are read."""
+    sink = StreamSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for table in TABLES:
+            with archive.open(f'{table}.csv', 'w', force_zip64=True) as member:
+                for chunk in export_csv(user, table):
+                    member.write(chunk.encode())
+                    if data := sink.drain():
+                        yield data
+
+        name = picture_name(user)
+        if name:
+            with archive.open(f'profile_picture/{os.path.basename(name)}', 'w', force_zip64=True) as member:
+                for block in picture_blocks(name):
+                    member.write(block)
+                    if data := sink.drain():
+                        yield data
+    yield sink.drain()
+
+
+def streaming_content(request, chunks):
+    """
+    ``chunks`` the way the server serving ``request`` streams them. Under ASGI a
+    sync iterator would be read into memory in full before the first byte is
+    sent, so it's read a chunk at a time from an async iterator instead.
+    """
+    if isinstance(request, ASGIRequest):
+        return aiterate(chunks)
+    return chunks
+
+
+async def aiterate(chunks):
+    # The exports query as they're read, so they run on the thread sync views use
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    try:
+        while (chunk := await next_chunk(chunks, DONE)) is not DONE:
+            yield chunk
+    finally:
+        # A client that disconnects stops the export and its open cursor
+        await sync_to_async(chunks.close, thread_sensitive=True)()
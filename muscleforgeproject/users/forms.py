@@ -1,6 +1,7 @@
 from django import forms
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm
+from .images import PictureTooLarge, downscale_upload
 from .models import UserProfile
 
 class UserRegisterForm(UserCreationForm):
@@ -20,4 +21,20 @@ class UserUpdateForm(forms.ModelForm):
 class ProfileUpdateForm(forms.ModelForm):
     class Meta:
         model = UserProfile
-        fields = ['height', 'weight', 'gender', 'age', 'fitness_goals', 'profile_picture']
\ No newline at end of file
+        fields = ['height', 'weight', 'gender', 'age', 'fitness_goals', 'profile_picture']
+
+    def clean_profile_picture(self):
+        picture = self.cleaned_data.get('profile_picture')
+        if 'profile_picture' not in self.changed_data or not picture:
+            return picture
+        # Store phone camera pictures at avatar size rather than full resolution
+        try:
+            return downscale_upload(picture)
+        except PictureTooLarge:
+            raise forms.ValidationError('This image is too large, please upload a smaller one.')
+
+    def save(self, commit=True):
+        if 'profile_picture' in self.changed_data:
+            # Pages show the original until the new thumbnails are built
+            self.instance.has_thumbnails = False
+        return super().save(commit)
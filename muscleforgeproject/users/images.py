@@ -0,0 +1,183 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+from muscleforge.caching import bump_version
+from .models import UserProfile
+
+THUMBNAIL_SIZES = (64, 128, 256)
+# (Pillow format, file extension) of each thumbnail; browsers without WebP get the JPEG
+THUMBNAIL_FORMATS = (('WEBP', 'webp'), ('JPEG', 'jpg'))
+# Uploads are stored at most this many pixels per side
+MAX_PICTURE_SIZE = 1024
+# Refuse images that would need more memory than this many pixels to decode
+MAX_PICTURE_PIXELS = 40_000_000
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class PictureTooLarge(Exception):
+    pass
+
+
+def thumbnail_name(name, size, extension):
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, 'thumbs', f'{stem}_{size}.{extension}')
+
+
+def supports_thumbnails(name):
+    return bool(name) and not name.endswith('.svg')
+
+
+def downscale_upload(upload):
+    """
+    Return ``upload`` re-encoded to fit MAX_PICTURE_SIZE, turned upright from
+    its EXIF orientation, or unchanged if it already fits. Raises
+    PictureTooLarge for images with more than MAX_PICTURE_PIXELS pixels, which
+    is checked from the header before anything is decoded.
+    """
+    upload.seek(0)
+    with Image.open(upload) as image:
+        if image.width * image.height > MAX_PICTURE_PIXELS:
+            raise PictureTooLarge(f'{image.width}x{image.height}')
+        if max(image.size) <= MAX_PICTURE_SIZE:
+            upload.seek(0)
+            return upload
+        # JPEGs are decoded straight at a reduced scale instead of at full size
+        image.draft('RGB', (MAX_PICTURE_SIZE, MAX_PICTURE_SIZE))
+        picture = ImageOps.exif_transpose(image)
+        picture.thumbnail((MAX_PICTURE_SIZE, MAX_PICTURE_SIZE), Image.LANCZOS)
+
+    output = BytesIO()
+    if picture.mode in ('RGBA', 'LA', 'P'):
+        picture.save(output, 'PNG', optimize=True)
+        extension = 'png'
+    else:
+        picture.convert('RGB').save(output, 'JPEG', quality=88, optimize=True)
+        extension = 'jpg'
+    stem = os.path.splitext(os.path.basename(upload.name))[0]
+    return ContentFile(output.getvalue(), name=f'{stem}.{extension}')
+
+
+def make_thumbnails(name):
+    """Write every size and format of thumbnail for the stored picture ``name``."""
+    with default_storage.open(name, 'rb') as file, Image.open(file) as image:
+        image.draft('RGB', (max(THUMBNAIL_SIZES), max(THUMBNAIL_SIZES)))
+        picture = ImageOps.exif_transpose(image)
+        if picture.mode not in ('RGB', 'RGBA'):
+            picture = picture.convert('RGBA' if 'A' in picture.getbands() or 'transparency' in picture.info else 'RGB')
+        for size in THUMBNAIL_SIZES:
+            # Avatars are shown as squares, so crop to the center rather than letterbox
+            thumbnail = ImageOps.fit(picture, (size, size), Image.LANCZOS)
+            for image_format, extension in THUMBNAIL_FORMATS:
+                output = BytesIO()
+                if image_format == 'JPEG':
+                    flat = Image.new('RGB', thumbnail.size, 'white')
+                    flat.paste(thumbnail, mask=thumbnail.getchannel('A') if thumbnail.mode == 'RGBA' else None)
+                    flat.save(output, image_format, quality=85, optimize=True, progressive=True)
+                else:
+                    thumbnail.save(output, image_format, quality=80, method=4)
+                save_replacing(thumbnail_name(name, size, extension), output.getvalue())
+
+
+def delete_thumbnails(name):
+    for size in THUMBNAIL_SIZES:
+        for _, extension in THUMBNAIL_FORMATS:
+            thumbnail = thumbnail_name(name, size, extension)
+            if default_storage.exists(thumbnail):
+                default_storage.delete(thumbnail)
+
+
+def save_replacing(name, content):
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    default_storage.save(name, ContentFile(content))
+
+
+def process_picture(profile_id, name, previous=None):
+    """
+    Build the thumbnails of ``name`` and mark the profile as having them, unless
+    it has been given another picture meanwhile. Runs on a pool thread, or
+    inline after the commit with MUSCLEFORGE_IMAGE_WORKERS = 0.
+    """
+    try:
+        remove_thumbnails(previous, keep=name)
+        if supports_thumbnails(name):
+            make_thumbnails(name)
+            updated = UserProfile.objects.filter(pk=profile_id, profile_picture=name).update(has_thumbnails=True)
+            if updated:
+                # update() sends no post_save, and the cached topbar still links the original picture
+                user_id = UserProfile.objects.filter(pk=profile_id).values_list('user_id', flat=True).first()
+                bump_version('layout', user_id)
+    except Exception:
+        # Nothing waits on this, and the profile is already saved, so record the
+        # failure and let pages keep showing the original
+        logger.exception('Could not build thumbnails of %s', name)
+    finally:
+        if settings.MUSCLEFORGE_IMAGE_WORKERS:
+            connection.close()
+
+
+def build_missing_thumbnails(model=UserProfile):
+    """
+    Build the thumbnails of every stored picture that has none yet, e.g. pictures
+    uploaded before thumbnails existed or whose build failed, and return the ids
+    of the users whose profiles got them. Migrations pass their historical model.
+    """
+    missing = model.objects.filter(has_thumbnails=False).exclude(profile_picture='')
+    user_ids = []
+    for profile_id, user_id, name in missing.values_list('id', 'user_id', 'profile_picture').iterator():
+        if not supports_thumbnails(name):
+            continue
+        try:
+            make_thumbnails(name)
+        except Exception:
+            logger.exception('Could not build thumbnails of %s', name)
+            continue
+        if model.objects.filter(pk=profile_id, profile_picture=name).update(has_thumbnails=True):
+            user_ids.append(user_id)
+    return user_ids
+
+
+def remove_thumbnails(previous, keep=None):
+    if previous and previous != keep and supports_thumbnails(previous):
+        delete_thumbnails(previous)
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(settings.MUSCLEFORGE_IMAGE_WORKERS, thread_name_prefix='thumbnails')
+        return _executor
+
+
+def submit(profile_id, name, previous=None):
+    if not settings.MUSCLEFORGE_IMAGE_WORKERS:
+        process_picture(profile_id, name, previous)
+        return
+    get_executor().submit(process_picture, profile_id, name, previous)
+
+
+def schedule_thumbnails(profile, previous=None):
+    """
+    Once the transaction that stored the profile's new picture commits, remove
+    the previous picture's thumbnails and build the new one's on the image
+    worker pool. Until then pages show the original.
+    """
+    name = profile.profile_picture.name
+    if not supports_thumbnails(name) and not (previous and supports_thumbnails(previous)):
+        return
+    transaction.on_commit(lambda: submit(profile.pk, name, previous))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from muscleforge.caching import bump_version
+from users.images import build_missing_thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Build the thumbnails of stored profile pictures that have none, e.g. after a failed build'
+
+    def handle(self, *args, **options):
+        user_ids = build_missing_thumbnails()
+        # The cached topbars still link the original pictures
+        for user_id in user_ids:
+            bump_version('layout', user_id)
+        self.stdout.write(self.style.SUCCESS(f'Built thumbnails for {len(user_ids)} profile pictures'))
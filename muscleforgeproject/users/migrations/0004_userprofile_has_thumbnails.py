@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 16:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_alter_userprofile_profile_picture'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='has_thumbnails',
+            field=models.BooleanField(default=False),
+        ),
+    ]
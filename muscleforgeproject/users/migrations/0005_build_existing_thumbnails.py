@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+def build_thumbnails(apps, schema_editor):
+    # Pictures uploaded before 0004 would otherwise keep being served at full size.
+    # The cached topbars linking them live in each process, so the restart that
+    # comes with a deploy drops them.
+    from users.images import build_missing_thumbnails
+
+    build_missing_thumbnails(apps.get_model('users', 'UserProfile'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_userprofile_has_thumbnails'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_thumbnails, migrations.RunPython.noop),
+    ]
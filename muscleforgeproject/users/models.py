@@ -13,6 +13,8 @@ class UserProfile(models.Model):
     age = models.IntegerField(blank=True, null=True)
     fitness_goals = models.TextField(blank=True, null=True)
     profile_picture = models.ImageField(default='default.svg', upload_to='profile_pics', blank=True, null=True)
+    # Set once the resized copies of profile_picture exist (see users/images.py)
+    has_thumbnails = models.BooleanField(default=False)
 
     def __str__(self):
         return f'{self.user.username} Profile'
@@ -0,0 +1,31 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+
+from ..images import THUMBNAIL_FORMATS, THUMBNAIL_SIZES, thumbnail_name
+
+register = template.Library()
+
+
+@register.simple_tag
+def avatar(profile, size, **attrs):
+    """
+    Render ``profile``'s picture as a WebP thumbnail of ``size`` pixels with a
+    JPEG fallback, or the stored picture until its thumbnails are built.
+    ``attrs`` are added to the <img>, e.g. {% avatar profile 64 class="rounded-circle" %}.
+    """
+    attributes = format_html_join('', ' {}="{}"', attrs.items())
+    # Anonymous users (e.g. on error pages) have no profile
+    picture = getattr(profile, 'profile_picture', None)
+    if not picture:
+        return ''
+    if not profile.has_thumbnails:
+        return format_html('<img src="{}"{}>', picture.url, attributes)
+    # The smallest thumbnail that is still sharp at the requested size
+    size = next((thumbnail for thumbnail in THUMBNAIL_SIZES if thumbnail >= size), THUMBNAIL_SIZES[-1])
+    urls = {extension: default_storage.url(thumbnail_name(picture.name, size, extension))
+            for _, extension in THUMBNAIL_FORMATS}
+    return format_html(
+        '<picture><source srcset="{}" type="image/webp"><img src="{}"{}></picture>',
+        urls['webp'], urls['jpg'], attributes,
+    )
@@ -0,0 +1,84 @@
+import base64
+import csv
+import io
+import json
+import zipfile
+
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.test import TestCase
+from django.urls import reverse
+from muscleforge.benchmark import seed_user_data
+from muscleforge.models import ExerciseInSession
+from users.export import TABLES
+
+# Checking the streamed data export in every format
+class ExportDataTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        seed_user_data(self.user, plans=3, sessions_per_plan=4, goals=5)
+        seed_user_data(User.objects.create_user(username='otheruser', password='testpassword123'), plans=2, seed=1)
+        self.client.force_login(self.user)
+        self.async_client.force_login(self.user)
+        self.entries = ExerciseInSession.objects.filter(workout_session__workout_plan__user=self.user).count()
+
+    def content(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_zip_has_a_csv_per_table_and_the_picture(self):
+        response = self.client.get(reverse('account-export', args=['zip']))
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        archive = zipfile.ZipFile(io.BytesIO(self.content(response)))
+        self.assertIsNone(archive.testzip())
+        for table in TABLES:
+            rows = list(csv.reader(io.StringIO(archive.read(f'{table}.csv').decode())))
+            self.assertEqual(rows[0], TABLES[table])
+        entries = list(csv.reader(io.StringIO(archive.read('exercises_in_session.csv').decode())))
+        self.assertEqual(len(entries), self.entries + 1)
+        with default_storage.open(self.user.userprofile.profile_picture.name, 'rb') as picture:
+            self.assertEqual(archive.read('profile_picture/default.svg'), picture.read())
+
+    def test_ndjson_lines_cover_every_table(self):
+        response = self.client.get(reverse('account-export', args=['ndjson']))
+        records = [json.loads(line) for line in self.content(response).decode().splitlines()]
+        tables = [record['table'] for record in records]
+        self.assertEqual(tables.count('exercises_in_session'), self.entries)
+        self.assertEqual(tables.count('workout_plans'), 3)
+        self.assertEqual(tables.count('goals'), 5)
+        self.assertEqual(tables.count('profile'), 1)
+        picture = records[-1]
+        self.assertEqual(picture['table'], 'profile_picture')
+        with default_storage.open(self.user.userprofile.profile_picture.name, 'rb') as stored:
+            self.assertEqual(base64.b64decode(picture['content_base64']), stored.read())
+
+    async def test_asgi_streams_chunk_by_chunk(self):
+        response = await self.async_client.get(reverse('account-export', args=['zip']))
+        # A sync iterator would be collected into a list before anything was sent
+        self.assertTrue(response.is_async)
+        archive = zipfile.ZipFile(io.BytesIO(b''.join([chunk async for chunk in response.streaming_content])))
+        self.assertIsNone(archive.testzip())
+        entries = list(csv.reader(io.StringIO(archive.read('exercises_in_session.csv').decode())))
+        self.assertEqual(len(entries), self.entries + 1)
+
+    def test_csv_table(self):
+        response = self.client.get(reverse('account-export-table', args=['csv', 'workout_sessions']))
+        rows = list(csv.reader(io.StringIO(self.content(response).decode())))
+        self.assertEqual(rows[0], ['id', 'workout_plan_id', 'date', 'duration', 'notes'])
+        self.assertEqual(len(rows), 3 * 4 + 1)
+        self.assertIn('attachment;', response['Content-Disposition'])
+
+    def test_rows_are_read_while_streaming(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('account-export', args=['zip']))
+        self.assertGreater(len(self.content(response)), 0)
+
+    def test_unknown_export_is_404(self):
+        self.assertEqual(self.client.get(reverse('account-export-table', args=['csv', 'auth_user'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('account-export', args=['xml'])).status_code, 404)
+
+    def test_requires_login(self):
+        self.client.logout()
+        response = self.client.get(reverse('account-export', args=['zip']))
+        self.assertEqual(response.status_code, 302)
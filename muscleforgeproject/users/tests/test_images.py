@@ -0,0 +1,110 @@
+import shutil
+import tempfile
+from io import BytesIO
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from users.images import MAX_PICTURE_SIZE, THUMBNAIL_SIZES, thumbnail_name
+from users.models import UserProfile
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def upload(width, height, image_format='JPEG', name='me.jpg'):
+    output = BytesIO()
+    Image.new('RGB', (width, height), 'red').save(output, image_format)
+    return SimpleUploadedFile(name, output.getvalue(), content_type=f'image/{image_format.lower()}')
+
+
+# Checking that uploaded profile pictures are downscaled and get WebP and JPEG thumbnails
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MUSCLEFORGE_IMAGE_WORKERS=0)
+class ProfilePictureTest(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.client.force_login(self.user)
+
+    def post_picture(self, picture):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('profile'), {'profile_picture': picture})
+
+    def test_upload_is_downscaled_and_thumbnailed(self):
+        response = self.post_picture(upload(4096, 2048))
+        self.assertRedirects(response, reverse('profile'))
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertTrue(profile.has_thumbnails)
+        with default_storage.open(profile.profile_picture.name) as file, Image.open(file) as stored:
+            self.assertEqual(stored.size, (MAX_PICTURE_SIZE, MAX_PICTURE_SIZE // 2))
+        for size in THUMBNAIL_SIZES:
+            for extension, image_format in (('webp', 'WEBP'), ('jpg', 'JPEG')):
+                with default_storage.open(thumbnail_name(profile.profile_picture.name, size, extension)) as file, Image.open(file) as thumbnail:
+                    self.assertEqual((thumbnail.format, thumbnail.size), (image_format, (size, size)))
+
+        content = self.client.get(reverse('profile')).content.decode()
+        self.assertIn('type="image/webp"', content)
+        self.assertIn(default_storage.url(thumbnail_name(profile.profile_picture.name, 64, 'jpg')), content)
+        self.assertIn(default_storage.url(thumbnail_name(profile.profile_picture.name, 256, 'webp')), content)
+
+    def test_replacing_picture_removes_old_thumbnails(self):
+        self.post_picture(upload(300, 300))
+        first = UserProfile.objects.get(user=self.user).profile_picture.name
+        self.post_picture(upload(200, 200, 'PNG', 'other.png'))
+        second = UserProfile.objects.get(user=self.user).profile_picture.name
+        self.assertFalse(default_storage.exists(thumbnail_name(first, 64, 'webp')))
+        self.assertTrue(default_storage.exists(thumbnail_name(second, 64, 'webp')))
+
+    def test_clearing_picture_removes_its_thumbnails(self):
+        self.post_picture(upload(300, 300))
+        first = UserProfile.objects.get(user=self.user).profile_picture.name
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('profile'), {'profile_picture-clear': 'on'})
+        self.assertRedirects(response, reverse('profile'))
+        self.assertFalse(UserProfile.objects.get(user=self.user).has_thumbnails)
+        self.assertFalse(default_storage.exists(thumbnail_name(first, 64, 'webp')))
+
+    def test_thumbnail_failure_is_logged_not_raised(self):
+        with mock.patch('users.images.make_thumbnails', side_effect=OSError('disk full')), self.assertLogs('users.images', 'ERROR'):
+            response = self.post_picture(upload(300, 300))
+        self.assertRedirects(response, reverse('profile'))
+        self.assertFalse(UserProfile.objects.get(user=self.user).has_thumbnails)
+
+    def test_stored_pictures_without_thumbnails_get_them(self):
+        # Uploaded before thumbnails were built
+        name = default_storage.save('profile_pics/old.jpg', ContentFile(upload(300, 200).read()))
+        UserProfile.objects.filter(user=self.user).update(profile_picture=name)
+        self.assertIn(f'src="{default_storage.url(name)}"', self.client.get(reverse('profile')).content.decode())
+
+        out = StringIO()
+        call_command('build_thumbnails', stdout=out)
+        self.assertIn('Built thumbnails for 1 profile pictures', out.getvalue())
+        self.assertTrue(UserProfile.objects.get(user=self.user).has_thumbnails)
+        self.assertTrue(default_storage.exists(thumbnail_name(name, 64, 'webp')))
+        self.assertIn(default_storage.url(thumbnail_name(name, 64, 'jpg')), self.client.get(reverse('profile')).content.decode())
+
+        call_command('build_thumbnails', stdout=out)
+        self.assertIn('Built thumbnails for 0 profile pictures', out.getvalue())
+
+    def test_default_picture_has_no_thumbnails(self):
+        content = self.client.get(reverse('profile')).content.decode()
+        self.assertNotIn('<picture>', content)
+        self.assertIn('default.svg', content)
+
+    def test_oversized_picture_is_rejected(self):
+        with mock.patch('users.images.MAX_PICTURE_PIXELS', 100):
+            response = self.post_picture(upload(20, 20))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['p_form'].errors['profile_picture'])
+        self.assertEqual(UserProfile.objects.get(user=self.user).profile_picture.name, 'default.svg')
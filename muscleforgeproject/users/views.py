@@ -1,9 +1,13 @@
+from datetime import date
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.contrib.auth import logout
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.decorators import login_required
 from .forms import UserRegisterForm, UserUpdateForm, ProfileUpdateForm
+from .export import TABLES, export_csv, export_ndjson, export_zip, streaming_content
+from .images import schedule_thumbnails
 
 def register(request):
     if request.method == 'POST':
@@ -25,10 +29,13 @@ def logout_view(request):
 @login_required
 def profile(request):
     if request.method == 'POST':
+        previous = request.user.userprofile.profile_picture.name
         p_form = ProfileUpdateForm(request.POST, request.FILES, instance=request.user.userprofile)
 
         if p_form.is_valid():
-            p_form.save()
+            profile = p_form.save()
+            if 'profile_picture' in p_form.changed_data:
+                schedule_thumbnails(profile, previous)
             messages.success(request, 'Your account has been updated!')
             return redirect('profile')
     else:
@@ -58,4 +65,22 @@ def account_settings(request):
         'breadcrumbs': [{'title': 'Account Settings'}],
         'title': 'Account Settings'
     }
-    return render(request, 'users/account_settings.html', context)
\ No newline at end of file
+    return render(request, 'users/account_settings.html', context)
+
+@login_required
+def export_data(request, export_format, table=None):
+    user = request.user
+    filename = f'muscleforge-{user.username}-{date.today().isoformat()}'
+    if export_format == 'csv' and table in TABLES:
+        response = StreamingHttpResponse(streaming_content(request, export_csv(user, table)), content_type='text/csv')
+        filename = f'{filename}-{table}.csv'
+    elif export_format == 'ndjson' and table is None:
+        response = StreamingHttpResponse(streaming_content(request, export_ndjson(user)), content_type='application/x-ndjson')
+        filename = f'{filename}.ndjson'
+    elif export_format == 'zip' and table is None:
+        response = StreamingHttpResponse(streaming_content(request, export_zip(user)), content_type='application/zip')
+        filename = f'{filename}.zip'
+    else:
+        raise Http404('Unknown export')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response